@@ -0,0 +1,25 @@
+# -*- encoding: utf-8 -*-
+"""
+Packs the UI icons into resources/textures/ui_atlas.png at the sizes the buttons of the scenes draw them.
+Run after changing an icon or a button's size or logo margin
+"""
+import os
+
+import pygame
+
+from game.assets.icons import build_atlas, requested_boxes
+
+if __name__ == '__main__':
+    # the scenes are only built to collect the logo boxes of their buttons
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    from game.scenes import Categories, About
+    from game.updates import network
+
+    Categories()
+    About()
+    success, msg = build_atlas(requested_boxes())
+    print(msg)
+    network.shutdown()
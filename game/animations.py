@@ -1,131 +1,181 @@
-from typing import Union
+import weakref
+from typing import Union, Callable
 
-import easing_functions
-from pygame import Surface, Color
+from pygame import Surface
 
 from game.config import *
-from game.scenes.base_scene import SceneBase
-
-__all__ = ["SceneFader", "Blinker"]
-
-
-class SceneFader(SceneBase):
-    def __init__(self, fade_to: SceneBase, current_scene: SceneBase, time: float,
-                 color: Color = None, lock_input: bool = True, freeze_scenes: bool = False,
-                 interpolator: str = "CubicEaseOut"):
-        """
-        Used to fade two scenes or fade to a color and then fade to a scene. This implementation is actually a scene
-        itself.
-        Usage: Call current_scene.SwitchToScene(fader_instance) to fade between to scenes
-        :param fade_to: Scene to fade to
-        :param current_scene: Current scene to fade from
-        :param time: Duration of fade, in seconds
-        :param color: If None direct scene fade, else fading color
-        :param lock_input: Whether to allow user input on both scenes during fade
-        :param interpolator: Name of
-        """
-        super(SceneFader, self).__init__()
-        self.next_scene = fade_to
-        self.current_scene = current_scene
-        self.color = color
-        self.time = time
-        self.time_passed = 0
-        self.lock_input = lock_input
-        self.freeze_scenes = freeze_scenes
-
-        self.direct_fade = color is None
-        self.half_done = False
-        self.forward = True
-        self.oneshot_rendered = False
+from game.utils import lazy_import
 
-        self.interpolator = getattr(easing_functions, interpolator)(start=0, end=255,
-                                                                    duration=time)
+easing_functions = lazy_import("easing_functions")
 
-        self.alpha = 0
+__all__ = ["Blinker", "FrameStrip", "Tween", "TweenScheduler", "tweens", "easing_table"]
 
-        self.prev_surf, self.next_surf = Surface((SCREEN_WIDTH, SCREEN_HEIGHT)), Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+EASING_TABLE_SIZE = 256  # samples per easing curve, values in between are interpolated linearly
 
-        if not self.direct_fade:
-            self.color_surf = Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-            self.color_surf.fill(color)
+_easing_tables = {}
 
-    def ProcessInput(self, events, pressed_keys, dt):
-        if not self.lock_input:
-            self.current_scene.ProcessInput(events, pressed_keys, dt)
-            self.next_scene.ProcessInput(events, pressed_keys, dt)
 
-    def Update(self, dt):
-        if not self.freeze_scenes:
-            self.current_scene.Update(dt)
-            self.next_scene.Update(dt)
+def easing_table(interpolator: str) -> list:
+    """
+    Samples of an easing curve from easing_functions, normalized to time and value 0...1
+    :param interpolator: class name in easing_functions, e.g. "CubicEaseOut"
+    :return: list of EASING_TABLE_SIZE + 1 values
+    """
+    table = _easing_tables.get(interpolator, None)
+    if table is None:
+        curve = getattr(easing_functions, interpolator)(start=0, end=1, duration=1)
+        table = [curve.ease(i / EASING_TABLE_SIZE) for i in range(EASING_TABLE_SIZE + 1)]
+        _easing_tables[interpolator] = table
+    return table
 
-        if not self.direct_fade:
-            if self.time_passed >= self.time / 2:
-                self.forward = False
-                self.half_done = True
 
-            if self.forward:
-                self.time_passed += dt
-            else:
-                self.time_passed -= dt
+class Tween:
+    def __init__(self, duration: float, interpolator: str = "CubicEaseOut", start: float = 0, end: float = 1,
+                 turn: float = None, loop: bool = False):
+        """
+        Eased value over time, advanced by the tween scheduler while playing
+        :param duration: length of the easing curve in seconds
+        :param interpolator: class name in easing_functions
+        :param start: value at time 0
+        :param end: value at duration
+        :param turn: if given, time runs back to 0 after passing turn
+        :param loop: with turn, run forth and back until stopped
+        """
+        self.duration = duration
+        self.table = easing_table(interpolator)
+        self.start = start
+        self.end = end
+        self.turn = turn
+        self.loop = loop
 
-            if self.time_passed <= 0 and not self.forward:
-                self.SwitchToScene(self.next_scene)
+        self.time_passed = 0
+        self.forward = True
+        self.value = start
+        self.playing = False
+        self.done = False
 
+    def ease(self, time: float) -> float:
+        """
+        :param time: clamped to 0...duration
+        :return: value of the curve at time
+        """
+        position = time / self.duration * EASING_TABLE_SIZE
+        if position <= 0:
+            factor = self.table[0]
+        elif position >= EASING_TABLE_SIZE:
+            factor = self.table[EASING_TABLE_SIZE]
         else:
-            self.time_passed += dt
-            if self.time_passed >= self.time:
-                self.SwitchToScene(self.next_scene)
-
-        self.alpha = self.interpolator.ease(self.time_passed)
-
-    def Render(self, screen: Surface):
-        if not self.oneshot_rendered:
-            self.oneshot_rendered = True
-            self.prev_surf.blit(screen, (0, 0))
-            if self.freeze_scenes:
-                self.current_scene.Render(self.prev_surf)
-                self.next_scene.Render(self.next_surf)
-
-        if not self.freeze_scenes:
-            self.current_scene.Render(self.prev_surf)
-            self.next_scene.Render(self.next_surf)
-
-        if self.direct_fade:
-            screen.blit(self.prev_surf, (0, 0))
-            self.next_surf.set_alpha(self.alpha)
-            screen.blit(self.next_surf, (0, 0))
+            i = int(position)
+            factor = self.table[i] + (self.table[i + 1] - self.table[i]) * (position - i)
+        return self.start + (self.end - self.start) * factor
+
+    def step(self, dt: float) -> bool:
+        """
+        :param dt:
+        :return: whether the tween is still running
+        """
+        if self.turn is None:
+            self.time_passed = min(self.time_passed + dt, self.duration)
+            self.done = self.time_passed >= self.duration
         else:
-            if self.half_done:
-                screen.blit(self.next_surf, (0, 0))
-            else:
-                screen.blit(self.prev_surf, (0, 0))
+            if self.time_passed > self.turn:
+                self.forward = False
+            elif self.time_passed < 0 and self.loop:
+                self.forward = True
+
+            self.time_passed += dt if self.forward else -dt
+            self.done = self.time_passed <= 0 and not self.forward and not self.loop
+
+        self.value = self.ease(self.time_passed)
+        return not self.done
+
+    def play(self):
+        """
+        Registers the tween with the scheduler, does nothing while already playing
+        :return:
+        """
+        if not self.playing:
+            self.playing = True
+            tweens.add(self)
+
+    def stop(self):
+        """
+        Unregisters the tween and rewinds it
+        :return:
+        """
+        if self.playing:
+            self.playing = False
+            tweens.remove(self)
+        self.time_passed = 0
+        self.forward = True
+        self.value = self.start
+        self.done = False
+
+
+class TweenScheduler:
+    def __init__(self):
+        """
+        Advances all playing tweens once per frame. Holds them weakly, so tweens of discarded scenes vanish with them
+        """
+        self._tweens = weakref.WeakSet()
+
+    def __len__(self):
+        return len(self._tweens)
+
+    def add(self, tween: Tween):
+        self._tweens.add(tween)
+
+    def remove(self, tween: Tween):
+        self._tweens.discard(tween)
+
+    def update(self, dt: float) -> bool:
+        """
+        Steps every playing tween, finished ones are unregistered
+        :param dt:
+        :return: whether anything is still animating
+        """
+        for tween in list(self._tweens):
+            if not tween.step(dt):
+                tween.playing = False
+                self._tweens.discard(tween)
+        return len(self._tweens) > 0
+
 
-            self.color_surf.set_alpha(self.alpha)
-            screen.blit(self.color_surf, (0, 0))
+tweens = TweenScheduler()
 
 
-class Blinker:
+class Blinker(Tween):
     def __init__(self, frequency: Union[int, float], interpolator: str = "CubicEaseOut"):
+        """
+        Swings value between 0 and the curve's value at half the period, call play() to start
+        :param frequency: swings per second
+        :param interpolator: class name in easing_functions
+        """
         self.frequency = frequency
         self.period = 1 / frequency
+        super(Blinker, self).__init__(self.period, interpolator, turn=self.period / 2, loop=True)
 
-        self.interpolator = getattr(easing_functions, interpolator)(start=0, end=1, duration=self.period)
-
-        self.value = 0
-        self.forward = True
-
-        self.time_passed = 0
 
-    def update(self, dt):
-        if self.time_passed > self.period / 2:
-            self.forward = False
-        elif self.time_passed < 0:
-            self.forward = True
+class FrameStrip:
+    def __init__(self, render: Callable[[float], Surface], duration: float, rate: int = ANIMATION_SAMPLE_RATE):
+        """
+        Frames of a deterministic animation, rendered once at a fixed sample rate. Playback picks the frame by time
+        instead of drawing it
+        :param render: function returning the frame at a time between 0 and duration
+        :param duration: length of the animation in seconds
+        :param rate: samples per second
+        """
+        self.duration = duration
+        count = max(2, int(round(duration * rate)) + 1)
+        self.frames = [render(duration * i / (count - 1)) for i in range(count)]
 
-        if self.forward:
-            self.time_passed += dt
-        else:
-            self.time_passed -= dt
+    def index(self, time: float) -> int:
+        """
+        :param time: clamped to 0...duration
+        :return: index of the frame nearest to time
+        """
+        last = len(self.frames) - 1
+        return min(max(int(round(time / self.duration * last)), 0), last)
 
-        self.value = self.interpolator.ease(self.time_passed)
+    def frame(self, time: float) -> Surface:
+        return self.frames[self.index(time)]
@@ -0,0 +1,107 @@
+"""
+Low-latency feedback sounds.
+The mixer is initialised with a small buffer, feedback sounds are decoded to PCM once in the
+background and played on reserved channels, so a click never waits for a free channel.
+The time from the frame that received the input to the start of playback is recorded, plus the buffer latency.
+"""
+import time
+
+from pygame import mixer
+
+__all__ = ["pre_init", "play_feedback", "mark_input", "latency", "FEEDBACK_SOUNDS"]
+
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 256  # samples per chunk, about 6ms at 44.1kHz
+FEEDBACK_CHANNELS = 2  # reserved, never picked by Sound.play()
+
+FEEDBACK_SOUNDS = {"sounds": ["resources/audio/Blop.mp3", "resources/audio/wrong.wav"]}
+
+_channels = []
+_input_time = None
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.last = 0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    @staticmethod
+    def buffer_latency() -> float:
+        """
+        :return: seconds one mixer chunk takes to play, the least the output lags behind play()
+        """
+        init = mixer.get_init()
+        if init is None:
+            return 0
+        return MIXER_BUFFER / init[0]
+
+    def report(self) -> str:
+        buffer = self.buffer_latency() * 1000
+        if not self.count:
+            return f"Audio feedback: no sounds played, buffer {buffer:.1f}ms"
+        return f"Audio feedback: {self.count} sounds, input to play() mean {self.mean * 1000:.1f}ms " \
+               f"max {self.max * 1000:.1f}ms, + buffer {buffer:.1f}ms"
+
+
+latency = LatencyStats()
+
+
+def pre_init():
+    """
+    Call before pygame.mixer.init(), which then opens the mixer with a small buffer
+    :return:
+    """
+    mixer.pre_init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+
+
+def mark_input():
+    """
+    Call when a frame received input events, feedback played in that frame is measured from here
+    :return:
+    """
+    global _input_time
+    _input_time = time.perf_counter()
+
+
+def _feedback_channels() -> list:
+    if not _channels and mixer.get_init() is not None:
+        mixer.set_num_channels(max(mixer.get_num_channels(), FEEDBACK_CHANNELS + 1))
+        mixer.set_reserved(FEEDBACK_CHANNELS)
+        _channels.extend(mixer.Channel(i) for i in range(FEEDBACK_CHANNELS))
+    return _channels
+
+
+def play_feedback(sound: mixer.Sound):
+    """
+    Plays sound on an idle reserved channel, cuts off the oldest feedback if all are busy
+    :param sound:
+    :return:
+    """
+    global _input_time
+    channels = _feedback_channels()
+    if not channels:
+        return
+
+    channel = next((channel for channel in channels if not channel.get_busy()), channels[0])
+    channel.play(sound)
+    # the cut off channel moves to the back, it played the longest
+    channels.remove(channel)
+    channels.append(channel)
+
+    if _input_time is not None:
+        latency.add(time.perf_counter() - _input_time)
+        _input_time = None
@@ -1,26 +1,449 @@
+import re
+from collections import OrderedDict
+
 import pygame
-from pygame.freetype import Font
+import pygame.freetype
+from pygame.freetype import Font, STYLE_DEFAULT
 
+from game.render_stats import render_stats, TEXTS
 from game.utils import rel_to_root
 
 __all__ = ["title_font", "question_font", "question_asked_font", "fps_counter", "category_font", "text_input_font",
-           "scene_title_font", "mini_info_font", "light_italic_font_25"]
+           "scene_title_font", "mini_info_font", "light_italic_font_25", "LazyFont", "GlyphAtlas", "get_font",
+           "open_fonts", "TextCache", "text_cache", "render_text", "render_line", "glyph_metrics", "text_width",
+           "wrap_text", "multiline_text"]
+
+ATLAS_SIZE = (512, 256)
+
+
+class GlyphAtlas:
+    def __init__(self, font: "LazyFont"):
+        """
+        White glyphs of a font packed into one surface, rasterised once on first use.
+        Strings are composed by blitting glyphs and tinting the result instead of rendering through FreeType
+        :param font:
+        """
+        self.font = font
+        self.surf = None
+        self.glyphs = {}  # {char: (area in surf or None for blank glyphs, bearing x, bearing y, advance)}
+        self._tinted = {}  # {color: copy of surf tinted in color}, tinting once is cheaper than per string
+
+        self._x = 0
+        self._y = 0
+        self._row_height = 0
+
+    def _place(self, glyph: pygame.Surface) -> pygame.Rect:
+        width, height = glyph.get_size()
+        if self.surf is None:
+            self.surf = pygame.Surface(ATLAS_SIZE, pygame.SRCALPHA)
+            self.surf.fill((0, 0, 0, 0))
+
+        # shelf packing, one pixel gap between glyphs
+        if self._x + width > self.surf.get_width():
+            self._x = 0
+            self._y += self._row_height + 1
+            self._row_height = 0
+        if self._y + height > self.surf.get_height():
+            grown = pygame.Surface((self.surf.get_width(), self.surf.get_height() * 2), pygame.SRCALPHA)
+            grown.fill((0, 0, 0, 0))
+            grown.blit(self.surf, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.surf = grown
+            self._tinted.clear()
+
+        area = pygame.Rect(self._x, self._y, width, height)
+        self.surf.blit(glyph, area, special_flags=pygame.BLEND_RGBA_MAX)
+        for color, tinted in self._tinted.items():
+            tinted.blit(glyph, area, special_flags=pygame.BLEND_RGBA_MAX)
+            tinted.fill(color, area, special_flags=pygame.BLEND_RGBA_MULT)
+        self._x += width + 1
+        self._row_height = max(self._row_height, height)
+        return area
+
+    def warm(self, chars: str):
+        """
+        Rasterises the glyphs of chars that are not in the atlas yet
+        :param chars:
+        :return:
+        """
+        for char in set(chars).difference(self.glyphs):
+            glyph, rect = self.font.render(char, (255, 255, 255))
+            area = self._place(glyph) if glyph.get_width() > 0 and glyph.get_height() > 0 else None
+            self.glyphs[char] = (area, rect.x, rect.y, glyph_metrics(self.font, char)[0][4])
+
+    def compose(self, text: str, color) -> (pygame.Surface, pygame.Rect):
+        """
+        Equivalent of Font.render(text, color) for the default style and size
+        :param text:
+        :param color:
+        :return: Surface, Rect or None if text has no visible glyphs
+        """
+        self.warm(text)
+
+        pen = 0
+        placed = []
+        boxes = []  # horizontal extents, FreeType's box includes the advance of blank glyphs
+        for char in text:
+            area, bearing_x, bearing_y, advance = self.glyphs[char]
+            if area is not None:
+                placed.append((area, pen + bearing_x, bearing_y))
+                boxes.append((pen + bearing_x, pen + bearing_x + area.width))
+            else:
+                boxes.append((pen, pen + advance))
+            pen += advance
+        if not placed:
+            return None
+
+        left = min(start for start, _ in boxes)
+        right = max(end for _, end in boxes)
+
+        top = max(y for _, _, y in placed)
+        bottom = min(y - area.height for area, _, y in placed)
+
+        color = tuple(pygame.Color(color))
+        tinted = self._tinted.get(color, None)
+        if tinted is None:
+            tinted = self.surf.copy()
+            tinted.fill(color, special_flags=pygame.BLEND_RGBA_MULT)
+            self._tinted[color] = tinted
+
+        # new surfaces are zero filled, i.e. transparent
+        surf = pygame.Surface((right - left, top - bottom), pygame.SRCALPHA)
+        surf.blits([(tinted, (x - left, top - y), area, pygame.BLEND_RGBA_MAX) for area, x, y in placed], False)
+        return surf, pygame.Rect(left, top, right - left, top - bottom)
+
+
+class LazyFont:
+    def __init__(self, path: str, size: float, atlas: bool = False):
+        """
+        pygame.freetype.Font that opens its face on first use, attributes are forwarded to the Font
+        :param path: font file
+        :param size: default size
+        :param atlas: compose text of the default style and size from a GlyphAtlas
+        """
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "default_size", size)
+        object.__setattr__(self, "atlas", GlyphAtlas(self) if atlas else None)
+        object.__setattr__(self, "_font", None)
+
+    @property
+    def font(self) -> Font:
+        if self._font is None:
+            if not pygame.freetype.get_init():
+                pygame.freetype.init()
+            object.__setattr__(self, "_font", Font(self.path, self.default_size))
+        return self._font
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._font is not None
+
+    def __getattr__(self, name):
+        return getattr(self.font, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.font, name, value)
+
+    def __repr__(self):
+        return f"LazyFont({self.path!r}, {self.default_size})"
+
+
+_registry = {}  # {(path, size): LazyFont}
+
+
+def get_font(filename: str, size: float, atlas: bool = False) -> LazyFont:
+    """
+    Shared lazily opened font
+    :param filename: file in resources/fonts/Roboto
+    :param size:
+    :param atlas: use a glyph atlas, for hot fixed sizes
+    :return: LazyFont
+    """
+    key = (filename, size)
+    font = _registry.get(key, None)
+    if font is None:
+        font = LazyFont(rel_to_root(f"resources/fonts/Roboto/{filename}"), size, atlas=atlas)
+        _registry[key] = font
+    elif atlas and font.atlas is None:
+        object.__setattr__(font, "atlas", GlyphAtlas(font))
+    return font
+
+
+def open_fonts(chars: str = "", limit: int = None) -> int:
+    """
+    Opens the registered fonts that are still closed and rasterises chars into their glyph atlases, ahead of first use.
+    Main thread only, like all text rendering, FreeType and the text cache are not thread safe
+    :param chars: rasterised into the glyph atlases
+    :param limit: maximum number of fonts opened or warmed, spreads the work over several calls
+    :return: number of fonts opened or warmed, 0 once all are
+    """
+    done = 0
+    for font in list(_registry.values()):
+        if limit is not None and done >= limit:
+            break
+        cold = font.atlas is not None and not set(chars).issubset(font.atlas.glyphs)
+        if font.is_loaded and not cold:
+            continue
+        font.font
+        if font.atlas is not None:
+            font.atlas.warm(chars)
+        done += 1
+    return done
+
+
+# Fonts, opened on first use
+title_font = get_font("Roboto-Black.ttf", 90)
+scene_title_font = get_font("Roboto-Bold.ttf", 50)
+
+question_font = get_font("Roboto-Medium.ttf", 30, atlas=True)
+question_asked_font = get_font("Roboto-MediumItalic.ttf", 30, atlas=True)
+
+fps_counter = get_font("Roboto-Thin.ttf", 15)
+
+category_font = get_font("Roboto-Light.ttf", 30, atlas=True)
+text_input_font = get_font("Roboto-Regular.ttf", 30, atlas=True)
+light_italic_font_25 = get_font("Roboto-LightItalic.ttf", 25)
+regular_font_15 = get_font("Roboto-Regular.ttf", 20)
+
+mini_info_font = get_font("Roboto-Light.ttf", 15)
+
+TEXT_CACHE_BYTES = 8 * 1024 * 1024
+APPEND_LOOKBACK = 8  # characters searched back for a cached prefix in render_line
+LAYOUT_CACHE_ITEMS = 128
+
+
+def _color_key(color):
+    return tuple(pygame.Color(color)) if color is not None else None
+
+
+def _surf_bytes(surf: pygame.Surface) -> int:
+    return surf.get_pitch() * surf.get_height()
+
+
+class TextCache:
+    def __init__(self, max_bytes: int = TEXT_CACHE_BYTES):
+        """
+        LRU cache of rendered text surfaces, bounded by the pixel bytes of the cached surfaces.
+        Returned surfaces are shared, blit them but never draw onto them. Main thread only, it is not locked
+        :param max_bytes: size limit of all cached surfaces
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # {key: (Surface, Rect or advance)}
+
+    def _get(self, key):
+        entry = self._entries.get(key, None)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def _put(self, key, surf: pygame.Surface, info):
+        self.misses += 1
+        render_stats.add(TEXTS)
+        self._entries[key] = (surf, info)
+        self.bytes += _surf_bytes(surf)
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.bytes -= _surf_bytes(evicted)
+
+    def render(self, font: Font, text: str, fgcolor=None, bgcolor=None, style: int = STYLE_DEFAULT,
+               size: float = 0) -> (pygame.Surface, pygame.Rect):
+        """
+        Cached equivalent of Font.render
+        :param font:
+        :param text:
+        :param fgcolor: defaults to font.fgcolor
+        :param bgcolor: None for a transparent background
+        :param style: freetype style flags, STYLE_DEFAULT uses font.style
+        :param size: 0 uses font.size
+        :return: Surface, Rect (the Rect is a copy and may be moved freely)
+        """
+        text = text if text is not None else ""
+        key = ("text", font, font.size, font.style, text, _color_key(fgcolor), _color_key(bgcolor), style, size)
+        entry = self._get(key)
+        if entry is None:
+            atlas = getattr(font, "atlas", None)
+            if atlas is not None and fgcolor is not None and bgcolor is None and style == STYLE_DEFAULT and not size:
+                entry = atlas.compose(text, fgcolor)
+            if entry is None:
+                entry = font.render(text, fgcolor, bgcolor, style, size=size)
+            self._put(key, *entry)
+
+        surf, rect = entry
+        return surf, rect.copy()
+
+    def render_line(self, font: Font, text: str, fgcolor=None) -> (pygame.Surface, float):
+        """
+        Renders text on a transparent line of fixed height with the baseline at font.get_sized_ascender().
+        If a prefix of text is cached (text typed into an input box), only the appended characters are rasterised
+        :param font:
+        :param text:
+        :param fgcolor: defaults to font.fgcolor
+        :return: Surface, horizontal advance of text (pen position after the last character)
+        """
+        text = text if text is not None else ""
+        color = _color_key(fgcolor)
+        key = ("line", font, font.size, font.style, text, color)
+        entry = self._get(key)
+        if entry is not None:
+            return entry
+
+        prefix = None
+        for cut in range(1, min(APPEND_LOOKBACK, len(text)) + 1):
+            prefix = self._entries.get(key[:4] + (text[:-cut], color), None)
+            if prefix is not None:
+                break
+
+        if prefix is not None:
+            prefix_surf, pen = prefix
+            suffix = text[-cut:]
+        else:
+            prefix_surf, pen = None, 0
+            suffix = text
+
+        advance = pen + text_width(font, suffix)
+        ink = font.get_rect(suffix)
+        width = max(1, int(advance) + 1, int(pen + ink.right) + 1,
+                    prefix_surf.get_width() if prefix_surf is not None else 0)
+        height = font.get_sized_ascender() - font.get_sized_descender()
+
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        if prefix_surf is not None:
+            # copies the prefix pixels unblended onto the transparent surface
+            surf.blit(prefix_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+
+        atlas = getattr(font, "atlas", None)
+        composed = atlas.compose(suffix, fgcolor) if atlas is not None and fgcolor is not None else None
+        if composed is not None:
+            glyphs, rect = composed
+            surf.blit(glyphs, (pen + rect.x, font.get_sized_ascender() - rect.y), special_flags=pygame.BLEND_RGBA_MAX)
+        elif suffix:
+            origin = font.origin
+            font.origin = True
+            try:
+                font.render_to(surf, (pen, font.get_sized_ascender()), suffix, fgcolor)
+            finally:
+                font.origin = origin
+
+        self._put(key, surf, advance)
+        return surf, advance
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+
+text_cache = TextCache()
+
+
+def render_text(font: Font, text: str, fgcolor=None, bgcolor=None, style: int = STYLE_DEFAULT,
+                size: float = 0) -> (pygame.Surface, pygame.Rect):
+    """
+    Renders text through the shared text_cache, see TextCache.render
+    """
+    return text_cache.render(font, text, fgcolor, bgcolor, style, size)
+
+
+def render_line(font: Font, text: str, fgcolor=None) -> (pygame.Surface, float):
+    """
+    Renders a single line through the shared text_cache, see TextCache.render_line
+    """
+    return text_cache.render_line(font, text, fgcolor)
+
+
+_metrics = {}  # {(font, size, style): {char: (min_x, max_x, min_y, max_y, advance_x, advance_y)}}
+_layouts = OrderedDict()  # {(text, font, size, style, max_length): lines}
+_NO_METRICS = (0, 0, 0, 0, 0.0, 0.0)
+
+
+def glyph_metrics(font: Font, text: str) -> list:
+    """
+    Font.get_metrics with the glyph metrics cached per font, size and style
+    :param font:
+    :param text:
+    :return: list of metric tuples, zeros for glyphs without metrics
+    """
+    metrics = _metrics.setdefault((font, font.size, font.style), {})
+    missing = set(text).difference(metrics)
+    if missing:
+        missing = "".join(missing)
+        for char, metric in zip(missing, font.get_metrics(missing)):
+            metrics[char] = metric if metric is not None else _NO_METRICS
+    return [metrics[char] for char in text]
+
+
+def text_width(font: Font, text: str) -> float:
+    """
+    :param font:
+    :param text:
+    :return: sum of the horizontal advances of text
+    """
+    return sum(metric[4] for metric in glyph_metrics(font, text))
+
+
+def wrap_text(text: str, font: Font, max_length: int = None) -> tuple:
+    """
+    Wraps text at word boundaries to lines of about max_length, layouts are cached per text, font and width
+    :param text:
+    :param font:
+    :param max_length: maximum line length in pixels, None only splits at newlines
+    :return: tuple of lines
+    """
+    key = (text, font, font.size, font.style, max_length)
+    lines = _layouts.get(key, None)
+    if lines is not None:
+        _layouts.move_to_end(key)
+        return lines
+
+    if max_length is not None:
+        formatted_string = ""
+
+        words_with_nl = [word for word in re.split(r' |(\n)', text) if word is not None and word != ""]
+
+        length = 0
+        space_length = text_width(font, " ")
+
+        for word in words_with_nl:
+            word_length = sum(metric[1] for metric in glyph_metrics(font, word))  # max_x
 
-# pygame.font.init()
-pygame.freetype.init()
+            if word == "\n":
+                formatted_string += "\n"
+                length = 0
+            elif length + word_length + space_length > max_length:
+                formatted_string += "\n" + word + " "
+                length = 0
+            else:
+                formatted_string += word + " "
+                length += word_length + space_length
 
-# Fonts
-title_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Black.ttf"), 90)
-scene_title_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Bold.ttf"), 50)
+        text = formatted_string
 
-question_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Medium.ttf"), 30)
-question_asked_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-MediumItalic.ttf"), 30)
+    lines = tuple(text.split("\n"))
+    _layouts[key] = lines
+    while len(_layouts) > LAYOUT_CACHE_ITEMS:
+        _layouts.popitem(last=False)
+    return lines
 
-fps_counter = Font(rel_to_root("resources/fonts/Roboto/Roboto-Thin.ttf"), 15)
 
-category_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Light.ttf"), 30)
-text_input_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Regular.ttf"), 30)
-light_italic_font_25 = Font(rel_to_root("resources/fonts/Roboto/Roboto-LightItalic.ttf"), 25)
-regular_font_15 = Font(rel_to_root("resources/fonts/Roboto/Roboto-Regular.ttf"), 20)
+def multiline_text(text: str, font: Font, color: pygame.Color, margin: int = 10, max_length: int = None) -> list:
+    """
+    Renders text line by line, the layout and the rendered lines are cached so repeated calls only cost lookups
+    :param text:
+    :param font:
+    :param color:
+    :param margin: vertical space between lines
+    :param max_length: maximum line length in pixels, None only splits at newlines
+    :return: list of (Surface, Rect) to be used with Surface.blits
+    """
+    size = font.size
 
-mini_info_font = Font(rel_to_root("resources/fonts/Roboto/Roboto-Light.ttf"), 15)
+    surfs = []
+    for i, line in enumerate(wrap_text(text, font, max_length)):
+        txt, rect = text_cache.render(font, line, color)
+        rect.topleft = 0, size * i + (i * margin)
+        surfs.append((txt, rect))
+    return surfs
@@ -0,0 +1,140 @@
+"""
+UI icons packed into one atlas image.
+build_atlas() scales every icon to the sizes the buttons draw it at and packs them into
+resources/textures/ui_atlas.png, indexed by ui_atlas.json. The sizes are not listed here, build_atlas.py builds the
+scenes and packs the logo boxes their buttons ask icon() for. Run it after changing an icon or a button's size or
+margin. Icons missing from the atlas are scaled from their source file instead, with a hint to rebuild it.
+"""
+import json
+import threading
+from pathlib import Path
+
+import pygame
+from pygame import Surface, Rect
+
+from game.assets.manager import assets
+from game.utils import rel_to_root, aspect_scale, aspect_size
+
+__all__ = ["UI_ICONS", "icon", "requested_boxes", "build_atlas"]
+
+ATLAS_IMAGE = "resources/textures/ui_atlas.png"
+ATLAS_INDEX = "resources/textures/ui_atlas.json"
+ATLAS_WIDTH = 256
+PADDING = 1
+
+# {name: source}
+UI_ICONS = {
+    "marker": "resources/textures/marker_icon.png",
+    "keyboard": "resources/textures/keyboard_icon.png",
+    "library": "resources/textures/library_icon.png",
+    "homepage": "resources/textures/homepage_icon.png",
+    "mail": "resources/textures/mail_icon.png",
+    "github": "resources/textures/GitHub-Mark-Light-64px.png",
+}
+
+_atlas = None  # Surface
+_index = None  # {key: Rect}, set once together with _atlas
+_sources = {}  # {name: size of the source image}, read from the index to spare loading the source
+_icons = {}  # {key: Surface}
+_boxes = {}  # {name: {logo box, ...}}, every box a button asked for, a logo box is the button size minus its margins
+_lock = threading.Lock()  # the warm-up may load the atlas while the main thread builds buttons
+
+
+def _key(name: str, size: tuple) -> str:
+    return f"{name}@{size[0]}x{size[1]}"
+
+
+def _load_atlas():
+    global _atlas, _index
+    with _lock:
+        if _index is not None:
+            return
+        atlas = None
+        rects = {}
+        try:
+            with open(rel_to_root(ATLAS_INDEX), encoding="utf-8") as file:
+                index = json.load(file)
+            atlas = assets.image(ATLAS_IMAGE)
+            rects = {key: Rect(rect) for key, rect in index["icons"].items()}
+            _sources.update((name, tuple(size)) for name, size in index["sources"].items())
+        except (OSError, ValueError, KeyError, pygame.error) as e:
+            print(e)
+            atlas, rects = None, {}
+        # icon() takes a set _index as loaded
+        _atlas = atlas
+        _index = rects
+
+
+def icon(name: str, box: tuple) -> Surface:
+    """
+    :param name: key of UI_ICONS
+    :param box: logo box of the button
+    :return: icon scaled to fit into box, a subsurface of the atlas if it has been built for this box
+    """
+    _boxes.setdefault(name, set()).add(tuple(box))
+    if _index is None:
+        _load_atlas()
+
+    source = _sources.get(name, None)
+    if source is None:
+        source = _sources[name] = assets.image(UI_ICONS[name]).get_size()
+    size = aspect_size(source, box)
+    key = _key(name, size)
+    surf = _icons.get(key, None)
+    if surf is None:
+        if key in _index:
+            surf = _atlas.subsurface(_index[key])
+        else:
+            print(f"{key} is not in {Path(ATLAS_IMAGE).name}, run build_atlas.py")
+            surf = aspect_scale(assets.image(UI_ICONS[name]), box, smooth=True)
+        _icons[key] = surf
+    return surf
+
+
+def requested_boxes() -> dict:
+    """
+    :return: {name: [logo box, ...]} of every icon() call so far
+    """
+    return {name: sorted(boxes) for name, boxes in _boxes.items()}
+
+
+def build_atlas(boxes: dict) -> tuple:
+    """
+    Scales and packs UI_ICONS, writes ATLAS_IMAGE and ATLAS_INDEX
+    :param boxes: {name: [logo box, ...]}, see requested_boxes()
+    :return: bool (is_successful), string (message)
+    """
+    icons = {}
+    sources = {}
+    for name, source in UI_ICONS.items():
+        try:
+            original = pygame.image.load(rel_to_root(source))
+        except (pygame.error, FileNotFoundError) as e:
+            print(e)
+            return False, f"Couldn't read {source}"
+        for box in boxes.get(name, []):
+            scaled = aspect_scale(original, box, smooth=True)
+            icons[_key(name, scaled.get_size())] = scaled
+        sources[name] = list(original.get_size())
+
+    # shelf packing, tallest first
+    placed = {}
+    x = y = shelf = 0
+    for key, surf in sorted(icons.items(), key=lambda item: -item[1].get_height()):
+        width, height = surf.get_size()
+        if x + width > ATLAS_WIDTH:
+            x, y = 0, y + shelf + PADDING
+            shelf = 0
+        placed[key] = Rect(x, y, width, height)
+        x += width + PADDING
+        shelf = max(shelf, height)
+
+    atlas = Surface((ATLAS_WIDTH, y + shelf), pygame.SRCALPHA)
+    for key, rect in placed.items():
+        # onto the transparent atlas, max copies the pixels without blending
+        atlas.blit(icons[key], rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+    pygame.image.save(atlas, rel_to_root(ATLAS_IMAGE))
+    with open(rel_to_root(ATLAS_INDEX), "w", encoding="utf-8") as file:
+        json.dump({"sources": sources, "icons": {key: list(rect) for key, rect in sorted(placed.items())}}, file)
+    return True, f"{len(icons)} icons packed into {Path(ATLAS_IMAGE).name} ({ATLAS_WIDTH}x{y + shelf})"
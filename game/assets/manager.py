@@ -0,0 +1,226 @@
+"""
+Shared assets.
+Every image, sound and font is loaded once and handed out to all users. Users pass themselves as owner, the
+reference is dropped again when the owner is garbage collected. Assets whose owners are all gone stay resident
+until trim(), which runs at every scene switch.
+"""
+import threading
+import weakref
+
+import pygame
+from pygame import Surface, image, mixer
+
+from game.assets.fonts import get_font
+from game.updates import network
+from game.utils import rel_to_root, aspect_scale
+
+__all__ = ["AssetManager", "assets"]
+
+
+class _Entry:
+    def __init__(self, kind: str, name: str, asset):
+        self.kind = kind
+        self.name = name
+        self.asset = asset
+        self.refs = 0
+        self.owned = False  # had an owner, preloaded assets without one are kept until trim(preloaded=True)
+        self.converted = False
+
+
+class AssetManager:
+    def __init__(self):
+        self._entries = {}  # {key: _Entry}
+        self._lock = threading.Lock()  # preloads fill _entries from the network loop
+
+    def _acquire(self, key: tuple, load, owner) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key, None)
+        if entry is None:
+            entry = load()
+            with self._lock:
+                # another thread may have loaded it meanwhile, keep the first one
+                entry = self._entries.setdefault(key, entry)
+
+        if owner is not None:
+            entry.refs += 1
+            entry.owned = True
+            weakref.finalize(owner, self._release, entry)
+        return entry
+
+    @staticmethod
+    def _release(entry: _Entry):
+        if entry.refs > 0:
+            entry.refs -= 1
+
+    @staticmethod
+    def _load_image(path: str) -> _Entry:
+        return _Entry("image", path, image.load(rel_to_root(path)))
+
+    @staticmethod
+    def _load_sound(path: str) -> _Entry:
+        return _Entry("sound", path, mixer.Sound(rel_to_root(path)))
+
+    @staticmethod
+    def _convert(entry: _Entry, alpha: bool):
+        # display format needs a video mode, preloaded images are converted on first use
+        if entry.converted or pygame.display.get_surface() is None:
+            return
+        entry.asset = entry.asset.convert_alpha() if alpha else entry.asset.convert()
+        entry.converted = True
+
+    @staticmethod
+    def _scale(source: Surface, size: tuple) -> Surface:
+        # like the display format, smoothscale rounds differently on 24 bits and refuses palettised images
+        if source.get_bitsize() < 32:
+            expanded = Surface(source.get_size(), pygame.SRCALPHA, 32)
+            expanded.blit(source, (0, 0))
+            source = expanded
+        return aspect_scale(source, size, True)
+
+    def _load_scaled(self, path: str, alpha: bool, size: tuple, keep_original: bool) -> _Entry:
+        if keep_original:
+            source = self._acquire(("image", path, alpha, None), lambda: self._load_image(path), None).asset
+        else:
+            with self._lock:
+                original = self._entries.get(("image", path, alpha, None), None)
+            source = original.asset if original is not None else self._load_image(path).asset
+        return _Entry("image", f"{path} {size[0]}x{size[1]}", self._scale(source, size))
+
+    def image(self, path: str, owner=None, alpha: bool = True, size: tuple = None,
+              keep_original: bool = True) -> Surface:
+        """
+        :param path: relative to the root path, e.g. "resources/textures/marker_icon.png"
+        :param owner: object holding a reference until it is garbage collected, None keeps no reference
+        :param alpha: keep per-pixel alpha when converting to display format
+        :param size: bounding box to smoothscale to, keeping the aspect ratio
+        :param keep_original: with size, keep the unscaled image resident too. Off for large images only shown scaled
+        :return: shared Surface, do not draw onto it
+        """
+        if size is None:
+            original = self._acquire(("image", path, alpha, None), lambda: self._load_image(path), owner)
+            self._convert(original, alpha)
+            return original.asset
+
+        size = tuple(size)
+        if keep_original and owner is not None:
+            # the owner references the original as well, trim() drops it together with the scaled copy
+            self._acquire(("image", path, alpha, None), lambda: self._load_image(path), owner)
+        scaled = self._acquire(("image", path, alpha, size),
+                               lambda: self._load_scaled(path, alpha, size, keep_original), owner)
+        self._convert(scaled, alpha)
+        return scaled.asset
+
+    def sound(self, path: str, owner=None, volume: float = None) -> mixer.Sound:
+        """
+        :param path: relative to the root path, e.g. "resources/audio/Blop.mp3"
+        :param owner: object holding a reference until it is garbage collected, None keeps no reference
+        :param volume: every volume gets its own Sound, volume is a property of the Sound object
+        :return: shared Sound
+        """
+        original = self._acquire(("sound", path, None), lambda: self._load_sound(path),
+                                 owner if volume is None else None)
+        if volume is None:
+            return original.asset
+
+        def adjust():
+            sound = mixer.Sound(buffer=original.asset.get_raw())
+            sound.set_volume(volume)
+            return _Entry("sound", f"{path} volume {volume}", sound)
+
+        return self._acquire(("sound", path, volume), adjust, owner).asset
+
+    def font(self, filename: str, size: int, owner=None, atlas: bool = False):
+        """
+        :param filename: font file in resources/fonts
+        :param size: pixel size
+        :param owner: object holding a reference until it is garbage collected, None keeps no reference
+        :param atlas: draw from a glyph atlas
+        :return: shared LazyFont, opened on first use
+        """
+        return self._acquire(("font", filename, size, atlas),
+                             lambda: _Entry("font", f"{filename} {size}px", get_font(filename, size, atlas)),
+                             owner).asset
+
+    def load(self, manifest: dict, token: network.CancelToken = None) -> tuple:
+        """
+        Decodes assets in the calling thread, images are converted to display format on first use
+        :param manifest: {"images": [path, ...], "sounds": [path, ...], "scaled_images": [(path, size), ...]},
+            scaled images are loaded as image(path, size=size, keep_original=False) asks for them
+        :param token: checked between assets
+        :return: bool (is_successful), string (message)
+        """
+        try:
+            for path in manifest.get("images", []):
+                self._acquire(("image", path, True, None), lambda: self._load_image(path), None)
+                if token is not None:
+                    token.raise_if_cancelled()
+            for path, size in manifest.get("scaled_images", []):
+                size = tuple(size)
+                self._acquire(("image", path, True, size), lambda: self._load_scaled(path, True, size, False), None)
+                if token is not None:
+                    token.raise_if_cancelled()
+            for path in manifest.get("sounds", []):
+                self._acquire(("sound", path, None), lambda: self._load_sound(path), None)
+                if token is not None:
+                    token.raise_if_cancelled()
+        except (pygame.error, FileNotFoundError) as e:
+            print(e)
+            return False, str(e)
+        return True, ""
+
+    def preload(self, manifest: dict, token: network.CancelToken = None) -> network.NetworkTask:
+        """
+        Decodes assets in the background, see load()
+        :param manifest: {"images": [path, ...], "sounds": [path, ...], "scaled_images": [(path, size), ...]}
+        :param token: cancels the remaining loads
+        :return: NetworkTask resolving to (success, msg)
+        """
+        return network.submit(self.load, manifest, token, token=token)
+
+    def trim(self, preloaded: bool = False) -> int:
+        """
+        Drops the assets whose owners have all been garbage collected
+        :param preloaded: also drop preloaded assets that no owner has used yet
+        :return: number of dropped assets
+        """
+        with self._lock:
+            unused = [key for key, entry in self._entries.items()
+                      if entry.refs == 0 and (entry.owned or preloaded)]
+            for key in unused:
+                del self._entries[key]
+        return len(unused)
+
+    @staticmethod
+    def _size(entry: _Entry) -> int:
+        if entry.kind == "image":
+            return entry.asset.get_height() * entry.asset.get_pitch()
+        if entry.kind == "sound":
+            init = mixer.get_init()
+            if init is None:
+                return 0
+            frequency, bits, channels = init
+            return int(entry.asset.get_length() * frequency) * channels * abs(bits) // 8
+        return 0
+
+    def resident(self) -> list:
+        """
+        :return: [{"kind", "name", "refs", "bytes", "loaded"}, ...] of every resident asset
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+        return [{"kind": entry.kind, "name": entry.name, "refs": entry.refs, "bytes": self._size(entry),
+                 "loaded": entry.asset.is_loaded if entry.kind == "font" else True} for entry in entries]
+
+    def report(self) -> str:
+        lines = []
+        total = 0
+        for asset in sorted(self.resident(), key=lambda a: (a["kind"], a["name"])):
+            total += asset["bytes"]
+            state = "" if asset["loaded"] else " (not opened)"
+            lines.append(f"{asset['kind']:<6} {asset['refs']:>3} refs {asset['bytes'] / 1024:>8.1f} KiB  "
+                         f"{asset['name']}{state}")
+        lines.append(f"{len(lines)} assets, {total / 1024 / 1024:.2f} MiB")
+        return "\n".join(lines)
+
+
+assets = AssetManager()
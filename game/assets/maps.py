@@ -1,19 +1,39 @@
-from pygame import image
+from pathlib import Path
+
 from pygame.sprite import Sprite
 
-__all__ = ["Map"]
+from game.assets.manager import assets
+from game.config import SCREEN_WIDTH, SCREEN_HEIGHT
+from game.utils import rel_to_root, rel_to_writable
+
+__all__ = ["Map", "map_path", "MAP_BOX"]
+
+MAP_BOX = (SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT)  # game scenes fit the map into the right two thirds
+
+
+def map_path(image_path: str) -> Path:
+    """
+    :param image_path: "image_path" of a dataset, e.g. 'maps/filename.png'
+    :return: built-in texture if it exists, else the downloaded one
+    """
+    path = Path(rel_to_root(f"resources/textures/{image_path}"))
+    if not path.exists():
+        path = Path(rel_to_writable(f"textures/{image_path}"))
+    return path
 
 
 class Map(Sprite):
-    def __init__(self, image_path):
+    def __init__(self, image_path, size: tuple = MAP_BOX, owner=None):
         """
         :param image_path: form 'resources/textures/maps/filename.png'
+        :param size: bounding box the map is scaled into, keeping the aspect ratio
+        :param owner: holds the shared scaled map, see AssetManager.image
         """
         super(Map, self).__init__()
-        self.surf = image.load(image_path).convert_alpha()
-        # self.surf.set_colorkey((255, 255, 255), RLEACCEL)
+        # the full size map is only needed to scale it, the scaled one is shared with the warm-up
+        self.original_surf = assets.image(str(image_path), owner, size=size, keep_original=False)
+        self.surf = self.original_surf.copy()
         self.rect = self.surf.get_rect()
-        self.original_surf = self.surf.copy()
 
     def reset_surf(self):
         self.surf = self.original_surf.copy()
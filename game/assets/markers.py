@@ -1,8 +1,9 @@
-from pygame import Color, draw, Surface
+from pygame import Color, draw
 from pygame.locals import RLEACCEL
 from pygame.sprite import Sprite
 
 import game.assets.color_palette as c
+from game.render_stats import make_surface
 from game.utils import invert_color
 
 __all__ = ["LocationMarker"]
@@ -17,7 +18,7 @@ class LocationMarker(Sprite):
 
         size = 18
 
-        self.surf = Surface((size, size))
+        self.surf = make_surface((size, size))
         self.surf.fill(inv_color)
         self.rect = draw.circle(surface=self.surf, color=color, center=(size/2, size/2), radius=size/2)
         self.rect.center = position
@@ -0,0 +1,201 @@
+"""
+Map preview thumbnails for the online library.
+Thumbnails are loaded and downscaled on the network loop, kept in a small in-memory LRU
+and persisted as PNG in a size-bounded on-disk LRU below the writeable path.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union
+
+from pygame import Surface, SRCALPHA, image, error
+
+from game.config import DATASETS_DOWNLOAD_URL, HTTP_TIMEOUT
+from game.updates import network
+from game.utils import aspect_scale, rel_to_root, rel_to_writable, writeable_path, lazy_import
+
+requests = lazy_import("requests")
+
+__all__ = ["PreviewCache", "PREVIEW_SIZE"]
+
+PREVIEW_SIZE = (280, 180)
+MEMORY_ITEMS = 32
+DISK_BYTES = 16 * 1024 * 1024
+
+preview_path = writeable_path.joinpath(Path("cache/previews"))
+
+
+class PreviewCache:
+    def __init__(self, size: tuple = PREVIEW_SIZE, memory_items: int = MEMORY_ITEMS, disk_bytes: int = DISK_BYTES,
+                 token: network.CancelToken = None):
+        """
+        :param size: bounding box of the thumbnails
+        :param memory_items: thumbnails kept in memory
+        :param disk_bytes: size limit of the on-disk cache
+        :param token: CancelToken of the owning scene, stops pending loads
+        """
+        self.size = size
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.token = token if token is not None else network.new_token()
+
+        self._memory = OrderedDict()  # {image_path: Surface}
+        self._pending = {}  # {image_path: NetworkTask}
+
+    def get(self, image_path: str) -> Union[Surface, None]:
+        """
+        :param image_path: image_path of the level
+        :return: thumbnail if already loaded, else None
+        """
+        surf = self._memory.get(image_path, None)
+        if surf is not None:
+            self._memory.move_to_end(image_path)
+        return surf
+
+    def request(self, image_path: str):
+        """
+        Schedules loading of a thumbnail if it is neither loaded nor pending
+        :param image_path: image_path of the level
+        :return:
+        """
+        if image_path in self._memory or image_path in self._pending or self.token.cancelled:
+            return
+        self._pending[image_path] = network.submit(self._load, image_path, token=self.token)
+
+    def prefetch(self, image_paths: list):
+        """
+        :param image_paths: image paths in order of priority
+        :return:
+        """
+        for image_path in image_paths:
+            self.request(image_path)
+
+    def poll(self) -> set:
+        """
+        Moves finished loads into the memory LRU, call once per frame from the main thread
+        :return: image paths that became available
+        """
+        finished = set()
+        for image_path, task in list(self._pending.items()):
+            if not task.done():
+                continue
+            del self._pending[image_path]
+            if task.cancelled():
+                continue
+            surf = task.result()
+            if surf is None:
+                continue
+
+            self._memory[image_path] = surf
+            self._memory.move_to_end(image_path)
+            finished.add(image_path)
+
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+        return finished
+
+    def _disk_file(self, image_path: str) -> Path:
+        key = hashlib.sha1(image_path.encode("utf-8")).hexdigest()
+        width, height = self.size
+        return preview_path.joinpath(f"{key}_{width}x{height}.png")
+
+    def _load(self, image_path: str) -> Union[Surface, None]:
+        """
+        Runs on a network worker: disk cache, then local map, then download
+        :param image_path:
+        :return: thumbnail or None if unavailable
+        """
+        disk_file = self._disk_file(image_path)
+        try:
+            if disk_file.exists():
+                try:
+                    # touch for LRU eviction
+                    os.utime(disk_file)
+                    return image.load(str(disk_file))
+                except (OSError, error) as e:
+                    # evicted meanwhile or unreadable, the thumbnail is made again
+                    print(f"Cached preview of {image_path} unusable: {e}")
+                    self._unlink(disk_file)
+
+            full = None
+            for local in (Path(rel_to_root(f"resources/textures/{image_path}")),
+                          Path(rel_to_writable(f"textures/{image_path}"))):
+                if local.exists():
+                    full = image.load(str(local))
+                    break
+
+            if full is None:
+                self.token.raise_if_cancelled()
+                name = Path(image_path).name
+                response = requests.get(DATASETS_DOWNLOAD_URL + name, timeout=HTTP_TIMEOUT)
+                if not 200 <= response.status_code < 300:
+                    return None
+                full = image.load(io.BytesIO(response.content), name)
+
+            if full.get_bitsize() < 32:
+                # smoothscale refuses palettised images
+                expanded = Surface(full.get_size(), SRCALPHA, 32)
+                expanded.blit(full, (0, 0))
+                full = expanded
+            thumbnail = aspect_scale(full, self.size, smooth=True)
+            del full
+
+            self._store(thumbnail, disk_file)
+            return thumbnail
+
+        except (requests.Timeout, requests.ConnectionError, OSError, ValueError, error) as e:
+            print(f"Preview of {image_path} unavailable: {e}")
+            return None
+
+    def _store(self, thumbnail: Surface, disk_file: Path):
+        """
+        Persists thumbnail, the disk cache is best effort and a failure keeps the thumbnail in memory only
+        :param thumbnail:
+        :param disk_file: written through a temporary file, so quitting while saving never leaves a truncated one
+        :return:
+        """
+        try:
+            preview_path.mkdir(exist_ok=True, parents=True)
+            handle, tmp = tempfile.mkstemp(prefix=disk_file.stem, suffix=".part", dir=preview_path)
+            try:
+                with os.fdopen(handle, "wb") as file:
+                    image.save(thumbnail, file, disk_file.name)
+                os.replace(tmp, disk_file)
+            except (OSError, error):
+                self._unlink(Path(tmp))
+                raise
+            self._trim_disk()
+        except (OSError, error) as e:
+            print(f"Preview not cached: {e}")
+
+    @staticmethod
+    def _unlink(file: Path):
+        try:
+            file.unlink()
+        except OSError:
+            pass
+
+    def _trim_disk(self):
+        files = []
+        for file in preview_path.glob("*.png"):
+            try:
+                stat = file.stat()
+            except OSError:
+                # removed by a parallel load
+                continue
+            files.append((stat.st_mtime, stat.st_size, file))
+        total = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                # removed by a parallel load
+                pass
+            except OSError:
+                continue
+            total -= size
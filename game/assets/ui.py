@@ -1,36 +1,65 @@
 from typing import Union
 
-import easing_functions
 import pygame
 from pygame import Surface, RLEACCEL
 from pygame.locals import MOUSEMOTION, MOUSEBUTTONDOWN, MOUSEBUTTONUP
 
 import game.assets.color_palette as c
-from game.animations import Blinker
-from game.assets.fonts import text_input_font
+from game.animations import Blinker, FrameStrip, Tween
+from game.assets.fonts import text_input_font, render_text, render_line
+from game.assets.icons import icon
+from game.assets.widgets import Widget
+from game.render_stats import make_surface
 from game.utils import invert_color, aspect_scale
 
-__all__ = ["TextInputBox", "ListView", "ListItem", "Button", "Notification", "LoadingCircleLoop"]
+__all__ = ["TextInputBox", "ListView", "ListItem", "Button", "Notification", "LoadingCircleLoop", "ProgressBar"]
 
+_spinner_strips = {}  # {(radius, width, duration, color): FrameStrip}
 
-class TextInputBox:
-    def __init__(self, pos: tuple, text="", cap: int = None, active: bool = False):
-        self.color = c.bg_title_scene
-        self.text = text
-        self.text_surf, self.text_rect = text_input_font.render(text, c.white)
 
-        self.rect = self.text_rect.copy()
-        self.rect.width = max(200, self.text_surf.get_width() + 10)
-        self.rect.height = self.text_surf.get_height() + 6
-        self.rect.topleft = pos
+class TextInputBox(Widget):
+    opaque = True
 
+    def __init__(self, pos: tuple, text="", cap: int = None, active: bool = False, width: int = 200,
+                 placeholder: str = "", base_color: pygame.Color = c.bg_title_scene,
+                 active_color: pygame.Color = c.lightblue_highlight):
+        """
+        :param pos: topleft
+        :param text: initial text
+        :param cap: maximum length of the text
+        :param active: whether the box initially receives key presses
+        :param width: minimum width, the box grows with the text
+        :param placeholder: shown in place of an empty text while inactive
+        :param base_color: inactive fill
+        :param active_color: active fill
+        """
+        super(TextInputBox, self).__init__()
+        self.base_color = base_color
+        self.active_color = active_color
+        self.color = base_color
+        self.text = text
+        self.min_width = width
+        self.placeholder = placeholder
         self.active = active
+        self.rect = pygame.Rect(pos, (width, text_input_font.get_sized_height() + 6))
+        self._layout()
+
         self.pos = pos
         self.cap = cap
         self.oneshot_rendered = False
         self.orig_state = active
 
+    def _layout(self):
+        # cached, typing only rasterises the appended characters
+        if self.text or self.active or not self.placeholder:
+            self.text_surf, self.text_advance = render_line(text_input_font, self.text, c.white)
+        else:
+            self.text_surf, self.text_advance = render_line(text_input_font, self.placeholder, c.lightblue_highlight)
+        self.text_rect = self.text_surf.get_rect()
+        self.rect.width = max(self.min_width, self.text_advance + 10)
+
     def handle_event(self, event, ctrl_pressed: bool):
+        previous = self.text, self.active
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.rect.collidepoint(event.pos):
                 self.active = True
@@ -38,7 +67,7 @@ class TextInputBox:
                 self.active = False
 
             # lightblue = active color, bgtitle = inactive
-        self.color = c.lightblue_highlight if self.active else c.bg_title_scene
+        self.color = self.active_color if self.active else self.base_color
 
         if event.type == pygame.KEYDOWN:
             if self.active:
@@ -52,18 +81,22 @@ class TextInputBox:
                 elif len(self.text) <= self.cap if self.cap else True:
                     self.text += event.unicode
 
+        if (self.text, self.active) != previous:
+            # the old rect is repainted as well in case the box shrinks
+            self.invalidate()
+            self._layout()
+
     def draw(self, screen: pygame.Surface):
         if not self.oneshot_rendered:
-            self.color = c.lightblue_highlight if self.orig_state else c.bg_title_scene
+            self.color = self.active_color if self.orig_state else self.base_color
             self.oneshot_rendered = True
 
-        # Re-render the text
-        self.text_surf, self.text_rect = text_input_font.render(self.text, c.white)
-        self.rect.width = max(200, self.text_surf.get_width() + 10)
+        self._layout()
         self.rect.topleft = self.pos
 
+        # baseline 32px below the top of the box
         x, y = self.rect.topleft
-        self.text_rect.bottomleft = x + 5, y + 32
+        self.text_rect.topleft = x + 5, y + 32 - text_input_font.get_sized_ascender()
 
         pygame.draw.rect(screen, self.color, self.rect)
         screen.blit(self.text_surf, self.text_rect)
@@ -80,17 +113,15 @@ class ListItem:
         self.hover_color = hover_color
         self.pressed_color = pressed_color
 
-        self.text_surf, self.text_rect = text_input_font.render(text, c.white)
+        self.text_surf, self.text_rect = render_text(text_input_font, self.text, c.white)
 
-        self.surf = pygame.Surface((width, height))
+        self.surf = make_surface((width, height))
         self.surf.fill(self.base_color)
 
         self.text_rect.centery = self.surf.get_height() / 2
         self.text_rect.left = 6
 
         self.max_scroll_offset = self.text_surf.get_width() - width
-        self.blinker = Blinker(0.3, interpolator="SineEaseOut")
-        self.time_passed = 0
 
         self.color = c.bg_listview
 
@@ -108,27 +139,65 @@ class ListItem:
         self.color = self.pressed_color if self.is_clicked else self.color
 
         self.surf.fill(self.color)
-        self.text_surf, _ = text_input_font.render(self.text, c.white)
         self.surf.blit(self.text_surf, self.text_rect)
 
-    def scroll(self, dt):
+    def set_text(self, text: Union[str, None]):
+        """
+        Rebinds the item to another text, used when recycling items
+        :param text:
+        :return:
+        """
+        self.text = text if text is not None else ""
+        self.text_surf, self.text_rect = render_text(text_input_font, self.text, c.white)
+
+        width = self.surf.get_width()
+        self.text_rect.centery = self.surf.get_height() / 2
+        self.text_rect.left = 6
+        self.max_scroll_offset = self.text_surf.get_width() - width
+        self.is_scrollable = self.text_surf.get_width() > width
+        self.reset_scroll()
+
+    def reset_scroll(self):
+        self.text_rect.left = 6
+
+    def scroll(self, value: float):
+        """
+        :param value: marquee position, 0 shows the start of the text
+        :return:
+        """
         if self.is_scrollable:
-            self.blinker.update(dt)
-            self.text_rect.left = -(self.max_scroll_offset + 80) * self.blinker.value
+            self.text_rect.left = -(self.max_scroll_offset + 80) * value
 
 
-class ListView:
+class ListView(Widget):
+    opaque = True
+
     def __init__(self, listview_list: list, item_height: int = 36, item_length: int = 250, height: int = 400,
                  item_margin: int = 10, selection: bool = False, selected_index: Union[int, None] = None,
                  bg_color: pygame.Color = c.bg_game_scene, base_color: pygame.Color = c.bg_listview,
                  hover_color: pygame.Color = c.bg_listview_hovered, pressed_color: pygame.Color = c.bg_button_pressed,
                  vertical_clip_scroll: bool = True):
+        """
+        Virtualized list, only the rows intersecting the viewport exist as ListItems, recycled from a pool.
+        Redraws are change-driven: only rows whose state changed are repainted, scrolling shifts the existing pixels
+        and paints the exposed strip. is_dirty tells whether surf changed since the last draw
+        :param listview_list: texts of the entries
+        :param item_height:
+        :param item_length: width of the list
+        :param height: height of the viewport
+        :param item_margin: vertical space between items
+        :param selection: whether the clicked item stays highlighted
+        :param selected_index: initially selected entry
+        :param vertical_clip_scroll: scroll overlong texts of hovered items
+        """
+        super(ListView, self).__init__()
         self.list = listview_list
 
         self.item_height = item_height
         self.item_length = item_length
         self.height = height
         self.item_margin = item_margin
+        self.row_height = item_height + item_margin
 
         self.bg_color = bg_color
         self.base_color = base_color
@@ -137,159 +206,271 @@ class ListView:
 
         self.selection = selection
         self.selected_index = selected_index
+        self.hovered_index = None
+        self.pressed_index = None
 
-        self.full_height = len(self.list) * (item_height + item_margin)
+        self.full_height = len(self.list) * self.row_height
 
-        self.surf = pygame.Surface((item_length, min(self.full_height, height)))
+        self.surf = make_surface((item_length, min(self.full_height, height)))
         self.rect = self.surf.get_rect()
-        self.full_surf = pygame.Surface((item_length, self.full_height))
-        self.full_rect = self.full_surf.get_rect()
 
         self.item_rect_template = pygame.Rect(0, 0, item_length, item_height)
 
-        self.items = []
-        self.render_list = []
+        self.rows = {}  # {index: ListItem} of the materialized rows
+        self.pool = []  # recycled ListItems
+        self.dirty_rows = set()
 
         self.scroll_offset = 0
         self.max_scroll_offset = self.full_height - height
         self.vertical_scroll = vertical_clip_scroll
+        # only the hovered row scrolls its text, one marquee serves all rows
+        self.marquee = Blinker(0.3, interpolator="SineEaseOut")
 
         self.build_list()
 
-    def handle_input(self, event):
-        items = self.items
-        render_list = self.render_list
+    def index_at(self, pos: tuple) -> Union[int, None]:
+        """
+        :param pos: screen position
+        :return: index of the entry under pos, None if outside or in a margin
+        """
+        if not self.rect.collidepoint(pos):
+            return None
+        y = pos[1] - self.rect.y + self.scroll_offset
+        index = int(y // self.row_height)
+        if y - index * self.row_height >= self.item_height or not 0 <= index < len(self.list):
+            return None
+        return index
+
+    def visible_range(self) -> range:
+        first = int(self.scroll_offset // self.row_height)
+        last = int((self.scroll_offset + self.surf.get_height() - 1) // self.row_height) + 1
+        return range(max(first, 0), min(last, len(self.list)))
+
+    def _is_clicked(self, index: int) -> bool:
+        return index == self.pressed_index or (self.selection and index == self.selected_index)
+
+    def _bind(self, index: int, item: ListItem):
+        item.set_text(self.list[index])
+        item.rect.top = index * self.row_height
+        item.is_hovered = index == self.hovered_index
+        item.is_clicked = self._is_clicked(index)
+        item.draw()
+
+    def _redraw_row(self, index: Union[int, None]):
+        item = self.rows.get(index, None) if index is not None else None
+        if item is None:
+            return
+        item.is_hovered = index == self.hovered_index
+        item.is_clicked = self._is_clicked(index)
+        if not item.is_hovered:
+            item.reset_scroll()
+        item.draw()
+        self.dirty_rows.add(index)
+
+    def _sync_rows(self):
+        """
+        Recycles rows that left the viewport and materializes the ones that entered it
+        :return:
+        """
+        visible = self.visible_range()
+        for index in [index for index in self.rows if index not in visible]:
+            self.pool.append(self.rows.pop(index))
+
+        for index in visible:
+            if index in self.rows:
+                continue
+            if self.pool:
+                item = self.pool.pop()
+            else:
+                item = ListItem(width=self.item_length, height=self.item_height, text="",
+                                rect=self.item_rect_template.copy(), base_color=self.base_color,
+                                hover_color=self.hover_color, pressed_color=self.pressed_color)
+            self._bind(index, item)
+            self.rows[index] = item
 
+    def _compose(self):
+        self.surf.fill(self.bg_color)
+        offset = self.scroll_offset
+        self.surf.blits([(item.surf, (0, item.rect.top - offset)) for item in self.rows.values()], False)
+        self.dirty_rows.clear()
+        self.is_dirty = True
+
+    def _paint_region(self, region: pygame.Rect):
+        """
+        Repaints background and rows within region of surf
+        :param region: area in surf coordinates
+        :return:
+        """
+        offset = self.scroll_offset
+        self.surf.set_clip(region)
+        self.surf.fill(self.bg_color)
+        self.surf.blits([(item.surf, (0, item.rect.top - offset)) for item in self.rows.values()
+                         if region.colliderect((0, item.rect.top - offset, self.item_length, self.item_height))],
+                        False)
+        self.surf.set_clip(None)
+        self.is_dirty = True
+
+    def _paint_dirty_rows(self) -> bool:
+        if not self.dirty_rows:
+            return False
+        offset = self.scroll_offset
+        self.surf.blits([(self.rows[index].surf, (0, self.rows[index].rect.top - offset)) for index in self.dirty_rows
+                         if index in self.rows], False)
+        self.dirty_rows.clear()
+        self.is_dirty = True
+        return True
+
+    def _scroll_by(self, delta: int) -> bool:
+        previous = self.scroll_offset
+        self.scroll_offset = max(0, min(self.scroll_offset + delta, self.max_scroll_offset))
+        delta = self.scroll_offset - previous
+        if delta == 0:
+            return False
+
+        self._sync_rows()
+        width, height = self.surf.get_size()
+        if abs(delta) >= height:
+            self._compose()
+            return True
+
+        # shift the existing pixels, only paint the newly exposed strip
+        self.surf.scroll(0, -delta)
+        if delta > 0:
+            self._paint_region(pygame.Rect(0, height - delta, width, delta))
+        else:
+            self._paint_region(pygame.Rect(0, 0, width, -delta))
+        return True
+
+    def handle_input(self, event):
         must_update = False
         clicked_index = None
         can_scroll = self.full_height > self.height
 
-        if self.vertical_scroll:
-            must_update = True
-
-        x, y = event.pos
-        x -= self.rect.x
-        y -= self.rect.y - self.scroll_offset
-
-        for i, item in enumerate(items):
-            item_must_update = False
-            if event.type == MOUSEMOTION:
-                # hover
-                if item.rect.collidepoint((x, y)) and self.rect.collidepoint(event.pos):
-                    if not item.is_hovered:
-                        item.is_hovered = True
-                        must_update = True
-                        item_must_update = True
-                # un-hover
-                if item.is_hovered and not item.rect.collidepoint((x, y)):
-                    item.text_rect.left = 6
-                    item.blinker.time_passed = 0
-                    item.is_hovered = False
-                    must_update = True
-                    item_must_update = True
-
-            if event.type == MOUSEBUTTONDOWN:
-                # 1 for left click
-                if event.button == 1:
-                    if item.rect.collidepoint((x, y)) and self.rect.collidepoint(event.pos):
-                        clicked_index = i
-                        item.is_clicked = True
-                        item_must_update = True
-                        self.selected_index = i
-                    must_update = True
-
-                # 4 for scroll up
-                if event.button == 4 and can_scroll:
-                    self.scroll_offset -= 15
-                    # clamp
-                    if self.scroll_offset < 0:
-                        self.scroll_offset = 0
-                    must_update = True
-
-                # 5 for scroll down
-                if event.button == 5 and can_scroll:
-                    self.scroll_offset += 15
-                    # clamp
-                    if self.scroll_offset > self.max_scroll_offset:
-                        self.scroll_offset = self.max_scroll_offset
+        if event.type == MOUSEMOTION:
+            index = self.index_at(event.pos)
+            if index != self.hovered_index:
+                previous, self.hovered_index = self.hovered_index, index
+                self.marquee.stop()
+                self._redraw_row(previous)
+                self._redraw_row(index)
+                must_update = True
+
+        elif event.type == MOUSEBUTTONDOWN:
+            # 1 for left click
+            if event.button == 1:
+                index = self.index_at(event.pos)
+                if index is not None:
+                    clicked_index = index
+                    previous, self.selected_index = self.selected_index, index
+                    self.pressed_index = index
+                    self._redraw_row(previous)
+                    self._redraw_row(index)
                     must_update = True
 
-            if event.type == MOUSEBUTTONUP and event.button == 1 and item.is_clicked:
-                if not self.selection:
-                    item.is_clicked = False
-                    item_must_update = True
-                    must_update = True
-                else:
-                    if self.selected_index != i:
-                        item.is_clicked = False
-                        item_must_update = True
-                        must_update = True
+            # 4 for scroll up
+            if event.button == 4 and can_scroll:
+                must_update = self._scroll_by(-15) or must_update
 
-            if item_must_update:
-                item.draw()
-                items[i] = item
-                render_list[i] = item.surf, item.rect
+            # 5 for scroll down
+            if event.button == 5 and can_scroll:
+                must_update = self._scroll_by(15) or must_update
 
-        self.render_list = render_list
-        self.items = items
+        elif event.type == MOUSEBUTTONUP and event.button == 1 and self.pressed_index is not None:
+            released, self.pressed_index = self.pressed_index, None
+            self._redraw_row(released)
+            must_update = True
 
+        self._paint_dirty_rows()
         return must_update, clicked_index
 
     def build_list(self):
-        height = self.item_height
-        width = self.item_length
-        margin = self.item_margin
-        rect_template = self.item_rect_template.copy()
-
-        items = []
-        render_list = []
-        for i, text in enumerate(self.list):
-            rect = rect_template.copy()
-            rect.top += i * (margin + height)
+        for index in list(self.rows):
+            self.pool.append(self.rows.pop(index))
+        self._sync_rows()
+        self._compose()
 
-            item = ListItem(width=width, height=height, text=text, rect=rect, base_color=self.base_color,
-                            hover_color=self.hover_color, pressed_color=self.pressed_color)
+    def extend(self, listview_list: list):
+        """
+        Appends entries, keeping scroll position, hover and selection
+        :param listview_list: texts of the new entries
+        :return:
+        """
+        self.list = self.list + list(listview_list)
+
+        self.full_height = len(self.list) * self.row_height
+        self.max_scroll_offset = self.full_height - self.height
+        resized = self.surf.get_height() != min(self.full_height, self.height)
+        if resized:
+            self.invalidate()
+            self.surf = make_surface((self.item_length, min(self.full_height, self.height)))
+            self.rect.height = self.surf.get_height()
+
+        materialized = set(self.rows)
+        self._sync_rows()
+        if resized:
+            self._compose()
+        else:
+            self.dirty_rows.update(index for index in self.rows if index not in materialized)
+            self._paint_dirty_rows()
 
-            items.append(item)
-            render_list.append((item.surf, item.rect))
+    def set_list(self, listview_list: list, selected_index: Union[int, None] = None):
+        """
+        Replaces the entries, e.g. with search results, and scrolls back to the top
+        :param listview_list: texts of the entries
+        :param selected_index: entry to highlight in the new list
+        :return:
+        """
+        self.invalidate()
+        self.list = list(listview_list)
+        self.selected_index = selected_index
+        self.hovered_index = None
+        self.pressed_index = None
 
-        self.items = items
-        self.render_list = render_list
+        self.full_height = len(self.list) * self.row_height
+        self.max_scroll_offset = self.full_height - self.height
+        self.scroll_offset = 0
+        if self.surf.get_height() != min(self.full_height, self.height):
+            self.surf = make_surface((self.item_length, min(self.full_height, self.height)))
+            self.rect.height = self.surf.get_height()
+        self.build_list()
 
-        self.full_surf.fill(self.bg_color)
-        self.full_surf.blits(render_list, False)  # noqa
-        self.full_rect.top = -self.scroll_offset
+    def is_near_end(self, margin: int = None) -> bool:
+        """
+        :param margin: distance in pixels to the end of the list, defaults to the visible height
+        :return: whether the viewport is scrolled to within margin of the end
+        """
+        margin = self.height if margin is None else margin
+        return self.scroll_offset + self.height >= self.full_height - margin
 
-        self.surf.blit(self.full_surf, self.full_rect)
+    def update(self, dt) -> bool:
+        """
+        Applies the scroll marquee to the hovered item and repaints changed rows
+        :param dt:
+        :return: whether surf changed
+        """
+        item = self.rows.get(self.hovered_index, None) if self.hovered_index is not None else None
+        if self.vertical_scroll and item is not None and item.is_scrollable:
+            self.marquee.play()
+            item.scroll(self.marquee.value)
+            item.draw()
+            self.dirty_rows.add(self.hovered_index)
+        else:
+            self.marquee.stop()
 
-    def update(self, dt):
-        # self.surf.fill(pygame.Color(255, 74, 74))
-        must_update = False
-        if self.vertical_scroll:
-            item_must_update = False
-            for i, item in enumerate(self.items):
-                if item.is_hovered:
-                    item_must_update = True
-                    item.scroll(dt)
-                if item_must_update:
-                    item.draw()
-                    self.items[i] = item
-                    self.render_list[i] = item.surf, item.rect
-
-        self.full_surf.fill(self.bg_color)
-        self.full_surf.blits(self.render_list, False)
-        self.full_rect.top = -self.scroll_offset
-        self.surf.blit(self.full_surf, self.full_rect)
-        return must_update
+        return self._paint_dirty_rows()
 
     def draw(self, screen: pygame.Surface):
         screen.blit(self.surf, self.rect)
+        self.is_dirty = False
+
 
+class Button(Widget):
+    opaque = True
 
-class Button:
     def __init__(self, pos: tuple, size: tuple, text="", base_color: pygame.Color = c.bg_listview,
                  hover_color: pygame.Color = c.bg_listview_hovered, pressed_color: pygame.Color = c.bg_button_pressed,
-                 text_color: pygame.Color = c.white, logo_surf: Surface = None, logo_margin: tuple = None):
+                 text_color: pygame.Color = c.white, logo_surf: Surface = None, logo_margin: tuple = None,
+                 logo: str = None):
         """
         A button
         :param pos:
@@ -299,12 +480,14 @@ class Button:
         :param hover_color:
         :param pressed_color:
         :param text_color:
-        :param logo_surf:
+        :param logo_surf: scaled to fit between the margins
         :param logo_margin: top right bottom left
+        :param logo: name of a UI icon, drawn pre-scaled from the icon atlas instead of logo_surf
         """
+        super(Button, self).__init__()
         self.size = size
         self.text = text
-        self.surf = pygame.Surface(size)
+        self.surf = make_surface(size)
         self.rect = self.surf.get_rect()
         self.logo_surf = logo_surf
         if logo_margin is not None:
@@ -319,13 +502,16 @@ class Button:
 
         self.color = self.base_color
 
-        self.text_surf, self.text_rect = text_input_font.render(text, self.text_color)
-        if logo_surf is not None:
+        self.text_surf, self.text_rect = render_text(text_input_font, text, self.text_color)
+        if logo_surf is not None or logo is not None:
             x, y = size
             top, right, bottom, left = self.logo_margin
             x -= right + left
             y -= top + bottom
-            self.logo_surf = aspect_scale(logo_surf, (x, y), smooth=True)
+            if logo is not None:
+                self.logo_surf = icon(logo, (x, y))
+            else:
+                self.logo_surf = aspect_scale(logo_surf, (x, y), smooth=True)
 
             self.text_rect.left = self.logo_surf.get_width() + right + left
             self.text_rect.centery = self.rect.centery
@@ -336,9 +522,11 @@ class Button:
         self.must_update = False
         self.is_hovered = False
         self.is_clicked = False
+        self._drawn_color = None
 
     def handle_input(self, event) -> bool:
         collides = self.rect.collidepoint(event.pos)
+        previous = self.is_hovered, self.is_clicked
 
         if event.type == MOUSEMOTION:
             if collides and not self.is_hovered:
@@ -361,16 +549,21 @@ class Button:
             self.is_clicked = False
             self.must_update = True
 
+        if (self.is_hovered, self.is_clicked) != previous:
+            self.is_dirty = True
         return self.must_update
 
     def draw(self, screen: pygame.Surface):
-        self.color = self.hover_color if self.is_hovered else self.base_color
-        self.color = self.pressed_color if self.is_clicked else self.color
+        color = self.hover_color if self.is_hovered else self.base_color
+        color = self.pressed_color if self.is_clicked else color
 
-        self.surf.fill(self.color)
-        if self.logo_surf is not None:
-            self.surf.blit(self.logo_surf, (self.logo_margin[3], self.logo_margin[0]))
-        self.surf.blit(self.text_surf, self.text_rect)
+        # the surface is kept until the state changes, repaints of overlapping regions only blit
+        if color != self._drawn_color:
+            self.color = self._drawn_color = color
+            self.surf.fill(self.color)
+            if self.logo_surf is not None:
+                self.surf.blit(self.logo_surf, (self.logo_margin[3], self.logo_margin[0]))
+            self.surf.blit(self.text_surf, self.text_rect)
 
         screen.blit(self.surf, self.rect)
 
@@ -384,39 +577,103 @@ class Notification:
         #
 
 
-class LoadingCircleLoop:
+class LoadingCircleLoop(Widget):
     def __init__(self, radius: int = 120, width: int = 40, duration: float = 1, color: pygame.Color = c.blue_highlight):
+        """
+        Pulsating ring, its frames are baked once per look and shared by all spinners with the same parameters
+        :param radius: outer radius at the end of the pulse
+        :param width: width of the ring
+        :param duration: seconds from the smallest to the largest ring
+        :param color:
+        """
+        super(LoadingCircleLoop, self).__init__()
         self.radius = radius
         self.duration = duration
         self.width = width
         self.size = 2 * self.radius
         self.color = color
         self.bg_color = invert_color(color)
+        self.tween = Tween(duration, "QuadEaseOut", start=self.width / 3 * 2, end=self.radius, turn=duration,
+                           loop=True)
+
+        key = (radius, width, duration, tuple(pygame.Color(color)))
+        if key not in _spinner_strips:
+            _spinner_strips[key] = FrameStrip(self._render_frame, duration)
+        self.strip = _spinner_strips[key]
+        self.frame_index = 0
+        self.surf = self.strip.frames[0]
+        self.rect = self.surf.get_rect()
 
-        self.surf = Surface((self.size, self.size))
-        self.surf.set_colorkey(self.bg_color, RLEACCEL)
+    @Widget.visible.setter
+    def visible(self, visible: bool):
+        Widget.visible.fset(self, visible)
+        if not visible:
+            self.tween.stop()
+
+    def _render_frame(self, time: float) -> Surface:
+        radius = self.tween.ease(time)
+        # two colours, an 8 bit surface keeps the strip small
+        surf = make_surface((self.size, self.size), depth=8)
+        surf.set_palette([self.bg_color, self.color])
+        surf.fill(self.bg_color)
+        pygame.draw.circle(surf, self.color, center=(self.size / 2, self.size / 2), radius=radius, width=self.width)
+        surf.set_colorkey(self.bg_color, RLEACCEL)
+        return surf
 
-        self.time_passed = 0
-        self.forward = True
+    def update(self, dt):
+        """
+        Shows the frame of the running tween, starts it on the first call. Hiding the spinner stops it
+        :param dt:
+        :return:
+        """
+        self.tween.play()
+        index = self.strip.index(self.tween.time_passed)
+        if index != self.frame_index:
+            self.frame_index = index
+            self.surf = self.strip.frames[index]
+            self.is_dirty = True
+
+    def draw(self, screen: pygame.Surface = None):
+        """
+        :param screen: if given, the current frame is blitted onto it at rect
+        :return:
+        """
+        if screen is not None:
+            screen.blit(self.surf, self.rect)
 
-        self.interpolator = easing_functions.QuadEaseOut(start=self.width / 3 * 2, end=self.radius,
-                                                         duration=self.duration)
 
-    def update(self, dt):
-        if self.time_passed > self.duration:
-            self.forward = False
-        elif self.time_passed < 0:
-            self.forward = True
+class ProgressBar(Widget):
+    opaque = True
 
-        if self.forward:
-            self.time_passed += dt
-        else:
-            self.time_passed -= dt
+    def __init__(self, size: tuple = (200, 10), color: pygame.Color = c.blue_highlight,
+                 bg_color: pygame.Color = c.bg_listview):
+        """
+        Horizontal progress bar
+        :param size: width, height
+        :param color: color of the filled part
+        :param bg_color: color of the remaining part
+        """
+        super(ProgressBar, self).__init__()
+        self.color = color
+        self.bg_color = bg_color
+        self.surf = make_surface(size)
+        self.rect = self.surf.get_rect()
+        self.value = 0
 
-        self.radius = self.interpolator.ease(self.time_passed)
+    def update(self, value: float):
+        """
+        :param value: progress from 0 to 1
+        :return:
+        """
+        value = max(0.0, min(1.0, value))
+        if value != self.value:
+            self.value = value
+            self.is_dirty = True
 
-    def draw(self):
+    def draw(self, screen: pygame.Surface):
+        width, height = self.surf.get_size()
         self.surf.fill(self.bg_color)
-
-        pygame.draw.circle(self.surf, self.color, center=(self.size / 2, self.size / 2), radius=self.radius,
-                           width=self.width)
+        filled = int(width * self.value)
+        if filled > 0:
+            pygame.draw.rect(self.surf, self.color, (0, 0, filled, height))
+        screen.blit(self.surf, self.rect)
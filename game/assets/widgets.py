@@ -0,0 +1,244 @@
+"""
+Retained-mode UI layer.
+Widgets live in a WidgetTree and set is_dirty when their appearance changes. On render the tree collects the
+dirty widgets and damaged regions, merges them and repaints only those regions: the static background first, then
+every visible widget overlapping the region in tree order. Regions covered by an opaque widget skip everything
+below it.
+"""
+from typing import Union
+
+import pygame
+from pygame import Surface, Rect
+
+from game.assets.fonts import render_text
+from game.config import SCREEN_WIDTH, SCREEN_HEIGHT
+from game.render_stats import render_stats, make_surface
+
+__all__ = ["Widget", "Group", "WidgetTree", "Label", "Picture"]
+
+
+class Widget:
+    opaque = False  # draw() covers its whole rect with opaque pixels
+
+    def __init__(self):
+        """
+        Base of retained widgets, subclasses provide rect and draw(screen)
+        """
+        self.is_dirty = True
+        self.damage = []  # screen regions to repaint besides rect, e.g. where the widget has been before
+        self._visible = True
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        if visible != self._visible:
+            self.invalidate()
+            self._visible = visible
+
+    def invalidate(self, rect: Union[Rect, tuple] = None):
+        """
+        Schedules a repaint of rect, call before moving or resizing the widget
+        :param rect: screen region, defaults to the widget's rect
+        :return:
+        """
+        self.damage.append(Rect(self.rect if rect is None else rect))
+        self.is_dirty = True
+
+    def draw(self, screen: Surface):
+        raise NotImplementedError
+
+
+class Group(Widget):
+    def __init__(self, *widgets: Widget):
+        """
+        Widgets that are shown and hidden together
+        :param widgets: children in drawing order
+        """
+        super(Group, self).__init__()
+        self.children = []
+        for widget in widgets:
+            self.add(widget)
+
+    @property
+    def rect(self) -> Rect:
+        rects = [child.rect for child in self.children]
+        if not rects:
+            return Rect(0, 0, 0, 0)
+        return rects[0].unionall(rects[1:])
+
+    def add(self, widget: Widget) -> Widget:
+        """
+        :param widget: drawn above the present children
+        :return: widget
+        """
+        self.children.append(widget)
+        widget.is_dirty = True
+        return widget
+
+    def remove(self, widget: Widget):
+        if widget in self.children:
+            self.children.remove(widget)
+            self.invalidate(widget.rect)
+
+    def draw(self, screen: Surface):
+        for child in self.children:
+            if child.visible:
+                child.draw(screen)
+
+
+class WidgetTree(Group):
+    def __init__(self, bg_color: pygame.Color, size: tuple = (SCREEN_WIDTH, SCREEN_HEIGHT)):
+        """
+        Root of a scene's widgets
+        :param bg_color: fill of the background
+        :param size: size of the screen
+        """
+        super(WidgetTree, self).__init__()
+        # static decorations (titles, lines) are drawn onto the background once
+        self.background = make_surface(size)
+        self.background.fill(bg_color)
+
+        self.regions = []  # regions repainted by the last render
+        self._target = None
+        self._full = True
+
+    def invalidate(self, rect: Union[Rect, tuple] = None):
+        """
+        :param rect: screen region to repaint, None repaints everything
+        :return:
+        """
+        if rect is None:
+            self._full = True
+        else:
+            self.damage.append(Rect(rect))
+
+    def _collect(self, node: Widget, visible: bool, regions: list, drawables: list):
+        regions.extend(node.damage)
+        node.damage.clear()
+
+        visible = visible and node.visible
+        if isinstance(node, Group):
+            for child in node.children:
+                self._collect(child, visible, regions, drawables)
+        elif visible:
+            drawables.append(node)
+            if node.is_dirty:
+                regions.append(Rect(node.rect))
+
+    @staticmethod
+    def _merge(regions: list, bounds: Rect) -> list:
+        merged = []
+        for region in regions:
+            region = region.clip(bounds)
+            if region.width <= 0 or region.height <= 0:
+                continue
+            i = 0
+            while i < len(merged):
+                if merged[i].colliderect(region):
+                    region.union_ip(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(region)
+        return merged
+
+    def render(self, screen: Surface) -> list:
+        """
+        Repaints the damaged regions of screen
+        :param screen: target, rendering to another surface than last time repaints everything
+        :return: list of repainted Rects
+        """
+        regions = []
+        drawables = []
+        self._collect(self, True, regions, drawables)
+
+        bounds = screen.get_rect()
+        if self._full or screen is not self._target:
+            self._full = False
+            self._target = screen
+            regions = [bounds]
+        regions = self._merge(regions, bounds)
+
+        clip = screen.get_clip()
+        for region in regions:
+            overlapping = [widget for widget in drawables if widget.rect.colliderect(region)]
+            # start at the topmost opaque widget covering the whole region, everything below is hidden
+            start = 0
+            for i in range(len(overlapping) - 1, -1, -1):
+                if overlapping[i].opaque and overlapping[i].rect.contains(region):
+                    start = i
+                    break
+            else:
+                overlapping.insert(0, None)
+
+            screen.set_clip(region)
+            for widget in overlapping[start:]:
+                if widget is None:
+                    screen.blit(self.background, region, region)
+                else:
+                    with render_stats.scope(type(widget).__name__):
+                        widget.draw(screen)
+        screen.set_clip(clip)
+
+        for widget in drawables:
+            widget.is_dirty = False
+        self.regions = regions
+        return regions
+
+
+class Label(Widget):
+    def __init__(self, text: str, font, color: pygame.Color, pos: tuple = (0, 0), anchor: str = "topleft"):
+        """
+        Single line of text
+        :param text:
+        :param font: freetype Font
+        :param color:
+        :param pos: position of anchor
+        :param anchor: Rect attribute pos refers to
+        """
+        super(Label, self).__init__()
+        self.text = text
+        self.font = font
+        self.color = color
+        self.anchor = anchor
+        self.surf, self.rect = render_text(font, text, color)
+        setattr(self.rect, anchor, pos)
+
+    def set_text(self, text: str, color: pygame.Color = None):
+        color = self.color if color is None else color
+        if text == self.text and color == self.color:
+            return
+        pos = getattr(self.rect, self.anchor)
+        self.invalidate()
+        self.text = text
+        self.color = color
+        self.surf, self.rect = render_text(self.font, text, color)
+        setattr(self.rect, self.anchor, pos)
+
+    def draw(self, screen: Surface):
+        screen.blit(self.surf, self.rect)
+
+
+class Picture(Widget):
+    def __init__(self, surf: Surface, pos: tuple = (0, 0), opaque: bool = True):
+        """
+        Blits a surface, call invalidate() after drawing onto it
+        :param surf:
+        :param pos: topleft
+        :param opaque: surf has neither per-pixel alpha nor colorkey
+        """
+        super(Picture, self).__init__()
+        self.surf = surf
+        self.rect = surf.get_rect(topleft=pos)
+        self.opaque = opaque
+
+    def set_surf(self, surf: Surface):
+        self.invalidate()
+        self.surf = surf
+        self.rect = surf.get_rect(topleft=self.rect.topleft)
+
+    def draw(self, screen: Surface):
+        screen.blit(self.surf, self.rect)
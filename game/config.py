@@ -6,8 +6,15 @@ SCREEN_WIDTH = 1400
 SCREEN_HEIGHT = 900
 
 FPS = 165
+ANIMATION_SAMPLE_RATE = 60  # frames per second baked into FrameStrips
 
 SHOW_FPS = False
+SHOW_AUDIO_LATENCY = False  # print the click to sound latency on exit
+SHOW_STARTUP_TIMELINE = False  # print the cold start timeline once the game takes input
+SHOW_RENDER_STATS = False  # count drawing per scene and widget from the start, F9 toggles it at runtime
+RENDER_STATS_INTERVAL = 5  # seconds between render stats reports
+PROFILE_CAPTURE = "600"  # frames, or seconds like "10s", profiled after pressing F10
+TRACK_MEMORY = False  # report memory at every scene switch, slow, also enabled by TOPOLOCO_TRACK_MEMORY=1
 
 UPDATE_FETCHING_TYPE_VERSION = "0.1"
 
@@ -15,6 +22,8 @@ UPDATE_URL = "https://theswampire.ddns.net/topoloco/update"
 DATASETS_DOWNLOAD_URL = "https://theswampire.ddns.net/download/topoloco_datasets/"
 APP_DOWNLOAD_URL = "https://theswampire.ddns.net/download/apps/"
 
+HTTP_TIMEOUT = (5, 20)  # connect, read in seconds
+
 GITHUB_LINK = "https://github.com/theswampire/TopoLoco"
 HOMEPAGE_LINK = "https://theswampire.ddns.net/topoloco/"
 HOMEPAGE_INFO_LINK = "https://theswampire.ddns.net/info"
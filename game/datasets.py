@@ -8,10 +8,11 @@ from pathlib import Path
 
 from game.utils import rel_to_root, rel_to_writable
 
-__all__ = ["DATASET_PATH_LIST", "load_datasets", "DATASET_INFO"]
+__all__ = ["DATASET_PATH_LIST", "load_datasets", "DATASET_INFO", "WARM"]
 
 DATASET_PATH_LIST = []
 DATASET_INFO = []
+WARM = False  # loaded by the warm-up and unchanged since, the level selection uses the lists instead of loading them
 
 
 def load_datasets() -> list:
@@ -24,6 +25,8 @@ def load_datasets() -> list:
     infos = []
     global DATASET_PATH_LIST
     global DATASET_INFO
+    global WARM
+    WARM = False
 
     for b, custom in zip_longest(Path(rel_to_root("data/")).iterdir(), Path(rel_to_writable("data/")).iterdir()):
         if b is not None and b.suffix == ".json":
@@ -42,7 +45,9 @@ def load_datasets() -> list:
                 "categories": dataset.get("categories", "unknown"),
                 "image_path": dataset.get("image_path", "undefinedimage.png"),
                 "filename": path.name,
-                "path": path
+                "path": path,
+                "location_names": [name for locations in dataset.get("locations", {}).values()
+                                   for name in locations]
             }
             infos.append(info)
     DATASET_INFO = infos
@@ -0,0 +1,39 @@
+"""
+Measurements of the running game, printed to the console when enabled in config.py
+"""
+import time
+
+__all__ = ["StartupTimeline", "startup"]
+
+
+class StartupTimeline:
+    def __init__(self, start: float = None):
+        """
+        Named points in time of the cold start, each recorded once
+        :param start: perf_counter() of the start, defaults to now
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []  # [(name, perf_counter()), ...]
+
+    def mark(self, name: str):
+        """
+        Records name at the current time, repeated marks of the same name are ignored
+        :param name:
+        :return:
+        """
+        if not self.has(name):
+            self.marks.append((name, time.perf_counter()))
+
+    def has(self, name: str) -> bool:
+        return any(mark == name for mark, _ in self.marks)
+
+    def report(self) -> str:
+        lines = ["Startup timeline:"]
+        previous = self.start
+        for name, at in self.marks:
+            lines.append(f"  {name:<24} +{(at - previous) * 1000:>7.1f}ms  {(at - self.start) * 1000:>7.1f}ms")
+            previous = at
+        return "\n".join(lines)
+
+
+startup = StartupTimeline()
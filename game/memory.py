@@ -0,0 +1,214 @@
+"""
+Memory tracking across scene transitions, for finding what creeps over a long session.
+While enabled, every SwitchToScene runs a garbage collection and then records:
+- Python memory traced by tracemalloc, the growth since the last switch is attributed to the scene that was left
+- live Surfaces and their pixel bytes, SDL allocates those outside of tracemalloc
+- scenes and their widgets still alive two switches after they were left, with the types of their referrers
+A report is printed at every switch and a summary on exit.
+
+Import using from game.memory import memory_tracker
+"""
+import gc
+import sys
+import tracemalloc
+import types
+import weakref
+
+from pygame import Surface
+
+from game.assets.widgets import Widget, Group
+
+__all__ = ["MemoryTracker", "memory_tracker", "live_surfaces"]
+
+TRACE_FRAMES = 1  # call stack depth recorded per allocation, deeper stacks make every switch slower
+TOP_SITES = 5  # allocation sites with the most growth listed per switch
+GRACE_SWITCHES = 2  # a fader keeps the left scene until the following switch
+MAX_SCAN = 50000  # objects visited per scene when collecting its surfaces
+
+# not followed when collecting the surfaces of a scene
+_SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.FrameType,
+                  types.CodeType, weakref.ReferenceType)
+
+
+def _surface_bytes(surf: Surface) -> int:
+    # subsurfaces share the pixels of their parent
+    return 0 if surf.get_parent() is not None else surf.get_height() * surf.get_pitch()
+
+
+def live_surfaces() -> tuple:
+    """
+    Surfaces referenced by any Python object, Surfaces aren't tracked by the garbage collector themselves
+    :return: number, bytes of pixels
+    """
+    seen = {}
+    for obj in gc.get_objects():
+        for referent in gc.get_referents(obj):
+            if isinstance(referent, Surface):
+                seen[id(referent)] = referent
+    return len(seen), sum(_surface_bytes(surf) for surf in seen.values())
+
+
+def _name(obj) -> str:
+    return type(obj).__name__
+
+
+def _referrer_name(referrer) -> str:
+    # a local variable is more telling with the function holding it
+    if isinstance(referrer, types.FrameType):
+        return f"{referrer.f_code.co_name}()"
+    return _name(referrer)
+
+
+class MemoryTracker:
+    def __init__(self):
+        """
+        Off until enable(), SceneBase.SwitchToScene reports to it
+        """
+        self.enabled = False
+        self.switches = 0
+        self.retained = {}  # {scene class: [traced bytes grown while it was active, visits]}
+        self._snapshot = None
+        self._traced = 0
+        self._left = []  # [(weakref, description, switch it was left at)]
+        self._flagged = set()  # descriptions of reported survivors
+
+    def enable(self):
+        """
+        Starts tracemalloc, allocations from before are not traced
+        :return:
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        tracemalloc.start(TRACE_FRAMES)
+        self._snapshot = self._take_snapshot()
+        self._traced = tracemalloc.get_traced_memory()[0]
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        tracemalloc.stop()
+        self._snapshot = None
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def _watch(self, scene):
+        """
+        Remembers scene and the widgets it holds, they should be collected after GRACE_SWITCHES
+        """
+        scene_name = _name(scene)
+        watched = [(scene, scene_name)]
+        stack = [(f"{scene_name}.{attribute}", value) for attribute, value in vars(scene).items()]
+        while stack:
+            description, value = stack.pop()
+            if isinstance(value, Widget):
+                watched.append((value, f"{description} ({_name(value)})"))
+                if isinstance(value, Group):
+                    stack.extend((f"{description}[{i}]", child) for i, child in enumerate(value.children))
+            elif isinstance(value, (list, tuple)):
+                stack.extend((f"{description}[{i}]", item) for i, item in enumerate(value))
+        for obj, description in watched:
+            try:
+                self._left.append((weakref.ref(obj), description, self.switches))
+            except TypeError:
+                pass
+
+    def _survivors(self) -> list:
+        """
+        :return: [(description, switches since it was left, referrer types)] of newly found survivors
+        """
+        found = []
+        alive = []
+        this_frame = sys._getframe()
+        for ref, description, switch in self._left:
+            obj = ref()
+            if obj is None:
+                continue
+            alive.append((ref, description, switch))
+            age = self.switches - switch
+            if age >= GRACE_SWITCHES and description not in self._flagged:
+                self._flagged.add(description)
+                referrers = sorted({_referrer_name(referrer) for referrer in gc.get_referrers(obj)
+                                    if referrer is not this_frame})
+                found.append((description, age, referrers))
+        self._left = alive
+        return found
+
+    @staticmethod
+    def scene_surfaces(scene) -> tuple:
+        """
+        Surfaces reachable from scene, shared ones count for every scene holding them
+        :param scene:
+        :return: number, bytes of pixels
+        """
+        seen = {id(scene)}
+        surfaces = {}
+        stack = [scene]
+        visited = 0
+        while stack and visited < MAX_SCAN:
+            obj = stack.pop()
+            visited += 1
+            for referent in gc.get_referents(obj):
+                if id(referent) in seen or isinstance(referent, _SKIPPED_TYPES):
+                    continue
+                seen.add(id(referent))
+                if isinstance(referent, Surface):
+                    surfaces[id(referent)] = referent
+                # other scenes are reported on their own
+                elif not (hasattr(referent, "SwitchToScene") and hasattr(referent, "next")):
+                    stack.append(referent)
+        return len(surfaces), sum(_surface_bytes(surf) for surf in surfaces.values())
+
+    def scene_switched(self, old_scene, new_scene) -> str:
+        """
+        Call from SwitchToScene
+        :param old_scene: scene that is left
+        :param new_scene: scene switched to, None when quitting
+        :return: report of the switch
+        """
+        self.switches += 1
+        gc.collect()
+
+        snapshot = self._take_snapshot()
+        traced = tracemalloc.get_traced_memory()[0]
+        grown = traced - self._traced
+        retained = self.retained.setdefault(_name(old_scene), [0, 0])
+        retained[0] += grown
+        retained[1] += 1
+
+        surface_count, surface_bytes = live_surfaces()
+        own_count, own_bytes = self.scene_surfaces(old_scene)
+        lines = [f"Memory at switch {self.switches}, {_name(old_scene)} -> {_name(new_scene)}: "
+                 f"traced {traced / 2 ** 20:.2f} MiB ({grown / 2 ** 20:+.2f}), "
+                 f"{surface_count} surfaces {surface_bytes / 2 ** 20:.2f} MiB, "
+                 f"{_name(old_scene)} reaches {own_count} surfaces {own_bytes / 2 ** 20:.2f} MiB"]
+        for stat in snapshot.compare_to(self._snapshot, "lineno")[:TOP_SITES]:
+            if stat.size_diff > 0:
+                lines.append(f"  {stat.size_diff / 1024:+9.1f} KiB  {stat.traceback[0]}")
+
+        for description, age, referrers in self._survivors():
+            lines.append(f"  survived {age} switches: {description}, held by {', '.join(referrers) or 'nothing'}")
+
+        self._watch(old_scene)
+        self._snapshot = snapshot
+        self._traced = traced
+        return "\n".join(lines)
+
+    def report(self) -> str:
+        """
+        :return: traced growth per scene class, largest first
+        """
+        lines = [f"Memory over {self.switches} switches, traced growth while a scene was active:"]
+        for name, (grown, visits) in sorted(self.retained.items(), key=lambda item: -item[1][0]):
+            lines.append(f"  {grown / 2 ** 20:+8.2f} MiB over {visits} visits  {name}")
+        lines.append(f"  {len(self._flagged)} scene attributes survived their scene")
+        return "\n".join(lines)
+
+
+memory_tracker = MemoryTracker()
@@ -0,0 +1,91 @@
+"""
+Profile captures of the main loop, started with a hotkey or the TOPOLOCO_PROFILE environment variable.
+A capture runs cProfile for a number of frames or seconds and writes the stats, plus a readable summary, to the
+profiles folder below the writeable path, named after the scene that was active when it started.
+"""
+import time
+from pathlib import Path
+from typing import Union
+
+from game.utils import writeable_path, lazy_import
+
+cProfile = lazy_import("cProfile")
+pstats = lazy_import("pstats")
+
+__all__ = ["ProfileCapture", "capture_length", "start_capture", "profile_path"]
+
+SUMMARY_LINES = 40
+
+profile_path = writeable_path.joinpath(Path("profiles"))
+
+
+def capture_length(text: str) -> tuple:
+    """
+    :param text: number of frames, e.g. "600", or seconds, e.g. "10s"
+    :return: frames or None, seconds or None
+    """
+    text = text.strip().lower()
+    if text.endswith("s"):
+        return None, float(text[:-1])
+    return int(text), None
+
+
+class ProfileCapture:
+    def __init__(self, scene_name: str, frames: int = None, seconds: float = None):
+        """
+        Profiles the calling thread from now on, call frame() once per frame
+        :param scene_name: class name of the active scene, names the files
+        :param frames: stop after this many frames
+        :param seconds: stop after this many seconds
+        """
+        self.scene_name = scene_name
+        self.frames = frames
+        self.seconds = seconds
+
+        self.frame_count = 0
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def frame(self) -> bool:
+        """
+        :return: whether the capture is complete
+        """
+        self.frame_count += 1
+        if self.frames is not None and self.frame_count >= self.frames:
+            return True
+        return self.seconds is not None and time.perf_counter() - self.started >= self.seconds
+
+    def stop(self) -> tuple:
+        """
+        Stops profiling and writes <scene>_<time>.prof and .txt
+        :return: bool (is_successful), string (message)
+        """
+        self.profile.disable()
+        duration = time.perf_counter() - self.started
+        name = f"{self.scene_name}_{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            profile_path.mkdir(exist_ok=True, parents=True)
+            self.profile.dump_stats(str(profile_path.joinpath(f"{name}.prof")))
+            with open(profile_path.joinpath(f"{name}.txt"), "w", encoding="utf-8") as file:
+                file.write(f"{self.scene_name}: {self.frame_count} frames in {duration:.2f}s\n")
+                stats = pstats.Stats(self.profile, stream=file)
+                stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        except OSError as e:
+            print(e)
+            return False, f"Couldn't write profile {name}"
+        return True, f"Profile of {self.frame_count} frames written to {profile_path.joinpath(name)}.prof"
+
+
+def start_capture(scene_name: str, length: str) -> Union[ProfileCapture, None]:
+    """
+    :param scene_name: class name of the active scene
+    :param length: see capture_length()
+    :return: running capture or None if length is invalid
+    """
+    try:
+        frames, seconds = capture_length(length)
+    except ValueError as e:
+        print(e)
+        return None
+    return ProfileCapture(scene_name, frames, seconds)
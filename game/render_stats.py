@@ -0,0 +1,151 @@
+"""
+Render cost accounting.
+While enabled, make_surface() creates CountingSurfaces, which count every blit, fill and the pixels they touch.
+Scenes and widgets allocate their surfaces through it and open scopes around their drawing, so the counts are broken
+down per scene and widget, e.g. "Categories > ListView". Surfaces created before enabling, cached assets and drawing
+of other threads are not counted.
+"""
+import contextlib
+import threading
+
+import pygame
+
+__all__ = ["RenderStats", "render_stats", "CountingSurface", "make_surface", "BLITS", "PIXELS", "FILLS", "SURFACES",
+           "SURFACE_BYTES", "TEXTS"]
+
+# columns of RenderStats counts
+BLITS, PIXELS, FILLS, SURFACES, SURFACE_BYTES, TEXTS = range(6)
+
+
+class CountingSurface(pygame.Surface):
+    """
+    Surface that reports its allocation and what is drawn onto it to render_stats.
+    While render accounting is on, make_surface() creates these instead of plain Surfaces
+    """
+    def __init__(self, *args, **kwargs):
+        super(CountingSurface, self).__init__(*args, **kwargs)
+        render_stats.add(SURFACES)
+        render_stats.add(SURFACE_BYTES, self.get_height() * self.get_pitch())
+
+    def blit(self, *args, **kwargs) -> pygame.Rect:
+        rect = super(CountingSurface, self).blit(*args, **kwargs)
+        render_stats.add(BLITS)
+        render_stats.add(PIXELS, rect.width * rect.height)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = super(CountingSurface, self).blits(blit_sequence, True)
+        render_stats.add(BLITS, len(rects))
+        render_stats.add(PIXELS, sum(rect.width * rect.height for rect in rects))
+        return rects if doreturn else None
+
+    def fill(self, *args, **kwargs) -> pygame.Rect:
+        rect = super(CountingSurface, self).fill(*args, **kwargs)
+        render_stats.add(FILLS)
+        render_stats.add(PIXELS, rect.width * rect.height)
+        return rect
+
+
+class _Scope:
+    def __init__(self, stats: "RenderStats", name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        stack = self.stats.stack
+        stack.append(f"{stack[-1]} > {self.name}" if stack else self.name)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stats.stack.pop()
+
+
+class RenderStats:
+    def __init__(self):
+        """
+        Counts blits, blitted pixels, fills, allocated surfaces and text renders per frame, attributed to the scene
+        and widget drawing them. Off until enable()
+        """
+        self.enabled = False
+        self.stack = []  # scope paths, e.g. "SceneFader > Categories > ListView"
+        self.frames = 0
+        self.totals = {}  # {scope: counts summed over all frames}
+        self.peaks = {}  # {scope: most pixels blitted in one frame}
+        self._frame = {}  # {scope: counts of the current frame}
+        self._thread = threading.get_ident()  # only the main thread draws
+
+    def enable(self):
+        """
+        Makes make_surface() create CountingSurfaces, surfaces created before are not counted
+        :return:
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.reset()
+
+    def disable(self):
+        self.enabled = False
+
+    def scope(self, name: str):
+        """
+        Attributes what is drawn inside the with block to name, nested in the enclosing scope
+        :param name: e.g. the class name of the scene or widget
+        :return: context manager
+        """
+        return _Scope(self, name) if self.enabled else _NO_SCOPE
+
+    def add(self, column: int, amount: int = 1):
+        if not self.enabled or threading.get_ident() != self._thread:
+            return
+        # e.g. surfaces of a scene built while handling input
+        scope = self.stack[-1] if self.stack else "outside Render"
+        counts = self._frame.get(scope, None)
+        if counts is None:
+            counts = self._frame[scope] = [0] * 6
+        counts[column] += amount
+
+    def end_frame(self):
+        for scope, counts in self._frame.items():
+            totals = self.totals.setdefault(scope, [0] * 6)
+            for column, amount in enumerate(counts):
+                totals[column] += amount
+            self.peaks[scope] = max(self.peaks.get(scope, 0), counts[PIXELS])
+        self._frame = {}
+        self.frames += 1
+
+    def reset(self):
+        self.frames = 0
+        self.totals = {}
+        self.peaks = {}
+        self._frame = {}
+
+    def report(self, bytes_per_pixel: int = 4) -> str:
+        """
+        :param bytes_per_pixel: of the screen, to convert pixels to bytes
+        :return: averages per frame since the last reset, most pixels first
+        """
+        frames = self.frames
+        if not self.totals:
+            return f"Render stats: nothing drawn in {frames} frames"
+        lines = [f"Render stats, per frame over {frames} frames:",
+                 f"  {'blits':>7} {'KiB':>9} {'max KiB':>9} {'fills':>6} {'surfs':>6} {'texts':>6}  scope"]
+        for scope, counts in sorted(self.totals.items(), key=lambda item: -item[1][PIXELS]):
+            lines.append(f"  {counts[BLITS] / frames:>7.1f} {counts[PIXELS] * bytes_per_pixel / frames / 1024:>9.1f} "
+                         f"{self.peaks[scope] * bytes_per_pixel / 1024:>9.1f} {counts[FILLS] / frames:>6.1f} "
+                         f"{counts[SURFACES] / frames:>6.2f} {counts[TEXTS] / frames:>6.2f}  {scope}")
+        return "\n".join(lines)
+
+
+_NO_SCOPE = contextlib.nullcontext()
+
+render_stats = RenderStats()
+
+
+def make_surface(*args, **kwargs) -> pygame.Surface:
+    """
+    Creates the surfaces scenes and widgets draw on, takes the arguments of pygame.Surface
+    :return: CountingSurface while render accounting is on, Surface otherwise
+    """
+    if render_stats.enabled:
+        return CountingSurface(*args, **kwargs)
+    return pygame.Surface(*args, **kwargs)
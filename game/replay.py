@@ -0,0 +1,159 @@
+"""
+Recording and deterministic replay of a session.
+The recording holds the seed of the random module, which picks the asked locations, and per frame the filtered
+events, the pressed keys and dt. Replaying it feeds the same input to the same scenes, in real time or as fast as
+possible. Background work, e.g. the update check, is not part of the recording.
+
+File format: gzip compressed JSON lines, a header {"format", "version", "seed"} and then one line per frame
+[dt in ms, [[event type, {attribute: value}], ...], pressed scancodes or null if unchanged]
+"""
+import gzip
+import json
+import random
+import time
+from pathlib import Path
+from typing import Union
+
+import pygame
+from pygame.event import Event
+
+from game.config import VERSION
+
+__all__ = ["InputRecorder", "InputReplay", "RECORDING_FORMAT"]
+
+RECORDING_FORMAT = 1
+SCANCODES = 512  # SDL_NUM_SCANCODES, length of pygame.key.get_pressed()
+
+
+def _encode(value):
+    """
+    :return: JSON value or None if value can't be stored, e.g. the window of an event
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tuple, list)):
+        items = [_encode(item) for item in value]
+        return None if None in items else items
+    return None
+
+
+def _decode(value):
+    # pygame hands out positions and button states as tuples
+    if isinstance(value, list):
+        return tuple(_decode(item) for item in value)
+    return value
+
+
+class InputRecorder:
+    def __init__(self, path: Union[str, Path], seed: int = None):
+        """
+        Writes a recording to path, seeds the random module
+        :param path:
+        :param seed: defaults to a random one
+        """
+        self.path = Path(path)
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        random.seed(self.seed)
+
+        self.frames = 0
+        self._pressed = None
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write({"format": RECORDING_FORMAT, "version": VERSION, "seed": self.seed})
+
+    def _write(self, line):
+        self._file.write(json.dumps(line, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n")
+
+    def record(self, events: list, pressed_keys, dt: float):
+        """
+        Call once per frame with what the scenes are given
+        :param events: filtered events
+        :param pressed_keys: pygame.key.get_pressed()
+        :param dt: in seconds
+        :return:
+        """
+        encoded = []
+        for event in events:
+            attributes = {}
+            for key, value in event.dict.items():
+                value = _encode(value)
+                if value is not None:
+                    attributes[key] = value
+            encoded.append([event.type, attributes])
+
+        pressed = [scancode for scancode, down in enumerate(pressed_keys) if down]
+        if pressed == self._pressed:
+            pressed = None
+        else:
+            self._pressed = pressed
+
+        self._write([round(dt * 1000), encoded, pressed])
+        self.frames += 1
+
+    def close(self) -> str:
+        self._file.close()
+        return f"Recorded {self.frames} frames to {self.path}"
+
+
+class InputReplay:
+    def __init__(self, path: Union[str, Path], real_time: bool = True):
+        """
+        Reads a recording and seeds the random module like the recorder did
+        :param path:
+        :param real_time: wait for the recorded dt between frames, else replay as fast as possible
+        """
+        self.path = Path(path)
+        self.real_time = real_time
+
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            if header.get("format", None) != RECORDING_FORMAT:
+                raise ValueError(f"Unsupported recording format {header.get('format', None)}")
+            self.frames = [json.loads(line) for line in file if line.strip()]
+        self.seed = header["seed"]
+        random.seed(self.seed)
+
+        self.index = 0
+        self._pressed = pygame.key.ScancodeWrapper((False,) * SCANCODES)
+        self._last = None
+        self.frame_times = []  # seconds every replayed frame took
+
+    def next_frame(self) -> Union[tuple, None]:
+        """
+        Call once per frame instead of reading the input
+        :return: events, pressed keys, dt or None after the last frame
+        """
+        now = time.perf_counter()
+        if self._last is not None:
+            self.frame_times.append(now - self._last)
+        if self.index >= len(self.frames):
+            return None
+
+        ms, encoded, pressed = self.frames[self.index]
+        self.index += 1
+        dt = ms * 0.001
+
+        if self.real_time and self._last is not None:
+            remaining = dt - (now - self._last)
+            if remaining > 0:
+                time.sleep(remaining)
+                now = time.perf_counter()
+        self._last = now
+
+        if pressed is not None:
+            keys = [False] * SCANCODES
+            for scancode in pressed:
+                keys[scancode] = True
+            self._pressed = pygame.key.ScancodeWrapper(keys)
+        events = [Event(event_type, {key: _decode(value) for key, value in attributes.items()})
+                  for event_type, attributes in encoded]
+        return events, self._pressed, dt
+
+    def report(self) -> str:
+        recorded = sum(frame[0] for frame in self.frames) / 1000
+        if not self.frame_times:
+            return f"Replayed no frames of {self.path}"
+        replayed = sum(self.frame_times)
+        return f"Replayed {len(self.frame_times)} frames of {self.path}: recorded {recorded:.2f}s, " \
+               f"replayed in {replayed:.2f}s, frame mean {replayed / len(self.frame_times) * 1000:.1f}ms " \
+               f"max {max(self.frame_times) * 1000:.1f}ms"
@@ -1,33 +1,41 @@
 import json
 import platform
 import random
-import webbrowser
 # import clipboard
-from concurrent.futures import ThreadPoolExecutor
 from itertools import zip_longest
 from pathlib import Path
 from typing import Union
 
-import requests
-from packaging.version import parse as vp
-from pygame import Surface, draw, image
-from pygame import mixer
+from pygame import Surface, draw
 from pygame.locals import KEYDOWN, K_SPACE, K_RETURN, MOUSEBUTTONDOWN, K_RCTRL, K_LCTRL, MOUSEMOTION, MOUSEBUTTONUP, \
     K_ESCAPE
-from requests import Timeout, ConnectionError
 
 import game.assets.color_palette as c
 import game.datasets as ds
 import game.updates as upd
-from game.animations import SceneFader, Blinker
+from game import warmup
+from game.animations import Blinker, FrameStrip
+from game.assets.audio import play_feedback
 from game.assets.fonts import *
-from game.assets.maps import Map
+from game.assets.manager import assets
+from game.assets.maps import Map, map_path
+from game.assets.previews import PreviewCache
 from game.assets.markers import LocationMarker
-from game.assets.ui import TextInputBox, ListView, Button, LoadingCircleLoop
+from game.assets.ui import TextInputBox, ListView, Button, LoadingCircleLoop, ProgressBar
+from game.assets.widgets import WidgetTree, Group, Label, Picture
 from game.config import *
 from game.config import VERSION, __author__ as a
+from game.render_stats import render_stats, make_surface
 from game.scenes.base_scene import SceneBase
-from game.utils import rel_to_root, rel_to_writable, is_custom_path, aspect_scale, multiline_text
+from game.scenes.fader import SceneFader
+from game.search import SearchIndex, level_search_fields
+from game.updates import network
+from game.updates.catalogue import CataloguePager
+from game.utils import rel_to_root, rel_to_writable, is_custom_path, lazy_import
+
+requests = lazy_import("requests")
+version = lazy_import("packaging.version")
+webbrowser = lazy_import("webbrowser")
 
 __author__ = a
 
@@ -52,14 +60,8 @@ class GameBaseScene(SceneBase):
         self.current_category = ""
 
         # Map
-        rel_image_path = self.data.get("image_path", None)
-        image_path = Path(rel_to_root(f"resources/textures/{rel_image_path}"))
-        if not image_path.exists():
-            image_path = Path(rel_to_writable(f"textures/{rel_image_path}"))
-        self.map = Map(rel_to_root(image_path))
-        self.map.surf = aspect_scale(self.map.surf, (SCREEN_WIDTH/3*2, SCREEN_HEIGHT), True)
+        self.map = Map(map_path(self.data.get("image_path", None)), owner=self)
         self.map.rect.topleft = SCREEN_WIDTH - self.map.surf.get_width(), (SCREEN_HEIGHT - self.map.surf.get_height())/2
-        self.map.original_surf = self.map.surf
 
     def load_data(self, dataset_path: Union[str, Path]):
         """
@@ -124,8 +126,7 @@ class GameLocationBaseScene(GameBaseScene):
     def __init__(self, dataset_path: Union[str, Path]):
         super(GameLocationBaseScene, self).__init__(dataset_path=dataset_path)
 
-        self.blop_sfx = mixer.Sound(rel_to_root("resources/audio/Blop.mp3"))
-        self.blop_sfx.set_volume(0.7)
+        self.blop_sfx = assets.sound("resources/audio/Blop.mp3", self, volume=0.7)
 
         self.select_marker()
 
@@ -133,17 +134,17 @@ class GameLocationBaseScene(GameBaseScene):
         self.render_update_on_click = True
 
         # Question
-        self.question_text, self.question_rect = question_font.render("Wo liegt: ", c.white)
+        self.question_text, self.question_rect = render_text(question_font, "Wo liegt: ", c.white)
         self.question_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 4 - self.question_text.get_height() / 3 * 2
 
         # additional surf to fix updating question
-        self.question_bg = Surface((SCREEN_WIDTH - self.map.surf.get_width(), SCREEN_HEIGHT))
+        self.question_bg = make_surface((SCREEN_WIDTH - self.map.surf.get_width(), SCREEN_HEIGHT))
         self.question_bg_rect = self.question_bg.get_rect()
 
-        self.asked_text, self.asked_rect = question_asked_font.render(self.currently_asked, c.white)
+        self.asked_text, self.asked_rect = render_text(question_asked_font, self.currently_asked, c.white)
         self.asked_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 4 + self.asked_text.get_height() / 6 * 5
 
-        self.category_text, self.category_text_rect = question_asked_font.render("", c.blue_highlight)
+        self.category_text, self.category_text_rect = render_text(question_asked_font, "", c.blue_highlight)
         self.category_text_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 4 + self.question_bg.get_height() / 15
 
     def ProcessInput(self, events, pressed_keys, dt):
@@ -157,8 +158,8 @@ class GameLocationBaseScene(GameBaseScene):
 
     def Update(self, dt):
         if self.render_update_on_click:
-            self.asked_text, _ = question_asked_font.render(self.currently_asked, c.white)
-            self.category_text, _ = question_asked_font.render(f"({self.current_category})", c.blue_highlight)
+            self.asked_text, _ = render_text(question_asked_font, self.currently_asked, c.white)
+            self.category_text, _ = render_text(question_asked_font, f"({self.current_category})", c.blue_highlight)
 
     def Render(self, screen: Surface):
         if not self.oneshot_rendered:
@@ -174,8 +175,9 @@ class GameLocationBaseScene(GameBaseScene):
         :return:
         """
         # screen.fill(c.black)
-        self.map.surf.blits(self.marker_render)
-        screen.blit(self.map.surf, self.map.rect)
+        with render_stats.scope("Map"):
+            self.map.surf.blits(self.marker_render)
+            screen.blit(self.map.surf, self.map.rect)
         # print("oneshot")
         self.oneshot_rendered = True
 
@@ -208,7 +210,7 @@ class GameLocationBaseScene(GameBaseScene):
             if marker.is_clicked((x, y)):
                 if marker.is_asked:
                     # print("Correct")
-                    self.blop_sfx.play()
+                    play_feedback(self.blop_sfx)
                     self.markers[i].is_asked = False
                     return True
 
@@ -230,10 +232,8 @@ class GameTypingBaseScene(GameBaseScene):
     def __init__(self, dataset_path: Union[str, Path]):
         super(GameTypingBaseScene, self).__init__(dataset_path=dataset_path)
 
-        self.blop_sfx = mixer.Sound(rel_to_root("resources/audio/Blop.mp3"))
-        self.blop_sfx.set_volume(0.7)
-        self.wrong_sfx = mixer.Sound(rel_to_root("resources/audio/wrong.wav"))
-        self.wrong_sfx.set_volume(0.4)
+        self.blop_sfx = assets.sound("resources/audio/Blop.mp3", self, volume=0.7)
+        self.wrong_sfx = assets.sound("resources/audio/wrong.wav", self, volume=0.4)
 
         # rendering
         self.must_render_update = True
@@ -242,16 +242,16 @@ class GameTypingBaseScene(GameBaseScene):
         self.select_marker()
 
         # Question BG surface
-        self.bg_q = Surface((SCREEN_WIDTH - self.map.surf.get_width(), SCREEN_HEIGHT))
+        self.bg_q = make_surface((SCREEN_WIDTH - self.map.surf.get_width(), SCREEN_HEIGHT))
         self.bg_q_rect = self.bg_q.get_rect()
 
         # Question Text
-        self.q_text, self.q_text_rect = question_font.render("Wie heisst der Ort: ", c.white)
+        self.q_text, self.q_text_rect = render_text(question_font, "Wie heisst der Ort: ", c.white)
         self.q_text_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 4 - self.q_text.get_height() / 3 * 2
 
         self.inputbox = TextInputBox((SCREEN_WIDTH / 12, SCREEN_HEIGHT / 3 - 10), active=True)
 
-        self.category_text, self.category_text_rect = question_asked_font.render("", c.blue_highlight)
+        self.category_text, self.category_text_rect = render_text(question_asked_font, "", c.blue_highlight)
         self.category_text_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 4 + self.q_text.get_height()
 
     def ProcessInput(self, events, pressed_keys, dt):
@@ -268,9 +268,9 @@ class GameTypingBaseScene(GameBaseScene):
                     if is_correct:
                         self.inputbox.text = ""
                         self.select_marker()
-                        self.blop_sfx.play()
+                        play_feedback(self.blop_sfx)
                     else:
-                        self.wrong_sfx.play()
+                        play_feedback(self.wrong_sfx)
             self.must_render_update = True
 
     def check_input(self) -> bool:
@@ -294,7 +294,7 @@ class GameTypingBaseScene(GameBaseScene):
 
     def Update(self, dt):
         if self.must_render_update:
-            self.category_text, _ = question_asked_font.render(f"({self.current_category})", c.blue_highlight)
+            self.category_text, _ = render_text(question_asked_font, f"({self.current_category})", c.blue_highlight)
 
     def render_update(self, screen: Surface):
         self.must_render_update = False
@@ -302,16 +302,18 @@ class GameTypingBaseScene(GameBaseScene):
         self.bg_q.blit(self.q_text, self.q_text_rect)
         self.bg_q.blit(self.category_text, self.category_text_rect)
         self.inputbox.draw(self.bg_q)
-        self.map.reset_surf()
-        surf, rect = self.marker_to_render
-        self.map.surf.blit(surf, rect)
-
         screen.blit(self.bg_q, self.bg_q_rect)
-        screen.blit(self.map.surf, self.map.rect)
+
+        with render_stats.scope("Map"):
+            self.map.reset_surf()
+            surf, rect = self.marker_to_render
+            self.map.surf.blit(surf, rect)
+            screen.blit(self.map.surf, self.map.rect)
 
     def oneshot_render(self, screen: Surface):
         screen.fill(c.bg_game_scene)
-        screen.blit(self.map.surf, self.map.rect)
+        with render_stats.scope("Map"):
+            screen.blit(self.map.surf, self.map.rect)
         self.oneshot_rendered = True
 
 
@@ -319,16 +321,29 @@ class TitleScene(SceneBase):
     def __init__(self):
         super(TitleScene, self).__init__()
 
-        self.title, self.title_rect = title_font.render(text="TopoLoco", fgcolor=c.white)
-        self.app_version_text, self.app_version_rect = mini_info_font.render(text=f"Version {VERSION}",
-                                                                             fgcolor=c.lightblue_highlight)
+        self.title, self.title_rect = render_text(title_font, text="TopoLoco", fgcolor=c.white)
+        self.app_version_text, self.app_version_rect = render_text(mini_info_font, text=f"Version {VERSION}",
+                                                                   fgcolor=c.lightblue_highlight)
         self.app_version_rect.bottomright = SCREEN_WIDTH - 20, SCREEN_HEIGHT - 15
-        self.proceed_text, self.proceed_rect = question_asked_font.render(text="LEERTASTE oder ENTER",
-                                                                          fgcolor=c.lightblue_highlight)
+        self.proceed_text, self.proceed_rect = render_text(question_asked_font, text="LEERTASTE oder ENTER",
+                                                           fgcolor=c.lightblue_highlight)
         self.proceed_rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 7 * 5
-        self.logo = image.load(rel_to_root("resources/textures/TopoLoco_icon.png"))
+        self.logo = assets.image("resources/textures/TopoLoco_icon.png", self, size=(120, 100))
 
         self.blinker = Blinker(frequency=0.3)
+        self.blinker.play()
+        # the blinker swings between 0 and half its period, every step is baked onto the background
+        self.proceed_strip = FrameStrip(self._render_proceed, self.blinker.period / 2)
+        self.fonts_cold = True  # opened one per idle frame, FreeType must stay on the main thread
+
+    def _render_proceed(self, time: float) -> Surface:
+        # own copy, the cached text must keep its alpha
+        text = self.proceed_text.copy()
+        text.set_alpha(self.blinker.ease(time) * 255)
+        frame = make_surface(self.proceed_rect.size)
+        frame.fill(c.blue_highlight)
+        frame.blit(text, (0, 0))
+        return frame
 
     def ProcessInput(self, events, pressed_keys, dt):
         for event in events:
@@ -339,13 +354,16 @@ class TitleScene(SceneBase):
                     self.Terminate()
 
     def Update(self, dt):
-        self.blinker.update(dt)
+        # from the second frame on, the first one is not held up by the warm-up
+        if self.oneshot_rendered:
+            warmup.start_warmup()
+            if self.fonts_cold:
+                self.fonts_cold = warmup.warm_fonts()
 
     def Render(self, screen: Surface):
         if not self.oneshot_rendered:
             self.title_rect.center = SCREEN_WIDTH / 2 - 60, SCREEN_HEIGHT / 2
 
-            self.logo = aspect_scale(self.logo, (120, 100), True)
             logo_rect = self.logo.get_rect()
             logo_rect.centery = SCREEN_HEIGHT / 2 - 10
             logo_rect.left = SCREEN_WIDTH / 3 * 2 - 70
@@ -357,9 +375,7 @@ class TitleScene(SceneBase):
             screen.blit(self.proceed_text, self.proceed_rect)
             self.oneshot_rendered = True
 
-        draw.rect(screen, c.blue_highlight, self.proceed_rect)
-        self.proceed_text.set_alpha(self.blinker.value * 255)
-        screen.blit(self.proceed_text, self.proceed_rect)
+        screen.blit(self.proceed_strip.frame(self.blinker.time_passed), self.proceed_rect)
 
 
 class Categories(SceneBase):
@@ -367,13 +383,14 @@ class Categories(SceneBase):
         # TODO: About site
         super(Categories, self).__init__()
         self.loading_anim = LoadingCircleLoop()
-        self.loading_anim_rect = self.loading_anim.surf.get_rect()
-        self.loading_bg_surf = Surface((SCREEN_WIDTH, int(SCREEN_HEIGHT / 4 * 3 + 20)))
-        self.loading_anim_rect.center = self.loading_bg_surf.get_rect().center
+        self.loading_anim.rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 4 - 5 + int(SCREEN_HEIGHT / 4 * 3 + 20) / 2
 
         self.is_loading = False
         self.level_list = []
         self.listview = None
+        self.search_index = None
+        self.filtered = []  # dataset indices of the listed levels
+        self.selected_index = None
 
         # Something weird happening here!!!!!!
         # ####################################
@@ -394,78 +411,102 @@ class Categories(SceneBase):
         # self.listview.rect.left = SCREEN_WIDTH / 12
         # self.listview.rect.top = SCREEN_HEIGHT / 5 * 2
 
-        marker_icon = image.load(rel_to_root("resources/textures/marker_icon.png")).convert_alpha()
-        keyboard_icon = image.load(rel_to_root("resources/textures/keyboard_icon.png")).convert_alpha()
+        self.search_box = TextInputBox((SCREEN_WIDTH / 12, SCREEN_HEIGHT / 5 * 2), cap=20, width=350,
+                                       placeholder="Level durchsuchen...", base_color=c.bg_listview,
+                                       active_color=c.bg_listview_hovered)
 
         self.button_location = Button(pos=(SCREEN_WIDTH / 8 * 3, SCREEN_HEIGHT / 5 * 2), size=(200, 50), text="Suchen",
-                                      logo_surf=marker_icon, logo_margin=(10, 25, 10, 10))
+                                      logo="marker", logo_margin=(10, 25, 10, 10))
         self.button_typing = Button(pos=(SCREEN_WIDTH / 8 * 3, SCREEN_HEIGHT / 5 * 2 + 70), size=(200, 50),
-                                    text="Schreiben", logo_surf=keyboard_icon)
+                                    text="Schreiben", logo="keyboard")
 
-        self.title, self.title_rect = scene_title_font.render("Level Auswählen", c.white)
+        self.title, self.title_rect = render_text(scene_title_font, "Level Auswählen", c.white)
         self.title_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 6
 
-        self.title_datasets, self.title_datasets_rect = category_font.render("Verfügbare Level:", c.blue_highlight)
+        self.title_datasets, self.title_datasets_rect = render_text(category_font, "Verfügbare Level:",
+                                                                    c.blue_highlight)
         self.title_datasets_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 3 + 10
 
-        self.title_modes, self.title_modes_rect = category_font.render("Modus:", c.blue_highlight)
+        self.title_modes, self.title_modes_rect = render_text(category_font, "Modus:", c.blue_highlight)
         self.title_modes_rect.topleft = SCREEN_WIDTH / 8 * 3, SCREEN_HEIGHT / 3 + 10
 
         # to library
-        library_icon = image.load(rel_to_root("resources/textures/library_icon.png")).convert_alpha()
         self.button_library = Button(pos=(SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 2), size=(290, 50),
-                                     text="Online Bibliothek", logo_surf=library_icon, logo_margin=(12, 12, 10, 12))
-        self.title_lib, self.title_lib_rect = category_font.render("Weitere Levels:", c.blue_highlight)
+                                     text="Online Bibliothek", logo="library", logo_margin=(12, 12, 10, 12))
+        self.title_lib, self.title_lib_rect = render_text(category_font, "Weitere Levels:", c.blue_highlight)
         self.title_lib_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 3 + 10
-        self.title_updates_text, self.title_updates_rect = category_font.render("Updates:", c.blue_highlight)
+        self.title_updates_text, self.title_updates_rect = render_text(category_font, "Updates:", c.blue_highlight)
         self.title_updates_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 20 * 11
 
-        self.app_version_text, self.app_version_rect = mini_info_font.render(text=f"Version {VERSION}",
-                                                                             fgcolor=c.blue_highlight)
+        self.app_version_text, self.app_version_rect = render_text(mini_info_font, text=f"Version {VERSION}",
+                                                                   fgcolor=c.blue_highlight)
         self.app_version_rect.bottomright = SCREEN_WIDTH - 20, SCREEN_HEIGHT - 15
 
         # updates
         self.loading_circle = LoadingCircleLoop(radius=30, width=10)
-        self.loading_circle_rect = self.loading_circle.surf.get_rect()
-        self.loading_circle_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 10 * 6
-        self.updates_surf = Surface((300, 60))
-        self.updates_rect = self.updates_surf.get_rect()
-        self.updates_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 10 * 6
+        self.loading_circle.rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 10 * 6
         self.is_loading_updates = True
-        self.reset_update_loading = False
-        self.is_downloading_update = False
         self.button_update_app = Button((SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3), (200, 50), "Update App",
                                         base_color=c.error, text_color=c.white)
-        self.no_update_text, self.no_update_rect = light_italic_font_25.render("Kein App Update verfügbar",
-                                                                               c.lightblue_highlight)
-        self.no_update_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3
-        self.is_downloading_text, self.is_downloading_rect = light_italic_font_25.render("Downloading Update",
-                                                                                         c.lightblue_highlight)
-        self.is_downloading_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3 + 80
+        self.no_update_label = Label("Kein App Update verfügbar", light_italic_font_25, c.lightblue_highlight,
+                                     pos=(SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3))
+        self.is_downloading_label = Label("Downloading Update", light_italic_font_25, c.lightblue_highlight,
+                                          pos=(SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3 + 80))
+        self.download_progress_bar = ProgressBar(size=(200, 10))
+        self.download_progress_bar.rect.midleft = (self.loading_circle.rect.right + 20,
+                                                   self.loading_circle.rect.centery)
 
         # about
-        self.about_title_text, self.about_title_rect = category_font.render("Mehr Infos:", c.blue_highlight)
+        self.about_title_text, self.about_title_rect = render_text(category_font, "Mehr Infos:", c.blue_highlight)
         self.about_title_rect.topleft = SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3 + 100
         self.button_about = Button((SCREEN_WIDTH / 3 * 2, SCREEN_HEIGHT / 5 * 3 + 150), (200, 50), "Über")
 
-        self.must_update = False
+        # widgets
+        self.ui = WidgetTree(c.bg_game_scene)
+        background = self.ui.background
+        background.blit(self.title, self.title_rect)
+        background.blit(self.title_datasets, self.title_datasets_rect)
+        background.blit(self.title_modes, self.title_modes_rect)
+        background.blit(self.title_lib, self.title_lib_rect)
+        background.blit(self.title_updates_text, self.title_updates_rect)
+        background.blit(self.app_version_text, self.app_version_rect)
+        background.blit(self.about_title_text, self.about_title_rect)
+        draw.line(background, c.blue_highlight, start_pos=(SCREEN_WIDTH / 5 * 3, SCREEN_HEIGHT / 6 + 70),
+                  end_pos=(SCREEN_WIDTH / 5 * 3, SCREEN_HEIGHT / 6 * 5), width=3)
+
+        self.loading_widgets = self.ui.add(Group(self.loading_anim))
+        self.level_widgets = self.ui.add(Group(self.search_box, self.listview, self.button_typing, self.button_location,
+                                               self.button_library, self.button_about))
+        self.update_widgets = self.ui.add(Group(self.loading_circle, self.download_progress_bar,
+                                                self.is_downloading_label, self.button_update_app,
+                                                self.no_update_label))
+        self._update_visibility()
+
         self.selected = None
 
     def ProcessInput(self, events, pressed_keys, dt):
+        ctrl_pressed = pressed_keys[K_LCTRL] or pressed_keys[K_RCTRL]
         for event in events:
+            if (event.type == MOUSEBUTTONDOWN or event.type == KEYDOWN) and not self.is_loading:
+                query = self.search_box.text
+                self.search_box.handle_event(event, ctrl_pressed)
+                if self.search_box.text != query:
+                    self.apply_search()
+
             if (event.type == MOUSEBUTTONDOWN or event.type == MOUSEMOTION or event.type == MOUSEBUTTONUP) and \
                     not self.is_loading:
-                self.must_update, clicked_index = self.listview.handle_input(event)
+                _, clicked_index = self.listview.handle_input(event)
                 if clicked_index is not None:
-                    self.selected = ds.DATASET_PATH_LIST[clicked_index]
+                    self.selected_index = self.filtered[clicked_index]
+                    self.selected = ds.DATASET_PATH_LIST[self.selected_index]
 
-                self.must_update = self.button_location.handle_input(event) or self.must_update
-                self.must_update = self.button_typing.handle_input(event) or self.must_update
-                self.must_update = self.button_library.handle_input(event) or self.must_update
-                self.must_update = self.button_about.handle_input(event) or self.must_update
+                self.button_location.handle_input(event)
+                self.button_typing.handle_input(event)
+                self.button_library.handle_input(event)
+                self.button_about.handle_input(event)
 
-                if not self.is_loading_updates and upd.APP_UPDATE_AVAILABLE:
-                    self.must_update = self.button_update_app.handle_input(event) or self.must_update
+                if self.button_update_app.visible:
+                    self.button_update_app.handle_input(event)
                     if self.button_update_app.is_clicked:
                         upd.DO_APP_UPDATE = True
 
@@ -493,78 +534,31 @@ class Categories(SceneBase):
                 self.is_loading = False
         if self.is_loading:
             self.loading_anim.update(dt)
-        elif upd.IS_UPDATE_CHECKING or upd.STARTED_APP_UPDATE:
-            self.reset_update_loading = False
-            self.is_loading_updates = True
-        else:
-            self.is_loading_updates = False
+        self.is_loading_updates = upd.IS_UPDATE_CHECKING or upd.STARTED_APP_UPDATE
 
-        # if self.must_update:
-        #     self.listview.update(dt)
         self.listview.update(dt)
         if self.is_loading_updates:
             self.loading_circle.update(dt)
+        if upd.STARTED_APP_UPDATE:
+            self.download_progress_bar.update(upd.APP_DOWNLOAD_PROGRESS.fraction)
+            self.is_downloading_label.set_text(
+                f"Downloading Update v{upd.LATEST_APP_VERSION} ({upd.APP_DOWNLOAD_PROGRESS.percent}%)")
 
-    def Render(self, screen: Surface):
-        if not self.oneshot_rendered:
-            screen.fill(c.bg_game_scene)
-            if not self.is_loading:
-                self.listview.draw(screen)
-                self.button_typing.draw(screen)
-                self.button_location.draw(screen)
-                self.button_library.draw(screen)
-                self.button_about.draw(screen)
+        self._update_visibility()
 
-            screen.blit(self.title, self.title_rect)
-            screen.blit(self.title_datasets, self.title_datasets_rect)
-            screen.blit(self.title_modes, self.title_modes_rect)
-            screen.blit(self.title_lib, self.title_lib_rect)
-            screen.blit(self.title_updates_text, self.title_updates_rect)
-            screen.blit(self.app_version_text, self.app_version_rect)
-            screen.blit(self.about_title_text, self.about_title_rect)
+    def _update_visibility(self):
+        self.loading_widgets.visible = self.is_loading
+        self.level_widgets.visible = not self.is_loading
+        self.update_widgets.visible = not self.is_loading
 
-            draw.line(screen, c.blue_highlight, start_pos=(SCREEN_WIDTH / 5 * 3, SCREEN_HEIGHT / 6 + 70),
-                      end_pos=(SCREEN_WIDTH / 5 * 3, SCREEN_HEIGHT / 6 * 5), width=3)
+        self.loading_circle.visible = self.is_loading_updates
+        self.download_progress_bar.visible = self.is_loading_updates and upd.STARTED_APP_UPDATE
+        self.is_downloading_label.visible = self.is_loading_updates and upd.STARTED_APP_UPDATE
+        self.button_update_app.visible = not self.is_loading_updates and upd.APP_UPDATE_AVAILABLE
+        self.no_update_label.visible = not self.is_loading_updates and not upd.APP_UPDATE_AVAILABLE
 
-            self.oneshot_rendered = True
-        if self.is_loading:
-            self.oneshot_rendered = False
-            self.loading_bg_surf.fill(c.bg_game_scene)
-            self.loading_anim.draw()
-            self.loading_bg_surf.blit(self.loading_anim.surf, self.loading_anim_rect)
-            screen.blit(self.loading_bg_surf, (0, (SCREEN_HEIGHT / 4 - 5)))
-        else:
-            self.listview.draw(screen)
-
-        if self.must_update and not self.is_loading:
-            # self.listview.draw(screen)
-            self.button_typing.draw(screen)
-            self.button_location.draw(screen)
-            self.button_library.draw(screen)
-            self.button_about.draw(screen)
-            if upd.APP_UPDATE_AVAILABLE:
-                self.button_update_app.draw(screen)
-            self.must_update = False
-
-        if self.is_loading_updates and not self.is_loading:
-            self.updates_surf.fill(c.bg_game_scene)
-            screen.blit(self.updates_surf, self.updates_rect)
-            self.loading_circle.draw()
-            screen.blit(self.loading_circle.surf, self.loading_circle_rect)
-            if upd.STARTED_APP_UPDATE and not self.is_downloading_update:
-                self.is_downloading_update = True
-                self.is_downloading_text, _ = light_italic_font_25.render(
-                    f"Downloading Update v{upd.LATEST_APP_VERSION}",
-                    c.lightblue_highlight)
-                screen.blit(self.is_downloading_text, self.is_downloading_rect)
-        elif not self.reset_update_loading and not self.is_loading:
-            self.reset_update_loading = True
-            self.updates_surf.fill(c.bg_game_scene)
-            screen.blit(self.updates_surf, self.updates_rect)
-            if upd.APP_UPDATE_AVAILABLE:
-                self.button_update_app.draw(screen)
-            else:
-                screen.blit(self.no_update_text, self.no_update_rect)
+    def Render(self, screen: Surface):
+        self.ui.render(screen)
 
     def load_datasets(self):
         builtins_list = []
@@ -581,7 +575,8 @@ class Categories(SceneBase):
         self.customs = custom_list
 
     def load_and_build_listview(self, build: bool = True):
-        ds.load_datasets()
+        if not warmup.claim_datasets():
+            ds.load_datasets()
         dataset_info_list = ds.DATASET_INFO
 
         level_list = []
@@ -589,14 +584,33 @@ class Categories(SceneBase):
             level_list.append(dataset["name"])
 
         self.level_list = level_list
+        self.search_index = SearchIndex([level_search_fields(dataset) for dataset in dataset_info_list])
+        self.filtered = list(range(len(level_list)))
         if build:
-            lv = ListView(level_list, selection=True, item_height=50, item_length=350, vertical_clip_scroll=True)
-            lv.rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 5 * 2
+            lv = ListView(level_list, selection=True, item_height=50, item_length=350, height=350,
+                          vertical_clip_scroll=True)
+            lv.rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 5 * 2 + 50
             self.listview = lv
 
+    def apply_search(self):
+        """
+        Lists only the levels matching the text of the search box
+        :return:
+        """
+        self.filtered = self.search_index.search(self.search_box.text)
+        if self.selected_index in self.filtered:
+            selected = self.filtered.index(self.selected_index)
+        else:
+            # the buttons must not start a level that is no longer listed
+            selected = None
+            self.selected_index = None
+            self.selected = None
+        self.listview.set_list([self.level_list[i] for i in self.filtered], selected)
+
     def setup_new_typing(self, dataset_path: Union[str, Path]):
         try:
             new_typing_scene = GameTypingBaseScene(dataset_path=dataset_path)
+            warmup.remember_level(dataset_path)
             self.SwitchToScene(
                 next_scene=SceneFader(new_typing_scene, current_scene=self, time=0.7,
                                       interpolator="CubicEaseInOut"))
@@ -608,6 +622,7 @@ class Categories(SceneBase):
     def setup_new_location(self, dataset_path: Union[str, Path]):
         try:
             new_location_scene = GameLocationBaseScene(dataset_path=dataset_path)
+            warmup.remember_level(dataset_path)
             self.SwitchToScene(next_scene=SceneFader(new_location_scene, current_scene=self, time=0.7,
                                                      interpolator="CubicEaseInOut"))
         except json.JSONDecodeError:
@@ -619,15 +634,15 @@ class Categories(SceneBase):
 class ErrorOccurred(SceneBase):
     def __init__(self, recover_scene: SceneBase = None, text: str = "Unknown"):
         super(ErrorOccurred, self).__init__()
-        self.title, self.title_rect = title_font.render("An ERROR occurred", c.error)
+        self.title, self.title_rect = render_text(title_font, "An ERROR occurred", c.error)
         self.title_rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6
 
-        self.text_surf = Surface((SCREEN_WIDTH / 3 * 2, int(SCREEN_HEIGHT / 3)))
+        self.text_surf = make_surface((SCREEN_WIDTH / 3 * 2, int(SCREEN_HEIGHT / 3)))
         self.text_surf.fill(c.error_bg)
         self.text_rect = self.text_surf.get_rect()
         self.text_rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 5 * 2
 
-        self.ok_text, self.ok_rect = question_asked_font.render("Press ENTER", c.error)
+        self.ok_text, self.ok_rect = render_text(question_asked_font, "Press ENTER", c.error)
         self.ok_rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6 * 5
 
         self.multiline(text)
@@ -637,7 +652,7 @@ class ErrorOccurred(SceneBase):
         y = 40
         lines = text.split("\n")
         for i, line in enumerate(lines):
-            txt, rect = question_font.render(line, c.error)
+            txt, rect = render_text(question_font, line, c.error)
             rect.topleft = 0, y * (i + 1)
             self.text_surf.blit(txt, rect)
 
@@ -664,9 +679,7 @@ class OnlineLibrary(SceneBase):
     def __init__(self):
         super(OnlineLibrary, self).__init__()
         self.loading_loop_animation = LoadingCircleLoop()
-        self.loading_loop_rect = self.loading_loop_animation.surf.get_rect()
-        self.loading_bg_surf = Surface((SCREEN_WIDTH, int(SCREEN_HEIGHT / 4 * 3)))
-        self.loading_loop_rect.center = self.loading_bg_surf.get_rect().center
+        self.loading_loop_animation.rect.center = SCREEN_WIDTH / 2, SCREEN_HEIGHT / 4 + int(SCREEN_HEIGHT / 4 * 3) / 2
 
         self.is_loading = True
         self.fetch_successful = False
@@ -675,20 +688,37 @@ class OnlineLibrary(SceneBase):
         self.selected = None
         self.clicked_index = None
 
-        self.executor = ThreadPoolExecutor()
+        self.token = network.new_token()  # cancels all transfers of this scene
         self.all_levels = {}
         self.level_keys = []
         self.level_list = []
+        self.search_index = SearchIndex()
+        self.filtered = []  # level indices of the listed levels
 
+        self.search_box = TextInputBox((SCREEN_WIDTH / 12, SCREEN_HEIGHT / 5 * 2), cap=30, width=550,
+                                       placeholder="Level durchsuchen...", base_color=c.blue_highlight,
+                                       active_color=c.bg_button_pressed)
         self.level_list_view = None
-        self.fetching_future = self.executor.submit(self._fetch_lib)
+        self.manifest_levels = {}
+        self.local_datasets = {}  # {key: dataset info}
+        self.updatable_levels = []  # [(filename, path), ...]
+        self.catalogue = None
+        self.page_task = None
+        self.page_fetch_failed = False
+        self.fetching_future = None
+        cached = upd.cached_manifest()
+        if cached is not None:
+            # show the cached manifest instantly, reconcile with the server in the background
+            try:
+                self._apply_manifest(cached, cached_only=True)
+            except (KeyError, ValueError) as e:
+                print(e)
+        self.fetching_future = network.submit(self._fetch_lib, token=self.token)
         self.download_future = None
         # self.load_local_datasets_future = self.executor.submit(ds.load_datasets) # call to refresh local datasets
         self.load_local_datasets_future = None
         self.remove_future = None
 
-        self.must_update = False
-        self.must_update_details = False
         self.is_downloading = False
         self.was_successful = True
         self.download_msg = ""
@@ -698,16 +728,18 @@ class OnlineLibrary(SceneBase):
         self.is_uptodate = False
 
         # Title
-        self.title_text, self.title_rect = scene_title_font.render(text="Online Bibliothek", fgcolor=c.blue_highlight)
+        self.title_text, self.title_rect = render_text(scene_title_font, text="Online Bibliothek",
+                                                       fgcolor=c.blue_highlight)
         self.title_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 6
-        self.subtitle_text, self.subtitle_rect = category_font.render("Levels:", fgcolor=c.bg_listview)
+        self.subtitle_text, self.subtitle_rect = render_text(category_font, "Levels:", fgcolor=c.bg_listview)
         self.subtitle_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 3 + 10
 
         # Details
-        self.detail_surf = Surface((600, SCREEN_HEIGHT / 3 * 2 - 10))
-        self.detail_rect = self.detail_surf.get_rect()
-        self.detail_rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 + 10
-        self.description_surf = Surface((500, 250))
+        self.detail_surf = make_surface((600, SCREEN_HEIGHT / 3 * 2 - 10))
+        self.detail_surf.fill(c.lightblue_highlight)
+        self.detail_picture = Picture(self.detail_surf, (SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 + 10))
+        self.detail_key = None
+        self.description_surf = make_surface((500, 250))
         self.description_rect = self.description_surf.get_rect()
         self.description_rect.topleft = 0, 50
 
@@ -717,87 +749,189 @@ class OnlineLibrary(SceneBase):
         self.update_button = Button((0, 0), (200, 50), "Update", base_color=c.orange)
         self.update_button.rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2
 
-        self.text_uptodate, self.rect_uptodate = light_italic_font_25.render("Up to date", c.bg_listview)
-        self.rect_uptodate.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2 + 20
+        self.uptodate_label = Label("Up to date", light_italic_font_25, c.bg_listview,
+                                    pos=(SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2 + 20))
 
-        self.error_text, self.error_rect = light_italic_font_25.render("Unknown", c.error)
-        self.error_rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2 + 60
+        self.error_label = Label("Unknown", light_italic_font_25, c.error,
+                                 pos=(SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2 + 60))
 
         self.downloading_anim = LoadingCircleLoop(radius=30, width=10)
-        self.downloading_anim_rect = self.downloading_anim.surf.get_rect()
-        self.downloading_anim_rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2
+        self.downloading_anim.rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2
+        self.download_progress = upd.DownloadProgress()
+        self.download_progress_bar = ProgressBar(size=(250, 10), bg_color=c.white)
+        self.download_progress_bar.rect.midleft = (self.downloading_anim.rect.right + 20,
+                                                   self.downloading_anim.rect.centery)
 
         self.button_remove = Button((0, 0), (200, 50), "Entfernen", base_color=c.orange, hover_color=c.error,
                                     pressed_color=c.error_bg)
         self.button_remove.rect.topright = SCREEN_WIDTH / 12 * 11 + 16, SCREEN_HEIGHT / 3 * 2
 
+        # Previews
+        self.previews = PreviewCache(token=self.token)
+        self.prefetch_radius = 3
+        self.prefetch_index = None
+        self.preview_surf = make_surface(self.previews.size)
+        self.preview_surf.fill(c.lightblue_highlight)
+        self.preview_picture = Picture(self.preview_surf, (SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 * 2 + 100))
+        self.preview_key = None
+
+        # Update all
+        self.update_all_button = Button((0, 0), (220, 40), "Alle updaten", base_color=c.orange)
+        self.update_all_button.rect.topright = SCREEN_WIDTH / 12 + 550, SCREEN_HEIGHT / 3 + 5
+        self.update_all_progress = upd.AggregateProgress()
+        self.update_all_progress_bar = ProgressBar(size=(220, 10), bg_color=c.white)
+        self.update_all_progress_bar.rect.midright = self.update_all_button.rect.midright
+        self.update_all_future = None
+
+        # widgets
+        self.ui = WidgetTree(c.lightblue_highlight)
+        self.ui.background.blit(self.title_text, self.title_rect)
+        self.ui.background.blit(self.subtitle_text, self.subtitle_rect)
+
+        self.ui.add(self.loading_loop_animation)
+        self.ui.add(self.search_box)
+        self.list_widgets = self.ui.add(Group())
+        self.ui.add(self.update_all_button)
+        self.ui.add(self.update_all_progress_bar)
+        self.detail_widgets = self.ui.add(Group(self.detail_picture, self.preview_picture, self.downloading_anim,
+                                                self.download_progress_bar, self.download_button, self.update_button,
+                                                self.uptodate_label, self.button_remove, self.error_label))
+        self._update_widgets()
+
     def ProcessInput(self, events, pressed_keys, dt):
+        ctrl_pressed = pressed_keys[K_LCTRL] or pressed_keys[K_RCTRL]
         for event in events:
             if event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     self.SwitchToScene(SceneFader(fade_to=Categories(), current_scene=self, time=0.7, lock_input=True))
 
+            if (event.type == MOUSEBUTTONDOWN or event.type == KEYDOWN) and self.level_list_view is not None:
+                query = self.search_box.text
+                self.search_box.handle_event(event, ctrl_pressed)
+                if self.search_box.text != query:
+                    self.apply_search()
+
             if event.type == MOUSEBUTTONDOWN or event.type == MOUSEMOTION or event.type == MOUSEBUTTONUP:
                 if self.level_list_view is not None:
-                    self.must_update, clicked_index = self.level_list_view.handle_input(event)
+                    _, clicked_index = self.level_list_view.handle_input(event)
                     if clicked_index is not None:
-                        self.selected = self.all_levels[self.level_keys[clicked_index]]
-                        self.must_update_details = True
-                        self.clicked_index = clicked_index
+                        self.clicked_index = self.filtered[clicked_index]
+                        self.selected = self.all_levels[self.level_keys[self.clicked_index]]
+
+                    focus = self.level_list_view.hovered_index
+                    if focus is None:
+                        focus = self.level_list_view.selected_index
+                    if focus is not None and focus != self.prefetch_index:
+                        self._prefetch_previews(focus)
 
                 if self.is_downloadable:
-                    self.must_update_details = self.download_button.handle_input(event) or self.must_update_details
+                    self.download_button.handle_input(event)
                     if self.download_button.is_clicked and self.selected is not None:
-                        self.download_future = self.executor.submit(self._download_selected)
+                        self.download_future = network.submit(self._download_selected, self.selected, token=self.token)
                         self.is_downloading = True
                 if self.is_updatable:
-                    self.must_update_details = self.update_button.handle_input(event) or self.must_update_details
+                    self.update_button.handle_input(event)
                     if self.update_button.is_clicked and self.selected is not None:
-                        self.download_future = self.executor.submit(self._download_selected)
+                        self.download_future = network.submit(self._download_selected, self.selected, token=self.token)
                         self.is_downloading = True
 
+                if self.updatable_levels and self.update_all_future is None and not self.is_downloading:
+                    self.update_all_button.handle_input(event)
+                    if self.update_all_button.is_clicked:
+                        self.update_all_progress = upd.AggregateProgress()
+                        # the manifest entries are copied here, pages keep being added on the main thread
+                        self.update_all_future = network.submit(self._update_all, list(self.updatable_levels),
+                                                                {**self.manifest_levels, **self.all_levels},
+                                                                token=self.token)
+
                 if self.is_updatable or self.is_uptodate:
-                    self.must_update_details = self.button_remove.handle_input(event) or self.must_update_details
+                    self.button_remove.handle_input(event)
                     if self.button_remove.is_clicked and self.selected is not None:
-                        self.remove_future = self.executor.submit(self._remove_selected)
+                        self.remove_future = network.submit(self._remove_selected, self.selected, token=self.token)
                         self.is_downloading = True
 
     def Update(self, dt):
+        if self.token.cancelled:
+            # left the scene, transfers are cancelled
+            return
+
         if self.is_loading:
             self.loading_loop_animation.update(dt=dt)
         elif self.fetch_done:
-            success, msg = self.fetching_future.result()
-            self.must_update = True
             self.fetch_done = False
 
+        if self.fetching_future is not None and self.fetching_future.done():
+            success, msg, manifest = self._result(self.fetching_future,
+                                                  (False, "Couldn't fetch the online library", None))
+            self.fetching_future = None
+            if manifest is not None:
+                try:
+                    self._apply_manifest(manifest)
+                except (KeyError, ValueError) as e:
+                    print(e)
+                    success, msg = False, "Couldn't read update data"
+
             self.fetch_successful = success
             if not success:
                 print(msg)
                 self.fetch_msg = msg
-        if self.must_update:
+        if self.level_list_view is not None:
             self.level_list_view.update(dt)
 
+        # load further catalogue pages while scrolling towards the end
+        if self.page_task is not None:
+            if self.page_task.done():
+                catalogue, page = self._result(self.page_task, (self.catalogue, []))
+                self.page_task = None
+                if catalogue is self.catalogue:
+                    self.page_fetch_failed = not page and catalogue.needs_network
+                    self._show_page(page)
+        elif self.level_list_view is not None and self.catalogue is not None and self.catalogue.has_more and \
+                not self.page_fetch_failed and self.level_list_view.is_near_end():
+            if self.catalogue.needs_network:
+                self.page_task = network.submit(self._fetch_page, self.catalogue, token=self.token)
+            else:
+                self._show_page(self.catalogue.next_page())
+
         if self.load_local_datasets_future is not None:
             if self.load_local_datasets_future.done():
                 self.load_local_datasets_future.result()
                 self.load_local_datasets_future = None
-                self.must_update_details = True
                 self.is_downloading = False
         if self.download_future is not None:
             if self.download_future.done():
-                self.was_successful, self.download_msg = self.download_future.result()
-                self.selected = self.all_levels[self.level_keys[self.clicked_index]]
+                self.was_successful, self.download_msg, local_datasets = self._result(
+                    self.download_future, (False, "Download failed", None))
+                if local_datasets is not None:
+                    self._refresh_states(local_datasets)
+                if self.clicked_index is not None:
+                    self.selected = self.all_levels[self.level_keys[self.clicked_index]]
                 self.download_future = None
-                self.must_update_details = True
                 self.is_downloading = False
         if self.remove_future is not None:
             if self.remove_future.done():
-                self.was_successful, self.download_msg = self.remove_future.result()
-                self.selected = self.all_levels[self.level_keys[self.clicked_index]]
+                self.was_successful, self.download_msg, local_datasets = self._result(
+                    self.remove_future, (False, "Removing the level failed", None))
+                if local_datasets is not None:
+                    self._refresh_states(local_datasets)
+                if self.clicked_index is not None:
+                    self.selected = self.all_levels[self.level_keys[self.clicked_index]]
                 self.remove_future = None
-                self.must_update_details = True
                 self.is_downloading = False
 
+        if self.update_all_future is not None:
+            self.update_all_progress_bar.update(self.update_all_progress.fraction)
+            if self.update_all_future.done():
+                self.was_successful, self.download_msg, local_datasets = self._result(
+                    self.update_all_future, (False, "Updating the levels failed", None))
+                if local_datasets is not None:
+                    self._refresh_states(local_datasets)
+                if not self.was_successful:
+                    print(self.download_msg)
+                self.update_all_future = None
+
+        self.previews.poll()
+
         if self.selected is not None:
             state = self.selected.get("state", "downloadable")
             if state == "updatable":
@@ -815,136 +949,287 @@ class OnlineLibrary(SceneBase):
 
         if self.is_downloading:
             self.downloading_anim.update(dt)
-            self.must_update_details = True
+            self.download_progress_bar.update(self.download_progress.fraction)
 
-    def Render(self, screen: Surface):
-        if not self.oneshot_rendered:
-            self.oneshot_rendered = True
-            screen.fill(c.lightblue_highlight)
-            screen.blit(self.title_text, self.title_rect)
-            screen.blit(self.subtitle_text, self.subtitle_rect)
+        self._update_widgets()
 
-        if self.is_loading:
-            self.oneshot_rendered = False
-            self.loading_bg_surf.fill(c.lightblue_highlight)
-            self.loading_loop_animation.draw()
-            self.loading_bg_surf.blit(self.loading_loop_animation.surf, self.loading_loop_rect)
-            screen.blit(self.loading_bg_surf, (0, (SCREEN_HEIGHT / 4)))
-        if self.must_update:
-            self.level_list_view.draw(screen)
-
-        if self.must_update_details:
-            self.must_update_details = False
-            self.detail_surf.fill(c.lightblue_highlight)
-            self.description_surf.fill(c.lightblue_highlight)
-
-            name = multiline_text(self.selected["name"], color=c.blue_highlight, font=question_asked_font,
-                                  max_length=480)
-            description = multiline_text(self.selected.get("description", ""), font=text_input_font,
-                                         color=c.bg_listview, max_length=480)
-            self.detail_surf.blits(name, False)
-            self.description_surf.blits(description, False)
-
-            self.detail_surf.blit(self.description_surf, (0, question_asked_font.size * len(name) + 40))
-            screen.blit(self.detail_surf, self.detail_rect)
-
-            if self.is_downloading:
-                self.downloading_anim.draw()
-                screen.blit(self.downloading_anim.surf, self.downloading_anim_rect)
-            elif self.is_downloadable:
-                self.download_button.draw(screen)
-            elif self.is_updatable:
-                self.update_button.draw(screen)
-                self.button_remove.draw(screen)
-            elif self.is_uptodate:
-                screen.blit(self.text_uptodate, self.rect_uptodate)
-                self.button_remove.draw(screen)
-
-            if not self.was_successful:
-                self.error_text, _ = light_italic_font_25.render(self.download_msg, fgcolor=c.error)
-                screen.blit(self.error_text, self.error_rect)
+    @staticmethod
+    def _result(task: network.NetworkTask, failed: tuple) -> tuple:
+        """
+        :param task: finished task
+        :param failed: returned instead if the task raised an error, Update must not crash on it
+        :return: return value of the task
+        """
+        try:
+            return task.result()
+        except (OSError, ValueError, KeyError) as e:
+            print(e)
+            return failed
+
+    def _update_widgets(self):
+        """
+        Derives visibility and content of the widgets from the scene state, the widget tree repaints what changed
+        :return:
+        """
+        list_view = self.level_list_view
+        if list_view is not None and self.list_widgets.children != [list_view]:
+            # the listview is rebuilt whenever a manifest is applied
+            for child in list(self.list_widgets.children):
+                self.list_widgets.remove(child)
+            self.list_widgets.add(list_view)
+
+        self.loading_loop_animation.visible = self.is_loading
+        self.search_box.visible = not self.is_loading
+        self.list_widgets.visible = not self.is_loading
+        self.update_all_progress_bar.visible = not self.is_loading and self.update_all_future is not None
+        self.update_all_button.visible = not self.is_loading and self.update_all_future is None and \
+            bool(self.updatable_levels)
+
+        self.detail_widgets.visible = self.selected is not None
+        if self.selected is None:
+            return
+
+        detail_key = (self.selected["name"], self.selected.get("description", ""))
+        if detail_key != self.detail_key:
+            self.detail_key = detail_key
+            self._render_details()
+
+        image_path = self.selected.get("image_path", "")
+        preview = self.previews.get(image_path)
+        if (image_path, preview) != self.preview_key:
+            self.preview_key = image_path, preview
+            self.preview_surf.fill(c.lightblue_highlight)
+            if preview is not None:
+                self.preview_surf.blit(preview, (0, 0))
+            self.preview_picture.invalidate()
+
+        self.downloading_anim.visible = self.is_downloading
+        self.download_progress_bar.visible = self.is_downloading
+        self.download_button.visible = not self.is_downloading and self.is_downloadable
+        self.update_button.visible = not self.is_downloading and self.is_updatable
+        self.uptodate_label.visible = not self.is_downloading and self.is_uptodate
+        self.button_remove.visible = not self.is_downloading and (self.is_updatable or self.is_uptodate)
+
+        self.error_label.visible = not self.was_successful
+        if not self.was_successful:
+            self.error_label.set_text(self.download_msg)
+
+    def _render_details(self):
+        self.detail_surf.fill(c.lightblue_highlight)
+        self.description_surf.fill(c.lightblue_highlight)
+
+        name = multiline_text(self.selected["name"], color=c.blue_highlight, font=question_asked_font,
+                              max_length=480)
+        description = multiline_text(self.selected.get("description", ""), font=text_input_font,
+                                     color=c.bg_listview, max_length=480)
+        self.detail_surf.blits(name, False)
+        self.description_surf.blits(description, False)
+
+        self.detail_surf.blit(self.description_surf, (0, question_asked_font.size * len(name) + 40))
+        self.detail_picture.invalidate()
+
+    def Render(self, screen: Surface):
+        self.ui.render(screen)
 
     def SwitchToScene(self, next_scene):
-        self.executor.shutdown(wait=False)
+        self.token.cancel()
         super(OnlineLibrary, self).SwitchToScene(next_scene)
 
-    def _fetch_lib(self, build_listview: bool = True):
+    def _fetch_lib(self):
+        """
+        Should be called in another thread, Update applies the manifest on the main thread
+        :return: bool (is_successful), string (message), manifest or None if there is nothing new to show
+        """
         try:
             # import time
             # time.sleep(5)
-            response = requests.get(UPDATE_URL)
-            if not 200 <= response.status_code < 300:
-                return False, "Server unreachable or not ready"
+            response = upd.fetch_manifest()
+            if not response.ok:
+                return False, "Server unreachable or not ready", None
 
-            data = response.json()
+            if response.from_cache and self.level_list_view is not None:
+                # manifest unchanged (or server offline) and already shown
+                return True, "", None
 
-            all_levels = data["datasets"]
-            level_list = []
-            for key in all_levels.keys():
-                level_list.append(all_levels[key]["name"])
+            return True, "", response.json()
 
-            ds.load_datasets()
+        except (requests.Timeout, requests.ConnectionError) as e:
+            print(e)
+            return False, "Connection to server timed out or a connection error occurred", None
 
-            for dataset in ds.DATASET_INFO:
-                filename = dataset["filename"]
-                key = Path(filename).stem
-                path = Path(dataset.get("path", None))
-                if path is None:
-                    path = Path(rel_to_writable(f"data/{filename}"))
-                try:
-                    level = all_levels[key]
-                    local_version = vp(dataset["version"])
-                    latest_version = vp(level["version"])
-                    if local_version < latest_version:
-                        state = "updatable"
-                    elif local_version >= latest_version:
-                        state = "uptodate"
-                    else:
-                        state = "downloadable"
+        except ValueError as e:
+            print(e)
+            return False, "Couldn't read update data", None
 
-                    all_levels[key]["state"] = state
-                    all_levels[key]["path"] = path
-                    all_levels[key]["filename"] = filename
+    def _apply_manifest(self, data: dict, cached_only: bool = False):
+        """
+        Starts paging through the manifest's catalogue, builds the listview from the first page
+        and reconciles the local datasets. Main thread only, it replaces the state ProcessInput and Render read
+        :param data: update manifest
+        :param cached_only: data is the cached manifest, remote catalogue pages are read from the HTTP cache then
+        :return:
+        """
+        selected_key = self.level_keys[self.clicked_index] if self.clicked_index is not None else None
 
-                except KeyError as e:
-                    print(f"error: {e}")
-                    # dataset not locally existing, so continuing
-                    continue
+        self.manifest_levels = data.get("datasets", {})
+        self.local_datasets = self._local_dataset_index()
+        self.catalogue = CataloguePager(data)
+        self.page_fetch_failed = False
+
+        self.all_levels = {}
+        self.level_keys = []
+        self.level_list = []
+        self.search_index = SearchIndex()
+        self.clicked_index = None
+        if cached_only or not self.catalogue.needs_network:
+            self._add_levels(self.catalogue.next_page(cached_only=True))
+        # else Update requests the first remote page like the following ones
+        self._update_updatable()
+
+        if selected_key in self.all_levels:
+            # keep the selection pointing at the same level after reconciling
+            self.clicked_index = self.level_keys.index(selected_key)
+            self.selected = self.all_levels[selected_key]
+
+        self.filtered = self.search_index.search(self.search_box.text)
+        selected = self.filtered.index(self.clicked_index) if self.clicked_index in self.filtered else None
+        lv = ListView([self.level_list[i] for i in self.filtered], selection=True, selected_index=selected,
+                      bg_color=c.lightblue_highlight, base_color=c.blue_highlight, pressed_color=c.bg_listview,
+                      hover_color=c.bg_button_pressed, item_length=550, item_height=50, height=350,
+                      vertical_clip_scroll=True)
+        lv.rect.left = SCREEN_WIDTH / 12
+        lv.rect.top = SCREEN_HEIGHT / 5 * 2 + 50
+        self.level_list_view = lv
 
-            self.all_levels = all_levels
-            self.level_list = level_list
-            self.level_keys = list(all_levels.keys())
+        self.is_loading = False
+        self.fetch_done = True
 
-            if build_listview:
-                lv = ListView(level_list, selection=True, bg_color=c.lightblue_highlight, base_color=c.blue_highlight,
-                              pressed_color=c.bg_listview, hover_color=c.bg_button_pressed,
-                              item_length=550, item_height=50, vertical_clip_scroll=True)
-                lv.rect.left = SCREEN_WIDTH / 12
-                lv.rect.top = SCREEN_HEIGHT / 5 * 2
-                self.level_list_view = lv
+    @staticmethod
+    def _local_dataset_index() -> dict:
+        ds.load_datasets()
+        return {Path(dataset["filename"]).stem: dataset for dataset in ds.DATASET_INFO}
 
-            self.is_loading = False
-            self.fetch_done = True
+    def _reconcile(self, key: str, level: dict):
+        """
+        Sets state, path and filename of a manifest entry according to the local datasets
+        :param key: manifest key, filename without suffix
+        :param level: manifest entry, modified in place
+        :return:
+        """
+        dataset = self.local_datasets.get(key, None)
+        if dataset is None:
+            # dataset not locally existing
+            level["state"] = "downloadable"
+            return
+
+        local_version = version.parse(dataset["version"])
+        latest_version = version.parse(level["version"])
+        if local_version < latest_version:
+            level["state"] = "updatable"
+        else:
+            level["state"] = "uptodate"
+        level["path"] = Path(dataset["path"])
+        level["filename"] = dataset["filename"]
 
-            return True, ""
+    def _add_levels(self, page: list) -> list:
+        """
+        Reconciles and stores a page of the catalogue
+        :param page: [(key, level), ...]
+        :return: names of the added levels
+        """
+        names = []
+        for key, level in page:
+            self._reconcile(key, level)
+            self.all_levels[key] = level
+            self.level_keys.append(key)
+            names.append(level["name"])
+            # installed levels are also found by their location names
+            local = self.local_datasets.get(key, {})
+            self.search_index.add(level_search_fields(level) + local.get("location_names", []))
+        self.level_list += names
+        return names
+
+    def _update_updatable(self):
+        updatable = []
+        for key in self.local_datasets.keys():
+            level = self.all_levels.get(key, self.manifest_levels.get(key, None))
+            if level is None:
+                continue
+            self._reconcile(key, level)
+            if level["state"] == "updatable":
+                updatable.append((level["filename"], level["path"]))
+        self.updatable_levels = updatable
+
+    def _refresh_states(self, local_datasets: dict):
+        """
+        Reconciles the loaded levels with the local datasets, call after downloading or removing.
+        Main thread only, pages are added to the levels there
+        :param local_datasets: _local_dataset_index() read by the task that changed them
+        :return:
+        """
+        self.local_datasets = local_datasets
+        for key, level in self.all_levels.items():
+            self._reconcile(key, level)
+        self._update_updatable()
 
-        except (Timeout, ConnectionError) as e:
+    def _prefetch_previews(self, index: int):
+        """
+        Prefetches the map previews of the levels around index, nearest first
+        :param index: hovered or selected row
+        :return:
+        """
+        self.prefetch_index = index
+        rows = self.filtered
+        order = sorted(range(max(0, index - self.prefetch_radius), min(len(rows), index + self.prefetch_radius + 1)),
+                       key=lambda i: abs(i - index))
+        image_paths = [self.all_levels[self.level_keys[rows[i]]].get("image_path", None) for i in order]
+        self.previews.prefetch([image_path for image_path in image_paths if image_path is not None])
+
+    def _fetch_page(self, catalogue: CataloguePager):
+        try:
+            return catalogue, catalogue.next_page(token=self.token)
+        except (requests.Timeout, requests.ConnectionError, KeyError, ValueError) as e:
             print(e)
-            return False, "Connection to server timed out or a connection error occurred"
+            return catalogue, []
 
-        except (KeyError, ValueError) as e:
-            print(e)
-            return False, "Couldn't read update data"
+    def _show_page(self, page: list):
+        start = len(self.level_keys)
+        self._add_levels(page)
+        matches = self.search_index.search(self.search_box.text, start)
+        self.filtered += matches
+        self.level_list_view.extend([self.level_list[i] for i in matches])
 
-    def _download_selected(self):
-        url = DATASETS_DOWNLOAD_URL + self.selected["filename"]
-        path = self.selected.get("path", Path(rel_to_writable(f"data/{self.selected['filename']}")))
+    def apply_search(self):
+        """
+        Lists only the loaded levels matching the text of the search box
+        :return:
+        """
+        self.filtered = self.search_index.search(self.search_box.text)
+        if self.clicked_index in self.filtered:
+            selected = self.filtered.index(self.clicked_index)
+        else:
+            # hides the details, their buttons would act on a level that is no longer listed
+            selected = None
+            self.clicked_index = None
+            self.selected = None
+        self.level_list_view.set_list([self.level_list[i] for i in self.filtered], selected)
+        self.prefetch_index = None
+
+    def _download_selected(self, level: dict):
+        """
+        Should be called in another thread
+        :param level: manifest entry, passed in as the selection may change during the download
+        :return: bool (is_successful), string (message), local dataset index or None if nothing changed
+        """
+        url = DATASETS_DOWNLOAD_URL + level["filename"]
+        path = level.get("path", Path(rel_to_writable(f"data/{level['filename']}")))
         custom = is_custom_path(path=path)
-        success, msg = upd.download_to_dir(url=url, path=path)
+        success, msg = upd.update_dataset(url=url, path=path, level=level, progress=self.download_progress,
+                                          token=self.token)
         if not success:
-            return success, msg
+            return success, msg, None
 
-        image_filename = Path(self.selected["image_path"])
+        image_filename = Path(level["image_path"])
 
         url = DATASETS_DOWNLOAD_URL + image_filename.name
         if custom:
@@ -954,20 +1239,39 @@ class OnlineLibrary(SceneBase):
 
         if not (Path(rel_to_root(f"resources/textures/{image_filename}")).exists() or
                 Path(rel_to_writable(f"textures/{image_filename}")).exists()):
-            success, msg = upd.download_to_dir(url, path)
+            success, msg = upd.download_to_dir(url, path, progress=self.download_progress, token=self.token)
             if not success:
-                return success, msg
+                # the dataset itself is in place
+                return success, msg, self._local_dataset_index()
+
+        return True, "", self._local_dataset_index()
+
+    async def _update_all(self, updatable: list, manifest_datasets: dict):
+        """
+        :param updatable: [(filename, path), ...]
+        :param manifest_datasets: {key: manifest entry}
+        :return: bool (is_successful), string (message), local dataset index or None if nothing changed
+        """
+        success, msg = await upd.update_datasets(updatable, manifest_datasets=manifest_datasets,
+                                                 progress=self.update_all_progress, token=self.token)
+        if not success:
+            return success, msg, None
 
-        return self._fetch_lib(build_listview=False)
+        return True, "", await network.run_blocking(self._local_dataset_index)
 
-    def _remove_selected(self):
+    def _remove_selected(self, level: dict):
+        """
+        Should be called in another thread
+        :param level: manifest entry of an installed level
+        :return: bool (is_successful), string (message), local dataset index or None if nothing changed
+        """
         try:
             dataset_info = ds.DATASET_INFO
 
-            path = Path(self.selected["path"])
+            path = Path(level["path"])
             path.unlink()
 
-            image_filename = self.selected["image_path"]
+            image_filename = level["image_path"]
 
             used = False
             for dataset in dataset_info:
@@ -986,50 +1290,47 @@ class OnlineLibrary(SceneBase):
                 if image_path.exists():
                     image_path.unlink()
 
-            return self._fetch_lib(build_listview=False)
+            return True, "", self._local_dataset_index()
         except PermissionError:
-            return False, "Not enough permissions to remove selected level"
+            return False, "Not enough permissions to remove selected level", None
         except FileNotFoundError as e:
             print(f"File not Found error: {e}")
-            return False, f"File not found Error"
+            return False, f"File not found Error", None
 
 
 class About(SceneBase):
     def __init__(self):
         super(About, self).__init__()
 
-        self.title_text, self.title_rect = scene_title_font.render("About", c.blue_highlight)
+        self.title_text, self.title_rect = render_text(scene_title_font, "About", c.blue_highlight)
         self.title_rect.topleft = SCREEN_WIDTH / 12, SCREEN_HEIGHT / 6
 
         # Project host
-        homepage_icon = image.load(rel_to_root("resources/textures/homepage_icon.png")).convert_alpha()
-        self.github_logo = image.load(rel_to_root("resources/textures/GitHub-Mark-Light-64px.png")).convert_alpha()
         self.button_github = Button((SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 5 * 2), (160, 50), "GitHub",
-                                    logo_surf=self.github_logo, base_color=c.blue_highlight,
+                                    logo="github", base_color=c.blue_highlight,
                                     pressed_color=c.bg_listview, hover_color=c.bg_button_pressed,
                                     logo_margin=(12, 12, 10, 10))
 
-        self.text_checkout, self.rect_checkout = category_font.render("Check this project out:", c.bg_listview)
+        self.text_checkout, self.rect_checkout = render_text(category_font, "Check this project out:", c.bg_listview)
         self.rect_checkout.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 3 + 10
 
         self.button_homepage = Button((SCREEN_WIDTH / 7 * 4 + 180, SCREEN_HEIGHT / 5 * 2), (210, 50), "Homepage",
                                       base_color=c.blue_highlight,
                                       pressed_color=c.bg_listview, hover_color=c.bg_button_pressed,
-                                      logo_margin=(10, 13, 10, 10), logo_surf=homepage_icon)
+                                      logo_margin=(10, 13, 10, 10), logo="homepage")
 
         # Contact
-        self.title_contact_text, self.title_contact_rect = category_font.render("Kontakt:", c.bg_listview)
+        self.title_contact_text, self.title_contact_rect = render_text(category_font, "Kontakt:", c.bg_listview)
         self.title_contact_rect.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 20 * 11
 
-        self.text_email, self.rect_email = text_input_font.render(CONTACT_EMAIL, c.blue_highlight)
+        self.text_email, self.rect_email = render_text(text_input_font, CONTACT_EMAIL, c.blue_highlight)
         self.rect_email.topleft = SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 20 * 11 + 40
 
-        self.mail_icon = image.load(rel_to_root("resources/textures/mail_icon.png")).convert_alpha()
         self.button_email = Button((SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 20 * 11 + 80), (170, 50), text="E-Mail",
-                                   base_color=c.blue_highlight, logo_surf=self.mail_icon, logo_margin=(12, 20, 10, 10),
+                                   base_color=c.blue_highlight, logo="mail", logo_margin=(12, 20, 10, 10),
                                    pressed_color=c.bg_listview, hover_color=c.bg_button_pressed)
         self.button_contact = Button((SCREEN_WIDTH / 7 * 4, SCREEN_HEIGHT / 20 * 11 + 145), (290, 50),
-                                     "Kontakt Formular", base_color=c.blue_highlight, logo_surf=homepage_icon,
+                                     "Kontakt Formular", base_color=c.blue_highlight, logo="homepage",
                                      pressed_color=c.bg_listview, hover_color=c.bg_button_pressed,
                                      logo_margin=(10, 13, 10, 10))
 
@@ -1044,9 +1345,24 @@ Version: v{VERSION}
 Python {platform.python_version()}
 """,
                                          font=text_input_font, color=c.bg_listview, max_length=480)
-        self.info_text = Surface((510, 400))
+        self.info_text = make_surface((510, 400))
+
+        # widgets
+        self.ui = WidgetTree(c.lightblue_highlight)
+        background = self.ui.background
+        background.blit(self.title_text, self.title_rect)
+        background.blit(self.text_checkout, self.rect_checkout)
+        background.blit(self.title_contact_text, self.title_contact_rect)
+        background.blit(self.text_email, self.rect_email)
+
+        self.info_text.fill(c.lightblue_highlight)
+        self.info_text.blits(self.info_texts, False)
+        background.blit(self.info_text, (SCREEN_WIDTH / 12, SCREEN_HEIGHT / 3 + 10))
+        draw.line(background, c.bg_listview, start_pos=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6 + 70),
+                  end_pos=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6 * 5), width=3)
+
+        self.ui.add(Group(self.button_github, self.button_homepage, self.button_email, self.button_contact))
 
-        self.must_update = False
         self.link_click_cooldown = 2
 
     def ProcessInput(self, events, pressed_keys, dt):
@@ -1057,10 +1373,10 @@ Python {platform.python_version()}
                                                   interpolator="CubicEaseOut"))
                     break
             if event.type == MOUSEBUTTONDOWN or event.type == MOUSEMOTION or event.type == MOUSEBUTTONUP:
-                self.must_update = self.button_github.handle_input(event) or self.must_update
-                self.must_update = self.button_homepage.handle_input(event) or self.must_update
-                self.must_update = self.button_email.handle_input(event) or self.must_update
-                self.must_update = self.button_contact.handle_input(event) or self.must_update
+                self.button_github.handle_input(event)
+                self.button_homepage.handle_input(event)
+                self.button_email.handle_input(event)
+                self.button_contact.handle_input(event)
 
                 if self.button_github.is_clicked and self.link_click_cooldown >= 2:
                     self.link_click_cooldown = 0
@@ -1082,31 +1398,7 @@ Python {platform.python_version()}
         self.link_click_cooldown += dt
 
     def Render(self, screen: Surface):
-        if not self.oneshot_rendered:
-            self.oneshot_render(screen)
-        if self.must_update:
-            self.button_github.draw(screen)
-            self.button_homepage.draw(screen)
-            self.button_email.draw(screen)
-            self.button_contact.draw(screen)
-
-    def oneshot_render(self, screen: Surface):
-        self.oneshot_rendered = True
-        screen.fill(c.lightblue_highlight)
-        screen.blit(self.title_text, self.title_rect)
-        self.button_github.draw(screen)
-        self.button_homepage.draw(screen)
-        screen.blit(self.text_checkout, self.rect_checkout)
-        screen.blit(self.title_contact_text, self.title_contact_rect)
-        self.button_email.draw(screen)
-        self.button_contact.draw(screen)
-        screen.blit(self.text_email, self.rect_email)
-
-        self.info_text.fill(c.lightblue_highlight)
-        self.info_text.blits(self.info_texts, False)
-        screen.blit(self.info_text, (SCREEN_WIDTH / 12, SCREEN_HEIGHT / 3 + 10))
-        draw.line(screen, c.bg_listview, start_pos=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6 + 70),
-                  end_pos=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 6 * 5), width=3)
+        self.ui.render(screen)
 
     @staticmethod
     def goto_github():
@@ -1,5 +1,7 @@
 from pygame import Surface
 
+from game.memory import memory_tracker
+
 
 class SceneBase:
     def __init__(self):
@@ -43,6 +45,8 @@ class SceneBase:
         :param next_scene: Subclass of SceneBase to switch to
         :return:
         """
+        if memory_tracker.enabled:
+            print(memory_tracker.scene_switched(self, next_scene))
         self.next = next_scene
 
     def Terminate(self):
@@ -0,0 +1,139 @@
+"""
+Inverted index for searching levels by name, description, categories and location names.
+Every query term matches tokens it is a prefix of, all terms have to match. Posting lists are stored as int
+bitmasks over the document ids, so intersections and unions are single big-int operations.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+
+__all__ = ["SearchIndex", "normalize", "tokenize", "level_search_fields"]
+
+SHORT_PREFIX = 2  # prefixes up to this length are precomputed, longer ones are looked up in the sorted tokens
+QUERY_CACHE_ITEMS = 64
+
+_token_re = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Case folds and strips diacritics, "Städte" -> "stadte"
+    :param text:
+    :return:
+    """
+    text = text.casefold()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list:
+    return _token_re.findall(normalize(text))
+
+
+def level_search_fields(level: dict) -> list:
+    """
+    Searchable texts of a dataset info or manifest entry
+    :param level:
+    :return: list of strings
+    """
+    fields = [level.get("name", ""), level.get("description", "")]
+    categories = level.get("categories", [])
+    if isinstance(categories, (list, tuple)):
+        fields += [str(category) for category in categories]
+    fields += [str(location) for location in level.get("location_names", [])]
+    return fields
+
+
+class SearchIndex:
+    def __init__(self, documents: list = None):
+        """
+        :param documents: list of lists of searchable strings, document ids are the list positions
+        """
+        self.count = 0
+        self._postings = {}  # {token: bitmask of documents}
+        self._short = {}  # {short prefix: bitmask of documents}
+        self._tokens = []  # sorted tokens, rebuilt lazily after adding documents
+        self._sorted = True
+        self._cache = OrderedDict()  # {terms: bitmask}
+
+        for fields in documents or []:
+            self.add(fields)
+        self._sort_tokens()
+
+    def add(self, fields: list) -> int:
+        """
+        :param fields: searchable strings of the document
+        :return: document id
+        """
+        doc_id = self.count
+        self.count += 1
+        bit = 1 << doc_id
+
+        postings = self._postings
+        tokens = set(_token_re.findall(normalize(" ".join(fields))))
+        for token in tokens:
+            if token not in postings:
+                postings[token] = bit
+                self._sorted = False
+            else:
+                postings[token] |= bit
+
+        short = self._short
+        for prefix in set(token[:length] for token in tokens for length in range(1, SHORT_PREFIX + 1)):
+            short[prefix] = short.get(prefix, 0) | bit
+
+        self._cache.clear()
+        return doc_id
+
+    def _sort_tokens(self):
+        if not self._sorted:
+            self._tokens = sorted(self._postings)
+            self._sorted = True
+
+    def _term_mask(self, term: str) -> int:
+        if len(term) <= SHORT_PREFIX:
+            return self._short.get(term, 0)
+
+        self._sort_tokens()
+        tokens = self._tokens
+        mask = 0
+        i = bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            mask |= self._postings[tokens[i]]
+            i += 1
+        return mask
+
+    def query_mask(self, query: str) -> int:
+        """
+        :param query:
+        :return: bitmask of the matching documents, all documents for an empty query
+        """
+        terms = tuple(tokenize(query))
+        mask = self._cache.get(terms, None)
+        if mask is not None:
+            self._cache.move_to_end(terms)
+            return mask
+
+        mask = (1 << self.count) - 1
+        for term in sorted(terms, key=len, reverse=True):
+            mask &= self._term_mask(term)
+            if not mask:
+                break
+
+        self._cache[terms] = mask
+        while len(self._cache) > QUERY_CACHE_ITEMS:
+            self._cache.popitem(last=False)
+        return mask
+
+    def search(self, query: str, start: int = 0) -> list:
+        """
+        :param query: search terms, matched as prefixes of words
+        :param start: only return documents with an id >= start, e.g. the ones added since the last search
+        :return: ascending ids of the matching documents
+        """
+        mask = self.query_mask(query) >> start
+        bits = bin(mask)[:1:-1]
+        return [start + i for i, bit in enumerate(bits) if bit == "1"]
@@ -1,19 +1,22 @@
 import json
+import os
 import subprocess
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed, Future
 from itertools import chain
 from pathlib import Path
 
-import requests
-from packaging.version import parse as vp
-from requests import Timeout, ConnectionError
+from game.config import UPDATE_URL, UPDATE_FETCHING_TYPE_VERSION, VERSION, APP_DOWNLOAD_URL, HTTP_TIMEOUT, \
+    DATASETS_DOWNLOAD_URL
+from game.updates import http_cache, network, delta
+from game.utils import rel_to_root, rel_to_writable, temp_path, is_custom_path, lazy_import
 
-from game.config import UPDATE_URL, UPDATE_FETCHING_TYPE_VERSION, VERSION, APP_DOWNLOAD_URL
-from game.utils import rel_to_root, rel_to_writable, temp_path
+asyncio = lazy_import("asyncio")
+requests = lazy_import("requests")
+version = lazy_import("packaging.version")
 
 __all__ = ["APP_UPDATE_AVAILABLE", "DATA_UPDATABLE", "LATEST_APP_VERSION", "UPDATES_CHECKED", "UPDATE_CHECK_SUCCESSFUL",
-           "start_update_check", "check_update"]
+           "start_update_check", "check_update", "fetch_manifest", "cached_manifest", "download_to_dir",
+           "update_dataset", "DownloadProgress", "AggregateProgress", "APP_DOWNLOAD_PROGRESS", "update_datasets"]
 
 APP_UPDATE_AVAILABLE = False
 APP_REINSTALL_NEEDED = False
@@ -23,7 +26,6 @@ LATEST_INSTALLER_NAME = None
 
 DO_APP_UPDATE = False
 STARTED_APP_UPDATE = False
-APP_UPDATE_DONE = False
 
 UPDATES_CHECKED = False
 IS_UPDATE_CHECKING = False
@@ -31,8 +33,96 @@ UPDATE_CHECK_SUCCESSFUL = None
 
 FETCHED_DATASETS = {}
 
-APP_DOWNLOAD_EXECUTOR = None
-APP_DOWNLOAD_FUTURE = None
+UPDATE_CHECK_TASK = None
+APP_DOWNLOAD_TASK = None
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DATASET_UPDATE_WORKERS = 4
+
+
+class DownloadProgress:
+    def __init__(self):
+        """
+        Byte-level progress of a download, written by the downloading thread and polled by scenes
+        """
+        self.received = 0
+        self.total = None
+        self.done = False
+
+    def reset(self):
+        self.received = 0
+        self.total = None
+        self.done = False
+
+    @property
+    def fraction(self) -> float:
+        """
+        :return: 0..1, 0 as long as the total size is unknown
+        """
+        if not self.total:
+            return 1.0 if self.done else 0.0
+        return min(self.received / self.total, 1.0)
+
+    @property
+    def percent(self) -> int:
+        return int(self.fraction * 100)
+
+
+class AggregateProgress:
+    def __init__(self):
+        """
+        Combined progress of several downloads, byte-weighted once all sizes are known
+        """
+        self.parts = []
+
+    def add(self) -> DownloadProgress:
+        part = DownloadProgress()
+        self.parts.append(part)
+        return part
+
+    @property
+    def done(self) -> bool:
+        return all(part.done for part in self.parts)
+
+    @property
+    def fraction(self) -> float:
+        parts = self.parts
+        if not parts:
+            return 0.0
+        totals = [part.total for part in parts]
+        if all(totals):
+            return min(sum(part.received for part in parts) / sum(totals), 1.0)
+        return sum(part.fraction for part in parts) / len(parts)
+
+    @property
+    def percent(self) -> int:
+        return int(self.fraction * 100)
+
+
+APP_DOWNLOAD_PROGRESS = DownloadProgress()
+
+
+def fetch_manifest():
+    """
+    Fetches the update manifest, revalidated against the on-disk cache.
+    Falls back to the cached manifest if the server is unreachable
+    :return: http_cache.CachedResponse, check .ok
+    """
+    return http_cache.cached_get(UPDATE_URL)
+
+
+def cached_manifest():
+    """
+    Update manifest from the on-disk cache without contacting the server
+    :return: dict or None if nothing is cached or unreadable
+    """
+    cached = http_cache.read_cached(UPDATE_URL)
+    if cached is None:
+        return None
+    try:
+        return cached.json()
+    except ValueError:
+        return None
 
 
 def _fetch_updates():
@@ -47,19 +137,18 @@ def _fetch_updates():
     global LATEST_INSTALLER_NAME
     global FETCHED_DATASETS
     global IS_UPDATE_CHECKING
-    # TODO: Fix blocked quit attempts while running threads
     try:
         # import time
         # time.sleep(3)
-        response = requests.get(UPDATE_URL)
+        response = fetch_manifest()
 
-        if not 200 <= response.status_code < 300:
+        if not response.ok:
             return False, "Server unreachable or not ready"
 
         data = response.json()
 
-        current_fetching_version = vp(UPDATE_FETCHING_TYPE_VERSION)
-        server_fetching_version = vp(data.get("fetching_type_version", "0.0"))
+        current_fetching_version = version.parse(UPDATE_FETCHING_TYPE_VERSION)
+        server_fetching_version = version.parse(data.get("fetching_type_version", "0.0"))
 
         # Compare Fetching versions
         if current_fetching_version != server_fetching_version:
@@ -72,19 +161,19 @@ def _fetch_updates():
 
         # f for fetched
         # App version
-        app_v = vp(VERSION)
-        f_app_v = vp(data["app"])
+        app_v = version.parse(VERSION)
+        f_app_v = version.parse(data["app"])
         if app_v < f_app_v:
             APP_UPDATE_AVAILABLE = True
             LATEST_APP_VERSION = str(f_app_v)
             LATEST_INSTALLER_NAME = data["latest_installer_name"]
-            reinstall_v = vp(data["reinstall_needed"])
+            reinstall_v = version.parse(data["reinstall_needed"])
 
             if app_v <= reinstall_v:
                 APP_REINSTALL_NEEDED = True
 
         # datasets
-        f_datasets = data["datasets"]
+        f_datasets = data.get("datasets", {})
         FETCHED_DATASETS = f_datasets
         f_dataset_names = f_datasets.keys()
 
@@ -99,8 +188,8 @@ def _fetch_updates():
                 with open(file) as d:
                     dataset = json.load(d)
 
-                    data_version = vp(dataset["version"])
-                    f_data_version = vp(f_datasets[name]["version"])
+                    data_version = version.parse(dataset["version"])
+                    f_data_version = version.parse(f_datasets[name]["version"])
 
                     if data_version < f_data_version:
                         DATA_UPDATABLE.append((file.name, file))
@@ -108,7 +197,7 @@ def _fetch_updates():
         # print(f"Updatable: {DATA_UPDATABLE}")
         return True, ""
 
-    except (Timeout, ConnectionError) as e:
+    except (requests.Timeout, requests.ConnectionError) as e:
         print(e)
         return False, "Connection to server timed out or a connection error occurred"
 
@@ -120,44 +209,57 @@ def _fetch_updates():
         IS_UPDATE_CHECKING = False
 
 
-def start_update_check():
+def start_update_check() -> network.NetworkTask:
     global IS_UPDATE_CHECKING
+    global UPDATE_CHECK_TASK
     IS_UPDATE_CHECKING = True
-    executor = ThreadPoolExecutor()
-    thread = executor.submit(_fetch_updates)
-    return executor, thread
+    UPDATE_CHECK_TASK = network.submit(_fetch_updates)
+    return UPDATE_CHECK_TASK
 
 
-def check_update(thread: Future, executor: ThreadPoolExecutor):
+def check_update(task: network.NetworkTask):
+    """
+    Polls the update check and the app download, call once per frame
+    :param task: handle returned by start_update_check
+    :return:
+    """
     global UPDATES_CHECKED
     global UPDATE_CHECK_SUCCESSFUL
     global IS_UPDATE_CHECKING
     global STARTED_APP_UPDATE
     global DO_APP_UPDATE
-    global APP_UPDATE_DONE
-    global APP_DOWNLOAD_EXECUTOR
-    global APP_DOWNLOAD_FUTURE
+    global APP_DOWNLOAD_TASK
 
-    if not UPDATES_CHECKED and not IS_UPDATE_CHECKING:
-        for task in as_completed([thread]):
-            UPDATE_CHECK_SUCCESSFUL, msg = task.result()
+    if not UPDATES_CHECKED and task.done():
+        if task.cancelled():
+            UPDATE_CHECK_SUCCESSFUL = False
+        else:
+            try:
+                UPDATE_CHECK_SUCCESSFUL, msg = task.result()
+            except (OSError, ValueError, KeyError) as e:
+                print(e)
+                UPDATE_CHECK_SUCCESSFUL, msg = False, "Update check failed"
             if not UPDATE_CHECK_SUCCESSFUL:
                 print(msg)
-            break
 
-        executor.shutdown(wait=True)
         UPDATES_CHECKED = True
         IS_UPDATE_CHECKING = False
 
     if DO_APP_UPDATE and not STARTED_APP_UPDATE:
         DO_APP_UPDATE = False
         STARTED_APP_UPDATE = True
-        APP_DOWNLOAD_EXECUTOR = ThreadPoolExecutor()
-        APP_DOWNLOAD_FUTURE = APP_DOWNLOAD_EXECUTOR.submit(update_app)
-    if STARTED_APP_UPDATE and APP_UPDATE_DONE:
+        token = network.new_token()
+        APP_DOWNLOAD_TASK = network.submit(update_app, token, token=token)
+    if STARTED_APP_UPDATE and APP_DOWNLOAD_TASK.done():
         STARTED_APP_UPDATE = False
-        APP_UPDATE_DONE = False
-        success, msg = APP_DOWNLOAD_FUTURE.result()
+        if APP_DOWNLOAD_TASK.cancelled():
+            return
+        try:
+            success, msg = APP_DOWNLOAD_TASK.result()
+        except (OSError, ValueError, KeyError) as e:
+            # the game keeps running without the update
+            print(e)
+            success, msg = False, "App update failed"
         if success:
             subprocess.Popen([msg], close_fds=True, shell=True)
             if APP_REINSTALL_NEEDED:
@@ -167,52 +269,213 @@ def check_update(thread: Future, executor: ThreadPoolExecutor):
             print(msg)
 
 
-def update_app():
-    global APP_UPDATE_DONE
+def update_app(token: network.CancelToken = None):
     path = temp_path.joinpath(LATEST_INSTALLER_NAME)
     url = APP_DOWNLOAD_URL + LATEST_INSTALLER_NAME
-    with ThreadPoolExecutor() as executor:
-        f = executor.submit(download_to_dir, url, path)
-        successful, msg = f.result()
-    APP_UPDATE_DONE = True
+    successful, msg = download_to_dir(url, path, APP_DOWNLOAD_PROGRESS, token)
     if not successful:
         return successful, msg
 
     return True, path
 
 
-def download_to_dir(url, path):
+def download_to_dir(url, path, progress: DownloadProgress = None, token: network.CancelToken = None):
+    """
+    Streams url in chunks into '<path>.part' and renames it to path when complete.
+    A partial file left by a dropped connection is resumed with an HTTP Range request
+    :param url:
+    :param path: destination file
+    :param progress: optional DownloadProgress to report received bytes to
+    :param token: optional CancelToken, checked between chunks. Cancelling closes the connection
+    :return: bool (is_successful), string (message)
+    """
     # import time
     # time.sleep(3)
+    path = Path(path)
+    part_path = path.with_name(path.name + ".part")
+    if progress is None:
+        progress = DownloadProgress()
+    progress.reset()
+
+    if token is None:
+        token = network.CancelToken()
+
     try:
-        response = requests.get(url, allow_redirects=True)
-        if not 200 <= response.status_code < 300:
-            return False, "Server unreachable or not ready"
-        with open(path, "wb+") as file:
-            file.write(response.content)
+        token.raise_if_cancelled()
+        headers = http_cache.conditional_headers(url, path)
+        resume_from = part_path.stat().st_size if part_path.exists() else 0
+        if resume_from:
+            if_range = http_cache.validator(url, part_path)
+            if if_range is not None:
+                headers = {"Range": f"bytes={resume_from}-", "If-Range": if_range}
+            else:
+                # partial file of unknown origin, cannot be resumed safely
+                part_path.unlink()
+                resume_from = 0
+
+        with requests.get(url, headers=headers, allow_redirects=True, timeout=HTTP_TIMEOUT, stream=True) as response:
+            if response.status_code == 304:
+                # local copy still current
+                progress.done = True
+                return True, ""
+            if response.status_code == 416:
+                # stale partial file, start over
+                part_path.unlink()
+                return download_to_dir(url, path, progress, token)
+            if not 200 <= response.status_code < 300:
+                return False, "Server unreachable or not ready"
+
+            if response.status_code != 206:
+                resume_from = 0
+            length = response.headers.get("Content-Length")
+            progress.received = resume_from
+            progress.total = resume_from + int(length) if length is not None else None
+
+            path.parent.mkdir(exist_ok=True, parents=True)
+            if not resume_from:
+                # remember validators of the partial file for resuming
+                http_cache.store_validators(url, response, part_path)
+
+            token.on_cancel(response.close)
+            try:
+                with open(part_path, "ab" if resume_from else "wb") as file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        token.raise_if_cancelled()
+                        file.write(chunk)
+                        progress.received += len(chunk)
+            finally:
+                token.remove_callback(response.close)
+            token.raise_if_cancelled()
+
+        os.replace(part_path, path)
+        http_cache.store_validators(url, response, path)
+        progress.done = True
         return True, ""
 
-    except (Timeout, ConnectionError) as e:
+    except network.Cancelled:
+        # partial file is kept to be resumed
+        return False, "Download cancelled"
+    except (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+        # partial file is kept to be resumed
+        if token.cancelled:
+            return False, "Download cancelled"
         print(e)
         return False, "Connection to server timed out or a connection error occurred"
     except PermissionError as e:
         print(e)
         return False, "Permission Error, try running app as Administrator/root"
+    except OSError as e:
+        # e.g. the disk is full or the destination is still opened by another program
+        print(e)
+        return False, "Couldn't save the download"
+
+
+def update_dataset(url, path, level: dict = None, progress: DownloadProgress = None,
+                   token: network.CancelToken = None, destination=None):
+    """
+    Brings a dataset up to date. Applies the patches advertised in its manifest entry if possible
+    and falls back to downloading the whole file
+    :param url: download url of the full dataset
+    :param path: local dataset, may not exist yet
+    :param level: manifest entry of the dataset
+    :param progress: optional DownloadProgress
+    :param token: optional CancelToken
+    :param destination: where to write the result, defaults to path
+    :return: bool (is_successful), string (message)
+    """
+    destination = path if destination is None else destination
+    if level is not None and level.get("patches", None) and Path(path).exists():
+        try:
+            successful, msg = delta.patch_dataset(path, level, destination, token)
+            if successful:
+                if progress is not None:
+                    progress.done = True
+                return True, ""
+            print(msg)
+        except network.Cancelled:
+            return False, "Download cancelled"
+        except (requests.Timeout, requests.ConnectionError, KeyError, ValueError, TypeError, OSError) as e:
+            print(f"Patching failed, downloading full dataset: {e}")
+
+    return download_to_dir(url, destination, progress, token)
+
+
+async def update_datasets(datasets: list = None, manifest_datasets: dict = None, progress: AggregateProgress = None,
+                          max_workers: int = DATASET_UPDATE_WORKERS, token: network.CancelToken = None):
+    """
+    Downloads the given datasets and their missing textures in parallel next to their destinations and moves them
+    into place only after every download succeeded.
+    Coroutine, run it on the network loop with network.submit
+    :param datasets: [(name-for-download, filepath), ...], defaults to DATA_UPDATABLE
+    :param manifest_datasets: "datasets" of the update manifest, defaults to FETCHED_DATASETS
+    :param progress: optional AggregateProgress to report to
+    :param max_workers: number of concurrent downloads
+    :param token: optional CancelToken stopping all downloads
+    :return: bool (is_successful), string (message)
+    """
+    datasets = list(DATA_UPDATABLE if datasets is None else datasets)
+    manifest_datasets = FETCHED_DATASETS if manifest_datasets is None else manifest_datasets
+    if progress is None:
+        progress = AggregateProgress()
+
+    jobs = []  # [(url, staged path, destination, manifest entry or None for textures), ...]
+    images = set()
+    for name, file in datasets:
+        file = Path(file)
+        level = manifest_datasets.get(file.stem, {})
+        jobs.append((DATASETS_DOWNLOAD_URL + name, file.with_name(file.name + ".update"), file, level))
+
+        image_path = level.get("image_path", None)
+        if image_path is None or image_path in images:
+            continue
+        if Path(rel_to_root(f"resources/textures/{image_path}")).exists() or \
+                Path(rel_to_writable(f"textures/{image_path}")).exists():
+            continue
+        images.add(image_path)
+
+        if is_custom_path(file):
+            image_dest = Path(rel_to_writable(f"textures/{image_path}"))
+        else:
+            image_dest = Path(rel_to_root(f"resources/textures/{image_path}"))
+        jobs.append((DATASETS_DOWNLOAD_URL + Path(image_path).name, image_dest.with_name(image_dest.name + ".update"),
+                     image_dest, None))
+
+    if not jobs:
+        return True, ""
 
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def _download(url, staged, destination, level, part):
+        async with semaphore:
+            if level is None:
+                return await network.run_blocking(download_to_dir, url, staged, part, token)
+            return await network.run_blocking(update_dataset, url, destination, level, part, token, staged)
+
+    parts = [progress.add() for _ in jobs]
+    try:
+        results = await asyncio.gather(*[_download(*job, part) for job, part in zip(jobs, parts)])
+    except (OSError, ValueError) as e:
+        print(e)
+        return False, "Updating the datasets failed"
+
+    for successful, msg in results:
+        if not successful:
+            # finished staged files are kept, a retry only revalidates them
+            return successful, msg
+
+    try:
+        # textures first, a replaced dataset never points to a missing texture
+        for url, staged, destination, level in sorted(jobs, key=lambda job: job[3] is not None):
+            os.replace(staged, destination)
+            http_cache.relocate_validators(url, destination)
+            if level is not None:
+                # up to date even if replacing a later file fails
+                DATA_UPDATABLE[:] = [d for d in DATA_UPDATABLE if Path(d[1]) != destination]
+    except PermissionError as e:
+        print(e)
+        return False, "Permission Error, try running app as Administrator/root"
+    except (OSError, ValueError) as e:
+        print(e)
+        return False, "Couldn't replace the updated datasets"
 
-# def update_datasets():
-#     """
-#     Should be called in new thread
-#     :return: bool, Successful or not
-#     """
-#
-#     def _download_dataset(d):
-#         name, path = d
-#
-#         return True
-#
-#     with ThreadPoolExecutor() as executor:
-#         results = executor.map(_download_dataset, DATA_UPDATABLE)
-#
-#         for result in results:
-#             pass
+    return True, ""
@@ -0,0 +1,69 @@
+"""
+Paged access to the online library catalogue.
+A manifest may advertise a paged catalogue endpoint instead of (or in addition to) inlining all datasets:
+
+"catalogue": {"url": "https://.../topoloco/catalogue", "page_size": 50}
+
+Pages are requested as '<url>?page=<n>&page_size=<size>' and answer {"datasets": {...}, "next": <n + 1 or null>}.
+Without an endpoint the inlined datasets are handed out in pages of the same size, so the library can still
+render and reconcile incrementally.
+"""
+from typing import Union
+
+from game.updates import http_cache, network
+
+__all__ = ["CataloguePager", "CATALOGUE_PAGE_SIZE"]
+
+CATALOGUE_PAGE_SIZE = 50
+
+
+class CataloguePager:
+    def __init__(self, manifest: dict, page_size: int = CATALOGUE_PAGE_SIZE):
+        """
+        :param manifest: update manifest
+        :param page_size: entries per page if the manifest does not specify it
+        """
+        catalogue = manifest.get("catalogue", None)
+        self.url = catalogue["url"] if catalogue is not None else None
+        self.page_size = catalogue.get("page_size", page_size) if catalogue is not None else page_size
+
+        self._pending = list(manifest.get("datasets", {}).items())
+        self._next_page = 0 if self.url is not None else None
+
+    @property
+    def has_more(self) -> bool:
+        return bool(self._pending) or self._next_page is not None
+
+    @property
+    def needs_network(self) -> bool:
+        """
+        Whether the next page has to be requested from the server, call next_page off the main thread then
+        """
+        return not self._pending and self._next_page is not None
+
+    def _page_url(self, page: int) -> str:
+        return f"{self.url}?page={page}&page_size={self.page_size}"
+
+    def next_page(self, cached_only: bool = False, token: network.CancelToken = None) -> list:
+        """
+        :param cached_only: only use the on-disk HTTP cache for remote pages, never contact the server
+        :param token: optional CancelToken
+        :return: [(key, level), ...], empty if there are no more pages (or the page is not cached)
+        """
+        if self._pending:
+            page, self._pending = self._pending[:self.page_size], self._pending[self.page_size:]
+            return page
+        if self._next_page is None:
+            return []
+        if token is not None:
+            token.raise_if_cancelled()
+
+        url = self._page_url(self._next_page)
+        response = http_cache.read_cached(url) if cached_only else http_cache.cached_get(url)
+        if response is None or not response.ok:
+            return []
+
+        data = response.json()
+        next_page: Union[int, None] = data.get("next", None)
+        self._next_page = next_page
+        return list(data.get("datasets", {}).items())
@@ -0,0 +1,135 @@
+"""
+Delta updates for datasets.
+The manifest may advertise patches for a level:
+
+"patches": [{"from": "1.0", "to": "1.1", "sha256": "<digest of the patched dataset>",
+             "file": "asia_cities_de_1.0_1.1.json"}, ...]
+
+The changes are either inlined as "changes" or downloaded from DATASETS_DOWNLOAD_URL + "file":
+
+{"fields": {"description": "..."},
+ "locations": {"<category>": {"changed": {"<name>": [x, y]}, "added": {"<name>": [x, y]}, "removed": ["<name>"]}}}
+
+The digest is the sha256 of the canonical JSON (see dataset_digest), so it does not depend on formatting.
+"""
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Union
+
+from game.config import DATASETS_DOWNLOAD_URL
+from game.updates import http_cache, network
+from game.utils import lazy_import
+
+version = lazy_import("packaging.version")
+
+__all__ = ["dataset_digest", "find_patch_chain", "apply_patch", "patch_dataset"]
+
+
+def dataset_digest(dataset: dict) -> str:
+    canonical = json.dumps(dataset, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def find_patch_chain(patches: list, from_version: str, to_version: str) -> Union[list, None]:
+    """
+    Finds consecutive patches leading from from_version to to_version
+    :param patches: patch entries of the manifest
+    :param from_version: local version
+    :param to_version: latest version
+    :return: list of patch entries in order or None if there is no chain
+    """
+    by_from = {}
+    for patch in patches:
+        by_from.setdefault(version.parse(patch["from"]), []).append(patch)
+
+    target = version.parse(to_version)
+    current = version.parse(from_version)
+    chain = []
+    while current != target:
+        candidates = [patch for patch in by_from.get(current, []) if current < version.parse(patch["to"]) <= target]
+        if not candidates:
+            return None
+        # biggest step first, keeps chains short
+        patch = max(candidates, key=lambda p: version.parse(p["to"]))
+        chain.append(patch)
+        current = version.parse(patch["to"])
+    return chain
+
+
+def apply_patch(dataset: dict, changes: dict) -> dict:
+    """
+    Applies changes of one patch
+    :param dataset: dataset to patch, not modified
+    :param changes: changes as described in the module docstring
+    :return: patched copy of dataset
+    """
+    dataset = copy.deepcopy(dataset)
+    dataset.update(changes.get("fields", {}))
+
+    locations = dataset.setdefault("locations", {})
+    categories = dataset.setdefault("categories", [])
+    for category, change in changes.get("locations", {}).items():
+        category_locations = locations.setdefault(category, {})
+        if category not in categories:
+            categories.append(category)
+
+        for name in change.get("removed", []):
+            del category_locations[name]
+        for name, position in change.get("changed", {}).items():
+            if name not in category_locations:
+                raise KeyError(name)
+            category_locations[name] = position
+        category_locations.update(change.get("added", {}))
+
+    return dataset
+
+
+def _load_changes(patch: dict) -> dict:
+    changes = patch.get("changes", None)
+    if changes is not None:
+        return changes
+
+    response = http_cache.cached_get(DATASETS_DOWNLOAD_URL + patch["file"], offline_fallback=False)
+    if not response.ok:
+        raise ValueError(f"Patch {patch['file']} unavailable")
+    return response.json()
+
+
+def patch_dataset(path: Union[str, Path], level: dict, destination: Union[str, Path] = None,
+                  token: network.CancelToken = None):
+    """
+    Brings the local dataset at path to the manifest's version by applying the advertised patches.
+    Should be called in another thread
+    :param path: local dataset
+    :param level: manifest entry of the dataset
+    :param destination: where to write the patched dataset, defaults to path
+    :param token: optional CancelToken, checked between patches
+    :return: bool (is_successful), string (message)
+    """
+    path = Path(path)
+    destination = path if destination is None else Path(destination)
+
+    with open(path, encoding="utf-8") as file:
+        dataset = json.load(file)
+
+    chain = find_patch_chain(level.get("patches", []), dataset.get("version", "0"), level["version"])
+    if chain is None:
+        return False, "No patch chain to the latest version"
+
+    for patch in chain:
+        if token is not None:
+            token.raise_if_cancelled()
+        dataset = apply_patch(dataset, _load_changes(patch))
+        dataset["version"] = patch["to"]
+
+        if patch.get("sha256", None) is not None and dataset_digest(dataset) != patch["sha256"]:
+            return False, f"Patch {patch['from']} -> {patch['to']} does not match its hash"
+
+    tmp = destination.with_name(destination.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump(dataset, file, ensure_ascii=False, indent=2)
+    os.replace(tmp, destination)
+    return True, ""
@@ -0,0 +1,223 @@
+"""
+Small on-disk HTTP cache honouring ETag/Last-Modified validators.
+Bodies fetched with cached_get are kept in the cache directory, downloads that land somewhere else (datasets,
+textures, installers) only store their validators here, keyed by url, so they can be revalidated later.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+from game.config import HTTP_TIMEOUT
+from game.utils import writeable_path, lazy_import
+
+requests = lazy_import("requests")
+
+__all__ = ["CachedResponse", "cached_get", "read_cached", "conditional_headers", "validator",
+           "store_validators", "relocate_validators", "drop_validators", "cache_path"]
+
+cache_path = writeable_path.joinpath(Path("cache/http"))
+
+
+class CachedResponse:
+    def __init__(self, content: Union[bytes, None], status_code: int, from_cache: bool = False,
+                 revalidated: bool = False, stale: bool = False):
+        """
+        Minimal response object returned by cached_get
+        :param content: response body, None if neither server nor cache could provide one
+        :param status_code: HTTP status code of the last server response, 0 if the server was not reached
+        :param from_cache: whether the body was read from the cache
+        :param revalidated: server answered 304 Not Modified
+        :param stale: server was unreachable and the cached body was used as fallback
+        """
+        self.content = content
+        self.status_code = status_code
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+        self.stale = stale
+
+    @property
+    def ok(self) -> bool:
+        return self.content is not None
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+
+def _key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _meta_path(url: str) -> Path:
+    return cache_path.joinpath(f"{_key(url)}.json")
+
+
+def _body_path(url: str) -> Path:
+    return cache_path.joinpath(f"{_key(url)}.body")
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(exist_ok=True, parents=True)
+    # unique name, the update check and the online library may store the same url at once
+    handle, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _try_write(path: Path, data: bytes) -> bool:
+    # the cache is best effort, a failed write only costs a full request later
+    try:
+        _atomic_write(path, data)
+    except OSError as e:
+        print(e)
+        return False
+    return True
+
+
+def _load_meta(url: str) -> dict:
+    try:
+        with open(_meta_path(url), encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def conditional_headers(url: str, path: Union[str, Path, None] = None) -> dict:
+    """
+    Builds If-None-Match/If-Modified-Since headers for url
+    :param url: requested url
+    :param path: where the body is stored, defaults to the cache directory. No headers if the body is missing
+    :return: dict of request headers
+    """
+    path = Path(path) if path is not None else _body_path(url)
+    if not path.exists():
+        return {}
+
+    meta = _load_meta(url)
+    if meta.get("path", str(path)) != str(path):
+        return {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def validator(url: str, path: Union[str, Path]) -> Union[str, None]:
+    """
+    Stored ETag (or Last-Modified as fallback) of the body at path, usable as If-Range value
+    :param url: requested url
+    :param path: where the (partial) body is stored
+    :return: validator string or None if unknown
+    """
+    meta = _load_meta(url)
+    if meta.get("path") != str(Path(path)):
+        return None
+    return meta.get("etag") or meta.get("last_modified")
+
+
+def store_validators(url: str, response: "requests.Response", path: Union[str, Path, None] = None):
+    """
+    Remembers ETag/Last-Modified of response for url
+    :param url: requested url
+    :param response: successful response
+    :param path: where the body was stored, defaults to the cache directory
+    :return:
+    """
+    path = Path(path) if path is not None else _body_path(url)
+    meta = {
+        "url": url,
+        "path": str(path),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified")
+    }
+    _try_write(_meta_path(url), json.dumps(meta).encode("utf-8"))
+
+
+def relocate_validators(url: str, path: Union[str, Path]):
+    """
+    Points the stored validators of url to path, after its body has been moved there
+    :param url:
+    :param path: new location of the body
+    :return:
+    """
+    meta = _load_meta(url)
+    if not meta:
+        return
+    meta["path"] = str(Path(path))
+    _try_write(_meta_path(url), json.dumps(meta).encode("utf-8"))
+
+
+def drop_validators(url: str):
+    for path in (_meta_path(url), _body_path(url)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def read_cached(url: str) -> Union[CachedResponse, None]:
+    """
+    Cached body of url without contacting the server
+    :param url:
+    :return: CachedResponse or None if nothing is cached
+    """
+    try:
+        with open(_body_path(url), "rb") as file:
+            return CachedResponse(file.read(), status_code=0, from_cache=True, stale=True)
+    except OSError:
+        return None
+
+
+def cached_get(url: str, timeout=HTTP_TIMEOUT, offline_fallback: bool = True) -> CachedResponse:
+    """
+    GET url, revalidating a cached copy with If-None-Match/If-Modified-Since
+    :param url:
+    :param timeout: requests timeout, (connect, read)
+    :param offline_fallback: return the cached body if the server is unreachable or answers with an error
+    :return: CachedResponse, check .ok before using .content
+    """
+    headers = conditional_headers(url)
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+    except (requests.Timeout, requests.ConnectionError) as e:
+        print(e)
+        cached = read_cached(url) if offline_fallback else None
+        if cached is None:
+            raise
+        return cached
+
+    if response.status_code == 304:
+        cached = read_cached(url)
+        if cached is not None:
+            cached.status_code = 304
+            cached.revalidated = True
+            cached.stale = False
+            return cached
+        # validators without body, drop them and fetch again
+        drop_validators(url)
+        return cached_get(url, timeout=timeout, offline_fallback=offline_fallback)
+
+    if 200 <= response.status_code < 300:
+        # validators without the matching body would revalidate an older one
+        if _try_write(_body_path(url), response.content):
+            store_validators(url, response)
+        return CachedResponse(response.content, status_code=response.status_code)
+
+    cached = read_cached(url) if offline_fallback else None
+    if cached is not None:
+        cached.status_code = response.status_code
+        return cached
+    return CachedResponse(None, status_code=response.status_code)
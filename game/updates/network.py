@@ -0,0 +1,247 @@
+"""
+Single background asyncio event loop that owns all network work.
+requests is blocking, so the loop hands every call to a daemon worker thread, bounded by a semaphore, while it keeps
+track of timeouts and cancellation. Daemon workers never hold up quitting, a cancelled task resolves immediately and
+its worker stops at the next chunk or request timeout. The worker keeps its slot until then, so MAX_WORKERS bounds the
+running threads.
+
+Import using from game.updates import network
+"""
+import functools
+import threading
+from concurrent.futures import Executor, Future, InvalidStateError
+from typing import Callable, Union
+
+from game.utils import lazy_import
+
+# the loop starts with the first submit(), asyncio is imported then
+asyncio = lazy_import("asyncio")
+
+__all__ = ["Cancelled", "CancelToken", "NetworkTask", "root_token", "new_token", "submit", "run_blocking",
+           "shutdown"]
+
+MAX_WORKERS = 6
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self, parent: "CancelToken" = None):
+        """
+        Cooperative cancellation flag, thread safe.
+        Cancelling a token cancels all its children and runs the registered callbacks
+        :param parent: token whose cancellation also cancels this one
+        """
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._parent = parent
+        if parent is not None:
+            parent.on_cancel(self.cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        if self._parent is not None:
+            self._parent.remove_callback(self.cancel)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(e)
+
+    def on_cancel(self, callback: Callable):
+        """
+        Registers callback to be called on cancellation, called immediately if already cancelled
+        :param callback: callable without arguments, called from the cancelling thread
+        :return:
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled
+
+    def child(self) -> "CancelToken":
+        return CancelToken(parent=self)
+
+
+class NetworkTask:
+    def __init__(self, future: Future, token: CancelToken):
+        """
+        Handle of a task running on the network loop. Poll it with done() from scenes or await it from coroutines
+        :param future: concurrent future of the task
+        :param token: token cancelling the task
+        """
+        self._future = future
+        self.token = token
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancelled(self) -> bool:
+        return self._future.cancelled()
+
+    def result(self, timeout: float = None):
+        """
+        :param timeout: seconds to wait, None blocks until done
+        :return: return value of the task, raises concurrent.futures.CancelledError if cancelled
+        """
+        return self._future.result(timeout)
+
+    def cancel(self):
+        self.token.cancel()
+
+    def __await__(self):
+        return asyncio.wrap_future(self._future).__await__()
+
+
+class _DaemonExecutor(Executor):
+    """
+    Runs each call in its own daemon thread, so blocked requests never delay interpreter exit
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                try:
+                    future.set_exception(e)
+                except InvalidStateError:
+                    pass
+            else:
+                try:
+                    future.set_result(result)
+                except InvalidStateError:
+                    pass
+
+        threading.Thread(target=run, name="TopoLoco-network-worker", daemon=True).start()
+        return future
+
+
+root_token = CancelToken()
+
+_loop = None
+_thread = None
+_semaphore = None
+_executor = _DaemonExecutor()
+_lock = threading.Lock()
+
+
+def _ensure_loop() -> "asyncio.AbstractEventLoop":
+    global _loop
+    global _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="TopoLoco-network", daemon=True)
+            _thread.start()
+    return _loop
+
+
+def new_token() -> CancelToken:
+    """
+    :return: new token that is cancelled on shutdown
+    """
+    return root_token.child()
+
+
+async def run_blocking(func: Callable, *args):
+    """
+    Runs blocking func in a worker thread, only to be awaited on the network loop
+    :param func:
+    :param args: positional arguments of func
+    :return: return value of func
+    """
+    global _semaphore
+    if _semaphore is None:
+        # created lazily so it binds to the network loop
+        _semaphore = asyncio.Semaphore(MAX_WORKERS)
+    await _semaphore.acquire()
+    loop = asyncio.get_running_loop()
+    try:
+        future = _executor.submit(functools.partial(func, *args))
+    except BaseException:
+        _semaphore.release()
+        raise
+    # released when the thread is done, a cancelled await leaves the thread running until its next check
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_semaphore.release))
+    return await asyncio.wrap_future(future, loop=loop)
+
+
+async def _run(func: Callable, args: tuple, token: CancelToken, timeout: Union[float, None]):
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+
+    def cancel_task():
+        loop.call_soon_threadsafe(task.cancel)
+
+    token.on_cancel(cancel_task)
+    try:
+        if asyncio.iscoroutinefunction(func):
+            coroutine = func(*args)
+        else:
+            coroutine = run_blocking(func, *args)
+        if timeout is None:
+            return await coroutine
+        return await asyncio.wait_for(coroutine, timeout)
+    except asyncio.TimeoutError:
+        # token is this task's own child token, the tasks sharing the caller's token keep running
+        token.cancel()
+        raise
+    finally:
+        token.remove_callback(cancel_task)
+
+
+def submit(func: Callable, *args, token: CancelToken = None, timeout: float = None) -> NetworkTask:
+    """
+    Schedules func on the network loop. Blocking functions run in a worker thread, coroutine functions on the loop.
+    The token only cancels the handle, pass it to func as argument as well if func should stop cooperatively
+    :param func: function or coroutine function
+    :param args: positional arguments of func
+    :param token: CancelToken cancelling the task, defaults to root_token
+    :param timeout: overall deadline in seconds, only this task is cancelled when exceeded
+    :return: NetworkTask, its token is a child of token
+    """
+    loop = _ensure_loop()
+    parent = root_token if token is None else token
+    token = parent.child()
+    future = asyncio.run_coroutine_threadsafe(_run(func, args, token, timeout), loop)
+    future.add_done_callback(lambda _: parent.remove_callback(token.cancel))
+    return NetworkTask(future, token)
+
+
+def shutdown():
+    """
+    Cancels all in-flight tasks and stops the network loop, call when quitting
+    :return:
+    """
+    root_token.cancel()
+    if _loop is not None:
+        _loop.call_soon_threadsafe(_loop.stop)
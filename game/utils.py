@@ -1,20 +1,20 @@
+import importlib
 import os
-import re
 import sys
 from pathlib import Path
 from typing import Union
 
 import pygame
 
-__all__ = ["aspect_scale", "writeable_path", "root_path", "rel_to_root", "rel_to_writable", "temp_path",
-           "is_custom_path", "multiline_text", "invert_color", "absolute_path"]
+__all__ = ["aspect_scale", "aspect_size", "writeable_path", "root_path", "rel_to_root", "rel_to_writable", "temp_path",
+           "is_custom_path", "invert_color", "absolute_path", "make_writeable_dirs", "lazy_import", "LazyModule"]
 
 
-def aspect_scale(img, box, smooth: bool = False):
-    """ Scales 'img' to fit into box bx/by.
-     This method will retain the original image's aspect ratio """
+def aspect_size(size, box) -> tuple:
+    """ Size of an image of 'size' scaled to fit into box bx/by,
+     retaining the aspect ratio """
     bx, by = box
-    ix, iy = img.get_size()
+    ix, iy = size
     if ix > iy:
         # fit to width
         scale_factor = bx / float(ix)
@@ -36,58 +36,34 @@ def aspect_scale(img, box, smooth: bool = False):
         else:
             sy = by
 
+    return int(sx), int(sy)
+
+
+def aspect_scale(img, box, smooth: bool = False):
+    """ Scales 'img' to fit into box bx/by.
+     This method will retain the original image's aspect ratio """
+    size = aspect_size(img.get_size(), box)
     if smooth:
-        return pygame.transform.smoothscale(img, (int(sx), int(sy)))
+        return pygame.transform.smoothscale(img, size)
     else:
-        return pygame.transform.scale(img, (int(sx), int(sy)))
+        return pygame.transform.scale(img, size)
 
 
 def invert_color(color: pygame.Color):
     return 255 - color.r, 255 - color.g, 255 - color.b
 
 
-def multiline_text(text: str, font, color: pygame.Color, margin: int = 10, max_length: int = None):
-    if max_length is not None:
-        formatted_string = ""
-
-        words_with_nl = [word for word in re.split(r' |(\n)', text) if word is not None and word != ""]
-
-        length = 0
-        *_, space_length, _ = font.get_metrics(" ")[0]  # horizontal advance x coordinate
-
-        for i, word in enumerate(words_with_nl):
-            word_length = 0
-            for metric in font.get_metrics(word):
-                if metric is not None:
-                    _, charadvance, *_ = metric  # max_x
-                    word_length += charadvance
-
-            if word == "\n":
-                formatted_string += "\n"
-                length = 0
-            elif length + word_length + space_length > max_length:
-                formatted_string += "\n" + word + " "
-                length = 0
-            else:
-                formatted_string += word + " "
-                length += word_length + space_length
-
-        text = formatted_string
-
-    size = font.size
-    lines = text.split("\n")
+writeable_path = Path(os.environ["LOCALAPPDATA"]).joinpath(Path("TopoLoco"))
 
-    surfs = []
-    for i, line in enumerate(lines):
-        txt, rect = font.render(line, color)
-        rect.topleft = 0, size * i + (i * margin)
-        surfs.append((txt, rect))
-    return surfs
 
+def make_writeable_dirs():
+    """
+    Creates the folders for custom and downloaded levels, called on start instead of on import
+    :return:
+    """
+    writeable_path.joinpath(Path("data")).mkdir(exist_ok=True, parents=True)
+    writeable_path.joinpath(Path("textures/maps")).mkdir(exist_ok=True, parents=True)
 
-writeable_path = Path(os.environ["LOCALAPPDATA"]).joinpath(Path("TopoLoco"))
-writeable_path.joinpath(Path("data")).mkdir(exist_ok=True, parents=True)
-writeable_path.joinpath(Path("textures/maps")).mkdir(exist_ok=True, parents=True)
 
 temp_path = Path(os.environ["TEMP"])
 
@@ -120,3 +96,41 @@ def absolute_path(relative: Union[str, Path]) -> Path:
         relative = Path(relative)
 
     return Path(rel_to_writable(relative) if is_custom_path(relative) else rel_to_root(relative))
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        """
+        Stands in for a module that is imported on first attribute access, see lazy_import()
+        :param name: absolute module name, e.g. "packaging.version"
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, network threads may get here at the same time
+            module = self.__dict__["_module"] = importlib.import_module(self._name)
+        return module
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._load(), key, value)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Defers importing a heavy module until it is used, keeping it off the start up path.
+    Use module attributes (requests.Timeout) instead of from-imports, which would import right away
+    :param name: absolute module name
+    :return: proxy of the module
+    """
+    module = sys.modules.get(name, None)
+    return module if module is not None else LazyModule(name)
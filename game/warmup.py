@@ -0,0 +1,159 @@
+"""
+Background warm-up while the title screen waits for a key.
+The caches the level selection and the first level need are filled on the network loop, most important first:
+level metadata, UI icons and the scaled map of the most recently played level.
+Before every step the warm-up waits until the player has not given input for a moment, so it never competes with
+handling it.
+FreeType and the text cache are not thread safe, the title screen opens the fonts itself, one per idle frame.
+The update manifest is not part of it, the update check started after the first frame already revalidates it.
+
+Import using from game import warmup
+"""
+import json
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Union
+
+import game.datasets as ds
+from game.assets.fonts import open_fonts
+from game.assets.icons import ATLAS_IMAGE
+from game.assets.manager import assets
+from game.assets.maps import map_path, MAP_BOX
+from game.updates import network
+from game.utils import writeable_path
+
+__all__ = ["start_warmup", "claim_datasets", "warm_fonts", "note_input", "remember_level", "recent_level"]
+
+IDLE_TIME = 0.25  # seconds without input before the next step runs
+GLYPHS = string.ascii_letters + string.digits + " .,:;!?-()/%äöüÄÖÜß"
+RECENT_LEVEL_FILE = "recent.json"
+
+_task = None  # NetworkTask, the warm-up runs once per start
+_last_input = 0.0
+_datasets_lock = threading.Lock()
+_datasets_claimed = False  # the level selection loaded the datasets itself, the warm-up must not overwrite them
+
+
+def note_input():
+    """
+    Call when a frame received input events, the warm-up holds back for IDLE_TIME
+    :return:
+    """
+    global _last_input
+    _last_input = time.perf_counter()
+
+
+def remember_level(dataset_path: Union[str, Path]):
+    """
+    Stores the level the player starts, its map is warmed up on the next start
+    :param dataset_path:
+    :return:
+    """
+    try:
+        with open(writeable_path.joinpath(RECENT_LEVEL_FILE), "w", encoding="utf-8") as file:
+            json.dump({"level": str(dataset_path)}, file)
+    except OSError as e:
+        print(e)
+
+
+def recent_level() -> Union[Path, None]:
+    """
+    :return: dataset path of the most recently started level, None if there is none or it was removed
+    """
+    try:
+        with open(writeable_path.joinpath(RECENT_LEVEL_FILE), encoding="utf-8") as file:
+            path = Path(json.load(file)["level"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return path if path.exists() else None
+
+
+def _wait_idle(token: network.CancelToken):
+    while time.perf_counter() - _last_input < IDLE_TIME:
+        token.raise_if_cancelled()
+        time.sleep(IDLE_TIME / 5)
+    token.raise_if_cancelled()
+
+
+def claim_datasets() -> bool:
+    """
+    Cancels the dataset step of the warm-up, call when the level selection needs the datasets.
+    Waits if the step is running
+    :return: True if the warm-up loaded them and nothing reloaded them since, False if they have to be loaded
+    """
+    global _datasets_claimed
+    with _datasets_lock:
+        _datasets_claimed = True
+        warm = ds.WARM
+        ds.WARM = False
+    return warm
+
+
+def warm_fonts() -> bool:
+    """
+    Opens the next font and fills its glyph atlas if the player has not given input for IDLE_TIME.
+    Call once per frame on the main thread
+    :return: True while fonts are left
+    """
+    if time.perf_counter() - _last_input < IDLE_TIME:
+        return True
+    return open_fonts(GLYPHS, limit=1) > 0
+
+
+def _warm_datasets():
+    with _datasets_lock:
+        if _datasets_claimed:
+            return
+        ds.load_datasets()
+        ds.WARM = True
+
+
+def _warm_recent_map():
+    path = recent_level()
+    if path is None:
+        return
+    with open(path, encoding="utf-8") as file:
+        image_path = json.load(file).get("image_path", None)
+    if image_path is not None:
+        assets.load({"scaled_images": [(str(map_path(image_path)), MAP_BOX)]})
+
+
+# in order of priority
+STEPS = [
+    ("datasets", _warm_datasets),
+    ("icons", lambda: assets.load({"images": [ATLAS_IMAGE]})),
+    ("recent map", _warm_recent_map),
+]
+
+
+def _warm_up(token: network.CancelToken):
+    """
+    Should be called in another thread
+    :param token:
+    :return: bool (is_successful), string (message)
+    """
+    failed = []
+    for name, step in STEPS:
+        _wait_idle(token)
+        try:
+            step()
+        except (OSError, ValueError, KeyError) as e:
+            print(e)
+            failed.append(name)
+    if failed:
+        return False, f"Warm-up of {', '.join(failed)} failed"
+    return True, ""
+
+
+def start_warmup() -> network.NetworkTask:
+    """
+    Starts the warm-up, later calls return the running or finished one
+    :return: NetworkTask resolving to (success, msg)
+    """
+    global _task
+    if _task is None:
+        token = network.new_token()
+        _task = network.submit(_warm_up, token, token=token)
+    return _task
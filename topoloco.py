@@ -1,18 +1,75 @@
 # -*- encoding: utf-8 -*-
+# first, the startup timeline counts from this import
+from game.diagnostics import startup
+
+import argparse
+import os
+
 import pygame
-from pygame.locals import KEYDOWN, QUIT, K_LALT, K_RALT, K_F4
+from pygame.locals import KEYDOWN, QUIT, K_LALT, K_RALT, K_F4, K_F9, K_F10, K_F11
 
 import game.updates as upd
-from game.assets.fonts import fps_counter
+from game.animations import tweens
+from game.assets import audio
+from game.assets.fonts import fps_counter, render_text
+from game.assets.manager import assets
 from game.config import *
 from game.scenes import SceneBase, TitleScene
-from game.utils import rel_to_root
-
-
-def main(starting_scene: SceneBase):
-    pygame.init()
-
-    update_check_executor, thread = upd.start_update_check()
+from game.updates import network
+from game import warmup
+from game.memory import memory_tracker
+from game.profiler import ProfileCapture, start_capture
+from game.render_stats import render_stats, CountingSurface
+from game.replay import InputRecorder, InputReplay
+from game.utils import rel_to_root, make_writeable_dirs
+
+startup.mark("imports")
+
+RENDER_STATS_KEY = K_F9
+PROFILE_KEY = K_F10
+ASSETS_REPORT_KEY = K_F11
+
+
+def toggle_render_stats(screen: pygame.Surface):
+    """
+    Switches render accounting on or off, prints the report when switching off
+    :param screen: display surface
+    :return: CountingSurface the scenes draw on while accounting, None when off
+    """
+    if render_stats.enabled:
+        render_stats.disable()
+        print(render_stats.report(screen.get_bytesize()))
+        return None
+    # draws on the display itself can't be counted, scenes draw on a copy that is blitted to the display
+    canvas = CountingSurface(screen.get_size())
+    canvas.blit(screen, (0, 0))
+    render_stats.enable()
+    return canvas
+
+
+def stop_capture(capture: ProfileCapture):
+    success, msg = capture.stop()
+    print(msg)
+
+
+def main(starting_scene: SceneBase, recorder: InputRecorder = None, replay: InputReplay = None):
+    """
+    :param starting_scene:
+    :param recorder: records the input of the session
+    :param replay: plays a recorded session instead of taking input, only closing the window stops it
+    :return:
+    """
+    startup.mark("starting scene built")
+    make_writeable_dirs()
+    audio.pre_init()
+    # only what the game uses, pygame.init() would also start joysticks, controllers and SDL_ttf
+    pygame.display.init()
+    try:
+        pygame.mixer.init()
+    except pygame.error as e:
+        print(e)
+
+    update_check = None
 
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("TopoLoco")
@@ -22,21 +79,39 @@ def main(starting_scene: SceneBase):
     game_clock = pygame.time.Clock()
     game_clock.tick(FPS)
     dt = 0
+    frame = 0
+    startup.mark("init")
 
-    fps_text, fps_rect = fps_counter.render("0", (255, 255, 255), (0, 0, 0))
+    fps_text, fps_rect = render_text(fps_counter, "0", (255, 255, 255), (0, 0, 0))
 
     active_scene = starting_scene
+    # every scene references the next one through .next, holding on to the first would keep all of them alive
+    del starting_scene
+    canvas = toggle_render_stats(screen) if SHOW_RENDER_STATS else None
+    render_stats_time = 0
+    # e.g. TOPOLOCO_PROFILE=10s profiles the first ten seconds
+    profile_length = os.environ.get("TOPOLOCO_PROFILE", None)
+    capture = start_capture(type(active_scene).__name__, profile_length) if profile_length else None
 
     # MAIN GAME LOOP
     while active_scene is not None:
-        active_scene.screen = screen
+        target = screen if canvas is None else canvas
+        active_scene.screen = target
         pressed_keys = pygame.key.get_pressed()
+        events = pygame.event.get()
 
-        upd.check_update(thread, update_check_executor)
+        if update_check is not None:
+            upd.check_update(update_check)
+
+        if replay is not None:
+            recorded = replay.next_frame()
+            if recorded is None or any(event.type == QUIT for event in events):
+                break
+            events, pressed_keys, dt = recorded
 
         # Event filtering
         filtered_events = []
-        for event in pygame.event.get():
+        for event in events:
             quit_attempt = False
             if event.type == QUIT:
                 quit_attempt = True
@@ -45,31 +120,117 @@ def main(starting_scene: SceneBase):
 
                 if event.key == K_F4 and alt_pressed:
                     quit_attempt = True
+                elif event.key == RENDER_STATS_KEY:
+                    canvas = toggle_render_stats(screen)
+                    continue
+                elif event.key == PROFILE_KEY:
+                    if capture is None:
+                        capture = start_capture(type(active_scene).__name__, PROFILE_CAPTURE)
+                    else:
+                        stop_capture(capture)
+                        capture = None
+                    continue
+                elif event.key == ASSETS_REPORT_KEY:
+                    print(assets.report())
+                    continue
 
             if quit_attempt:
                 active_scene.Terminate()
             else:
                 filtered_events.append(event)
+        if filtered_events:
+            audio.mark_input()
+            warmup.note_input()
+        if recorder is not None:
+            recorder.record(filtered_events, pressed_keys, dt)
 
         # Scenes
         active_scene.ProcessInput(filtered_events, pressed_keys, dt)
+        # steps every running animation, scenes read the new values in Update
+        tweens.update(dt)
         active_scene.Update(dt)
-        active_scene.Render(screen)
-
+        with render_stats.scope(type(active_scene).__name__):
+            active_scene.Render(target)
+        if target is not screen:
+            screen.blit(target, (0, 0))
+
+        if active_scene.next is not active_scene:
+            # drops the assets of the scenes collected since the last switch
+            assets.trim()
         active_scene = active_scene.next
 
         # flip, fps
         if SHOW_FPS:
             screen.blit(fps_text, fps_rect)
         pygame.display.flip()
-        dt = game_clock.tick(FPS) * 0.001
+        # a replay paces itself
+        dt = game_clock.tick(FPS if replay is None else 0) * 0.001
         if SHOW_FPS:
-            fps_text, fps_rect = fps_counter.render(str(round(game_clock.get_fps())), (255, 255, 255), (0, 0, 0))
-
-
-def launch():
-    main(TitleScene())
+            fps_text, fps_rect = render_text(fps_counter, str(round(game_clock.get_fps())), (255, 255, 255), (0, 0, 0))
+        if capture is not None and capture.frame():
+            stop_capture(capture)
+            capture = None
+        if render_stats.enabled:
+            render_stats.end_frame()
+            render_stats_time += dt
+            if render_stats_time >= RENDER_STATS_INTERVAL:
+                render_stats_time = 0
+                print(render_stats.report(screen.get_bytesize()))
+                render_stats.reset()
+
+        frame += 1
+        if frame == 1:
+            startup.mark("first frame")
+            # background work starts once the window shows something, it would compete with the first frame
+            update_check = upd.start_update_check()
+            # feedback sounds are decoded while the title screen shows
+            assets.preload(audio.FEEDBACK_SOUNDS)
+        elif frame == 2:
+            # the first frame that handled the events queued while the window opened
+            startup.mark("first interactive frame")
+            if SHOW_STARTUP_TIMELINE:
+                print(startup.report())
+
+    if SHOW_AUDIO_LATENCY:
+        print(audio.latency.report())
+    if render_stats.enabled:
+        toggle_render_stats(screen)
+    if capture is not None:
+        stop_capture(capture)
+    if memory_tracker.enabled:
+        print(memory_tracker.report())
+        memory_tracker.disable()
+    if recorder is not None:
+        print(recorder.close())
+    if replay is not None:
+        print(replay.report())
+
+    # cancel in-flight transfers instead of waiting for them
+    network.shutdown()
+
+
+def launch(args: list = None):
+    parser = argparse.ArgumentParser(description="TopoLoco")
+    parser.add_argument("--record", metavar="FILE", help="record the input of the session to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded session")
+    parser.add_argument("--fast", action="store_true",
+                        help="replay as fast as possible without a window or sound instead of in real time")
+    options = parser.parse_args(args)
+
+    recorder = replay = None
+    if options.replay is not None:
+        if options.fast:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        replay = InputReplay(options.replay, real_time=not options.fast)
+    elif options.record is not None:
+        recorder = InputRecorder(options.record)
+
+    if TRACK_MEMORY or os.environ.get("TOPOLOCO_TRACK_MEMORY", None):
+        # before the first scene is built, so its allocations are traced too
+        memory_tracker.enable()
+    main(TitleScene(), recorder=recorder, replay=replay)
 
 
 if __name__ == '__main__':
-    main(TitleScene())
+    launch()